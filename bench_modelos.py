@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Script de benchmark de los tres modelos: tiempo y memoria pico de ajustarCorpus y
+latencia de buscar (p50 / p95 / p99) sobre el corpus (docs/corpus.csv) y sobre
+corpus sintéticos escalados (10x, 100x, ...)
+Los resultados se guardan en JSON para comparar entre commits:
+    python bench_modelos.py --salida antes.json
+    python bench_modelos.py --salida despues.json --comparar antes.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Agregar raíz del proyecto al path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+import pandas as pd
+from classes.analyzer import TOKENIZADORES
+from classes.binarymodel import ModeloBinario
+from classes.tfidfmodel import ModeloVectorialTfIdf
+from classes.bm25model import ModeloBM25
+from controllers.corpus_loader import QRELS_PRECALCULADOS
+
+MODELOS = {"Binario": ModeloBinario, "TF-IDF": ModeloVectorialTfIdf, "BM25": ModeloBM25}
+# Métricas en las que un valor mayor es peor (se comparan entre ejecuciones)
+METRICAS_COMPARADAS = ["ajusteSegundos", "memoriaPicoMiB", "buscarP50Ms", "buscarP95Ms", "buscarP99Ms"]
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark de ajuste y búsqueda de los modelos")
+    parser.add_argument("--csv", default="corpus.csv", help="Corpus (en docs/ o en la raíz del proyecto)")
+    parser.add_argument("--escalas", default="1,10,100", help="Tamaños relativos al corpus, separados por comas")
+    parser.add_argument("--consultas", type=int, default=200, help="Consultas por medición de latencia")
+    parser.add_argument("-k", type=int, default=10, help="Resultados por consulta")
+    parser.add_argument("--modelos", default=",".join(MODELOS), help="Modelos a medir, separados por comas")
+    parser.add_argument("--tokenizador", default="nltk", choices=TOKENIZADORES)
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir la memoria pico (evita un segundo ajuste)")
+    parser.add_argument("--salida", default="bench_resultados.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--semilla", type=int, default=0)
+    return parser.parse_args()
+
+
+def leerCorpus(nombreCsv):
+    rutaCsv = project_root / "docs" / nombreCsv
+    if not rutaCsv.exists():
+        rutaCsv = project_root / nombreCsv
+    if not rutaCsv.exists():
+        print(f"✗ No se encontró el corpus: {nombreCsv} (ni en docs/ ni en la raíz)")
+        sys.exit(1)
+    return rutaCsv, pd.read_csv(rutaCsv)
+
+
+def corpusSintetico(documentos, escala, semilla):
+    """
+    Genera len(documentos) * escala documentos con la distribución de longitudes y de
+    términos del corpus real. Una parte de las palabras se reemplaza por términos nuevos
+    (con frecuencia tipo Zipf) para que el vocabulario crezca con el tamaño, como en un
+    corpus real más grande.
+    """
+    generador = np.random.default_rng(semilla)
+    palabrasPorDocumento = [texto.split() for texto in documentos]
+    frecuencias = Counter(palabra for palabras in palabrasPorDocumento for palabra in palabras)
+    palabras = np.array(list(frecuencias))
+    probabilidades = np.array(list(frecuencias.values()), dtype=float)
+    probabilidades /= probabilidades.sum()
+    longitudes = np.array([len(p) for p in palabrasPorDocumento])
+
+    numDocumentos = len(documentos) * escala
+    longitudesNuevas = generador.choice(longitudes, size=numDocumentos)
+    totalPalabras = int(longitudesNuevas.sum())
+    muestra = palabras[generador.choice(len(palabras), size=totalPalabras, p=probabilidades)].astype(object)
+    nuevas = generador.random(totalPalabras) < 0.05
+    muestra[nuevas] = [f"sint{n}" for n in generador.zipf(1.3, size=int(nuevas.sum())) % (len(palabras) * escala)]
+
+    limites = np.concatenate([[0], np.cumsum(longitudesNuevas)])
+    return pd.Series([" ".join(muestra[limites[i]:limites[i + 1]]) for i in range(numDocumentos)])
+
+
+def consultasBenchmark(dfCorpus, numConsultas, semilla):
+    """ Las preguntas de los Qrels más preguntas del corpus elegidas al azar. """
+    consultas = list(QRELS_PRECALCULADOS)
+    if "Question" in dfCorpus:
+        preguntas = dfCorpus["Question"].dropna().astype(str).tolist()
+        random.Random(semilla).shuffle(preguntas)
+        consultas += preguntas
+    return consultas[:numConsultas]
+
+
+def medirModelo(claseModelo, documentos, consultas, k, tokenizador, medirMemoria):
+    resultado = {"documentos": len(documentos)}
+
+    # Ajuste cronometrado (sin tracemalloc, que lo haría más lento)
+    modelo = claseModelo(tokenizador=tokenizador)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        modelo.ajustarCorpus(documentos)
+        resultado["ajusteSegundos"] = time.perf_counter() - inicio
+    resultado["terminos"] = len(modelo.vocabulario)
+
+    if medirMemoria:
+        modeloMemoria = claseModelo(tokenizador=tokenizador)
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            modeloMemoria.ajustarCorpus(documentos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultado["memoriaPicoMiB"] = pico / 1024 ** 2
+        del modeloMemoria
+
+    # Latencia de buscar, consulta por consulta (la primera pasada calienta cachés)
+    latencias = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for consulta in consultas[:5]:
+            modelo.buscar(consulta, k)
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            modelo.buscar(consulta, k)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+    resultado.update({"consultas": len(latencias), "buscarP50Ms": p50, "buscarP95Ms": p95, "buscarP99Ms": p99})
+    return resultado
+
+
+def versionCodigo():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compararResultados(actuales, anteriores):
+    """ Imprime la variación de cada métrica respecto a una ejecución anterior. """
+    previas = {(r["escala"], r["modelo"]): r for r in anteriores["resultados"]}
+    print("\n" + "=" * 60)
+    print(f"COMPARACIÓN CON {anteriores.get('commit') or 'ejecución anterior'}")
+    print("=" * 60)
+    for resultado in actuales["resultados"]:
+        previo = previas.get((resultado["escala"], resultado["modelo"]))
+        if previo is None:
+            continue
+        cambios = []
+        for metrica in METRICAS_COMPARADAS:
+            if metrica in resultado and previo.get(metrica):
+                cambios.append(f"{metrica} {resultado[metrica] / previo[metrica] - 1:+.0%}")
+        print(f"{resultado['escala']:>4}x {resultado['modelo']:<8} " + " | ".join(cambios))
+
+
+def main():
+    args = argumentos()
+    rutaCsv, dfCorpus = leerCorpus(args.csv)
+    documentos = dfCorpus["Answer"].fillna("").astype(str)
+    consultas = consultasBenchmark(dfCorpus, args.consultas, args.semilla)
+    escalas = [int(escala) for escala in args.escalas.split(",")]
+    nombresModelos = [nombre.strip() for nombre in args.modelos.split(",")]
+
+    print("=" * 60)
+    print("BENCHMARK DE MODELOS")
+    print("=" * 60)
+    print(f"\n✓ Corpus: {rutaCsv} ({len(documentos)} documentos)")
+    print(f"✓ Escalas: {escalas} | Consultas: {len(consultas)} | k={args.k} | tokenizador={args.tokenizador}")
+
+    salida = {
+        "commit": versionCodigo(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "corpus": rutaCsv.name,
+        "k": args.k,
+        "tokenizador": args.tokenizador,
+        "resultados": [],
+    }
+    for escala in escalas:
+        documentosEscala = documentos if escala == 1 else corpusSintetico(documentos.tolist(), escala, args.semilla)
+        print(f"\n[{escala}x] {len(documentosEscala)} documentos")
+        for nombre in nombresModelos:
+            resultado = medirModelo(
+                MODELOS[nombre], documentosEscala, consultas, args.k, args.tokenizador, not args.sin_memoria
+            )
+            resultado.update({"escala": escala, "modelo": nombre})
+            salida["resultados"].append(resultado)
+            memoria = f" | memoria pico {resultado['memoriaPicoMiB']:.1f} MiB" if "memoriaPicoMiB" in resultado else ""
+            print(
+                f"  {nombre:<8} ajuste {resultado['ajusteSegundos']:.2f}s{memoria} | buscar "
+                f"p50 {resultado['buscarP50Ms']:.2f} ms, p95 {resultado['buscarP95Ms']:.2f} ms, "
+                f"p99 {resultado['buscarP99Ms']:.2f} ms"
+            )
+
+    rutaSalida = Path(args.salida)
+    with open(rutaSalida, "w", encoding="utf-8") as archivo:
+        json.dump(salida, archivo, indent=2, ensure_ascii=False)
+    print(f"\n✓ Resultados guardados en: {rutaSalida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            compararResultados(salida, json.load(archivo))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Script de benchmark del tokenizador: compara word_tokenize de NLTK con el
+tokenizador rápido sobre las respuestas del corpus (docs/corpus.csv)
+Uso: python bench_tokenizador.py [nombre_csv] [repeticiones]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Agregar raíz del proyecto al path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+from classes.analyzer import TOKENIZADORES, tokenizar
+
+nombreCsv = sys.argv[1] if len(sys.argv) > 1 else "corpus.csv"
+repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+rutaCsv = project_root / "docs" / nombreCsv
+if not rutaCsv.exists():
+    rutaCsv = project_root / nombreCsv
+if not rutaCsv.exists():
+    print(f"✗ No se encontró el corpus: {nombreCsv} (ni en docs/ ni en la raíz)")
+    sys.exit(1)
+
+documentos = pd.read_csv(rutaCsv)["Answer"].fillna("").astype(str).tolist()
+
+print("=" * 60)
+print("BENCHMARK DEL TOKENIZADOR")
+print("=" * 60)
+print(f"\n✓ Corpus: {rutaCsv}")
+print(f"✓ Documentos: {len(documentos)}")
+print(f"✓ Repeticiones: {repeticiones} (se reporta la mejor)")
+
+tiempos = {}
+resultados = {}
+for tokenizador in TOKENIZADORES:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tokens = [tokenizar(texto, tokenizador) for texto in documentos]
+        mejor = min(mejor, time.perf_counter() - inicio)
+    tiempos[tokenizador] = mejor
+    resultados[tokenizador] = tokens
+    totalTokens = sum(len(t) for t in tokens)
+    print(f"\n{tokenizador:>8}: {mejor:.3f} s  ({totalTokens} tokens, {len(documentos) / mejor:.0f} docs/s)")
+
+diferentes = sum(a != b for a, b in zip(resultados["nltk"], resultados["rapido"]))
+
+print("\n" + "=" * 60)
+print(f"Aceleración: {tiempos['nltk'] / tiempos['rapido']:.1f}x")
+if diferentes == 0:
+    print("✓ Tokens idénticos en todos los documentos")
+else:
+    print(f"✗ {diferentes} documentos con tokens distintos")
+print("=" * 60)
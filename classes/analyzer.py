@@ -0,0 +1,347 @@
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+from nltk.tokenize import NLTKWordTokenizer, word_tokenize
+from nltk.tokenize.punkt import PunktTokenizer
+from classes.sparsematrix import MatrizDispersa
+
+TOKENIZADORES = ("nltk", "rapido")
+
+# Tokenizador de palabras de word_tokenize (la versión mejorada de Treebank)
+_tokenizadorPalabras = NLTKWordTokenizer()
+
+# Palabras alfabéticas que el tokenizador Treebank igualmente parte en dos (CONTRACTIONS2)
+_CONTRACCIONES = {
+    palabra: tuple(_tokenizadorPalabras.tokenize(palabra))
+    for palabra in ("cannot", "gimme", "gonna", "gotta", "lemme", "wanna")
+}
+_PATRON_FRAGMENTO = re.compile(r"\S+")
+# Fin de oración seguido de puntuación (el contexto de Punkt, PunktLanguageVars.period_context_re):
+# Punkt puede cortar la oración dentro del fragmento, p. ej. "hello.;" -> "hello." + ";"
+_PATRON_CORTE_INTERNO = re.compile(r"[.?!][?!)\";}\]*:@'({\[]")
+# Fragmentos hechos solo de cierres, que Treebank admite después del punto final
+_PATRON_CIERRES = re.compile(r"[\]\)}>\"'»”’]+")
+
+
+class _PunktMemoizado(PunktTokenizer):
+    """
+    Punkt con memoización de la decisión de corte: text_contains_sentbreak solo depende
+    del contexto del punto (token + siguiente token) y de los parámetros del modelo.
+    """
+
+    @lru_cache(maxsize=65536)
+    def text_contains_sentbreak(self, text):
+        return super().text_contains_sentbreak(text)
+
+
+_punkt = None
+
+
+def _obtenerPunkt():
+    global _punkt
+    if _punkt is None:
+        _punkt = _PunktMemoizado("english")
+    return _punkt
+
+
+def tokenizarNltk(texto):
+    """ Minúsculas + word_tokenize de NLTK (Punkt + Treebank), conservando solo tokens alfabéticos. """
+    return [token for token in word_tokenize(texto.lower()) if token.isalpha()]
+
+
+@lru_cache(maxsize=65536)
+def _tokensFragmento(fragmento, esFinal):
+    """
+    Tokens alfabéticos que Treebank produce para un fragmento sin espacios.
+    El único caso que depende del contexto es el punto final de oración, por eso se
+    indica si el fragmento cierra la oración; si no, se añade un token de relleno.
+    """
+    if esFinal:
+        tokens = _tokenizadorPalabras.tokenize(fragmento)
+    else:
+        tokens = _tokenizadorPalabras.tokenize(fragmento + " x")[:-1]
+    return tuple(token for token in tokens if token.isalpha())
+
+
+def _fragmentosFinales(textoMin):
+    """
+    Índices de los fragmentos (separados por espacios) que cierran una oración según Punkt.
+    Retorna None si algún límite de oración cae dentro de un fragmento, o si la oración
+    termina en un fragmento hecho solo de cierres (p. ej. "end. )"): ahí el punto final
+    depende de los espacios entre el punto y los cierres, y se usa NLTK completo.
+    """
+    coincidencias = list(_PATRON_FRAGMENTO.finditer(textoMin))
+    finesFragmento = {coincidencia.end(): i for i, coincidencia in enumerate(coincidencias)}
+    finales = set()
+    for _, fin in _obtenerPunkt().span_tokenize(textoMin):
+        if fin not in finesFragmento or _PATRON_CIERRES.fullmatch(coincidencias[finesFragmento[fin]].group()):
+            return None
+        finales.add(finesFragmento[fin])
+    return finales
+
+
+def tokenizarRapido(texto):
+    """
+    Tokenizador rápido que produce los mismos tokens que tokenizarNltk.
+
+    Separa el texto por espacios: los fragmentos alfabéticos (la gran mayoría) se
+    aceptan directamente y el resto pasa por Treebank con memoización por fragmento.
+    Punkt solo se ejecuta si hay un punto cuyo tratamiento depende de si cierra una
+    oración, o un fin de oración seguido de puntuación (donde Punkt puede cortar dentro
+    del fragmento); si Punkt corta dentro de un fragmento se usa NLTK completo.
+    """
+    textoMin = texto.lower()
+    fragmentos = textoMin.split()
+    ultimo = len(fragmentos) - 1
+    finales = None
+    tokens = []
+    for i, fragmento in enumerate(fragmentos):
+        if fragmento.isalpha():
+            if fragmento in _CONTRACCIONES:
+                tokens.extend(_CONTRACCIONES[fragmento])
+            else:
+                tokens.append(fragmento)
+            continue
+
+        esFinal = False
+        hayPunto = "." in fragmento
+        if (hayPunto or "?" in fragmento or "!" in fragmento) and (
+            _PATRON_CORTE_INTERNO.search(fragmento) or (
+                hayPunto and i != ultimo and _tokensFragmento(fragmento, True) != _tokensFragmento(fragmento, False)
+            )
+        ):
+            if finales is None:
+                finales = _fragmentosFinales(textoMin)
+                if finales is None:
+                    return tokenizarNltk(texto)
+            esFinal = i in finales
+        elif hayPunto:
+            # El último fragmento siempre cierra la última oración
+            esFinal = i == ultimo
+        tokens.extend(_tokensFragmento(fragmento, esFinal))
+    return tokens
+
+
+def tokenizar(texto, tokenizador="nltk"):
+    """ Minúsculas + tokenización, conservando solo tokens alfabéticos. """
+    if tokenizador == "rapido":
+        return tokenizarRapido(texto)
+    if tokenizador == "nltk":
+        return tokenizarNltk(texto)
+    raise ValueError(f"Tokenizador no soportado: {tokenizador}")
+
+
+def preProcesar(texto, listaStopwords, tokenizador="nltk"):
+    """ Tokenización y eliminación de stopwords para un texto (compartido por los tres modelos). """
+    return [token for token in tokenizar(texto, tokenizador) if token not in listaStopwords]
+
+
+def tokensConPosicion(texto, listaStopwords, tokenizador="nltk"):
+    """
+    Como preProcesar, pero con la posición de cada token contando las stopwords
+    (la misma numeración que el índice posicional, ver classes/positionalindex.py).
+    """
+    return [(token, i) for i, token in enumerate(tokenizar(texto, tokenizador)) if token not in listaStopwords]
+
+
+class FlujoTokens:
+    """
+    Corpus tokenizado una sola vez: vocabulario + IDs de término de cada token.
+
+    Los tokens de todos los documentos se guardan concatenados en un arreglo de enteros
+    y 'inicios' marca dónde empieza cada documento. Como las stopwords dependen de cada
+    modelo, el flujo se construye sin quitarlas y cada modelo lo filtra con filtrarStopwords.
+    """
+
+    def __init__(self, vocabulario, terminos, inicios):
+        self.vocabulario = vocabulario                       # Término -> ID (orden de primera aparición)
+        self.terminos = np.asarray(terminos, dtype=np.int32) # ID de término de cada token
+        self.inicios = np.asarray(inicios, dtype=np.int64)   # Inicio de cada documento (longitud N + 1)
+
+    @property
+    def numDocumentos(self):
+        return len(self.inicios) - 1
+
+    def longitudes(self):
+        """ Número de tokens de cada documento. """
+        return np.diff(self.inicios)
+
+    def documentosPorToken(self):
+        """ ID de documento de cada token (expande 'inicios'). """
+        return np.repeat(np.arange(self.numDocumentos), self.longitudes())
+
+    @classmethod
+    def concatenar(cls, flujos):
+        """
+        Une flujos de particiones consecutivas del corpus en uno solo.
+        Los vocabularios locales se fusionan en orden, así que los IDs globales
+        coinciden con los de tokenizar el corpus completo en una sola pasada.
+        """
+        vocabulario = {}
+        terminos = []
+        inicios = [np.zeros(1, dtype=np.int64)]
+        desplazamiento = 0
+        for flujo in flujos:
+            idGlobal = np.fromiter(
+                (vocabulario.setdefault(termino, len(vocabulario)) for termino in flujo.vocabulario),
+                dtype=np.int32, count=len(flujo.vocabulario)
+            )
+            terminos.append(idGlobal[flujo.terminos])
+            inicios.append(flujo.inicios[1:] + desplazamiento)
+            desplazamiento += len(flujo.terminos)
+        if not terminos:
+            return cls(vocabulario, np.zeros(0, dtype=np.int32), inicios[0])
+        return cls(vocabulario, np.concatenate(terminos), np.concatenate(inicios))
+
+    def filtrarStopwords(self, listaStopwords):
+        """
+        Retorna un nuevo flujo sin las stopwords indicadas. Los IDs se renumeran de forma
+        compacta manteniendo el orden de primera aparición de los términos.
+        """
+        terminosVocabulario = list(self.vocabulario)
+        conservar = np.fromiter(
+            (termino not in listaStopwords for termino in terminosVocabulario),
+            dtype=bool, count=len(terminosVocabulario)
+        )
+        nuevoId = np.cumsum(conservar) - 1
+
+        mascaraTokens = conservar[self.terminos]
+        terminos = nuevoId[self.terminos[mascaraTokens]]
+        longitudes = np.bincount(self.documentosPorToken()[mascaraTokens], minlength=self.numDocumentos)
+        inicios = np.zeros(self.numDocumentos + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=inicios[1:])
+
+        vocabulario = {
+            termino: int(nuevoId[i]) for i, termino in enumerate(terminosVocabulario) if conservar[i]
+        }
+        return FlujoTokens(vocabulario, terminos, inicios)
+
+
+class FrecuenciasCorpus:
+    """
+    Corpus indexado: vocabulario, matriz de frecuencias Documentos x Términos (CSC, int32)
+    y número de tokens de cada documento. Es lo que necesitan los tres modelos para ajustarse;
+    se obtiene de un FlujoTokens o de la ingesta por segmentos (classes/segmentbuilder.py),
+    que no necesita tener el corpus completo en memoria.
+    """
+
+    def __init__(self, vocabulario, matrizFrecuencia, longitudes):
+        self.vocabulario = vocabulario              # Término -> ID (orden de primera aparición)
+        self.matrizFrecuencia = matrizFrecuencia    # MatrizDispersa CSC con f(t, D)
+        self.longitudes = np.asarray(longitudes)    # Tokens de cada documento
+
+    @property
+    def numDocumentos(self):
+        return self.matrizFrecuencia.forma[0]
+
+    @classmethod
+    def desdeFlujo(cls, flujo):
+        # Una tripleta (documento, término, 1) por token; las repetidas se suman en tf
+        matrizFrecuencia = MatrizDispersa.desdeTripletas(
+            flujo.documentosPorToken(), flujo.terminos, (flujo.numDocumentos, len(flujo.vocabulario)),
+            formato="csc", dtype=np.int32
+        )
+        return cls(flujo.vocabulario, matrizFrecuencia, flujo.longitudes())
+
+    def filtrarStopwords(self, listaStopwords):
+        """
+        Igual que FlujoTokens.filtrarStopwords: quita sus columnas y renumera los términos.
+        Si hay algo que quitar, la matriz resultante se copia en RAM aunque la original esté
+        mapeada en memoria (índices y frecuencias, más 8 bytes por posting de temporales).
+        """
+        terminosVocabulario = list(self.vocabulario)
+        conservar = np.fromiter(
+            (termino not in listaStopwords for termino in terminosVocabulario),
+            dtype=bool, count=len(terminosVocabulario)
+        )
+        if conservar.all():
+            return self
+
+        matriz = self.matrizFrecuencia.convertir("csc")
+        quitadas = matriz.seleccionarVectores(np.flatnonzero(~conservar))
+        # Los tokens de las stopwords ya no cuentan en la longitud del documento
+        longitudes = self.longitudes - np.bincount(
+            quitadas.indices, weights=quitadas.data, minlength=self.numDocumentos
+        ).astype(self.longitudes.dtype)
+        vocabulario = {termino: i for i, termino in enumerate(t for t, c in zip(terminosVocabulario, conservar) if c)}
+        return FrecuenciasCorpus(vocabulario, matriz.seleccionarVectores(np.flatnonzero(conservar)), longitudes)
+
+
+def tokenizarCorpus(serieDocumentos, tokenizador="nltk", numProcesos=1):
+    """
+    Tokeniza todo el corpus en una sola pasada y retorna un FlujoTokens.
+    serieDocumentos debe ser la columna 'Answer' del DataFrame (o cualquier iterable de textos).
+    Con numProcesos > 1 el corpus se reparte entre varios procesos (ver tokenizarParalelo);
+    numProcesos=None usa todos los núcleos disponibles.
+    """
+    if numProcesos is None or numProcesos > 1:
+        return tokenizarParalelo(serieDocumentos, tokenizador, numProcesos)
+    vocabulario = {}
+    terminos = array("i")
+    inicios = [0]
+    for texto in serieDocumentos:
+        for token in tokenizar(texto, tokenizador):
+            terminos.append(vocabulario.setdefault(token, len(vocabulario)))
+        inicios.append(len(terminos))
+    return FlujoTokens(vocabulario, np.frombuffer(terminos, dtype=np.int32), inicios)
+
+
+def tokenizarParalelo(serieDocumentos, tokenizador="nltk", numProcesos=None):
+    """
+    Divide el corpus en particiones consecutivas, las tokeniza en un pool de procesos
+    (cada proceso construye su vocabulario y flujo parcial) y las une con FlujoTokens.concatenar.
+    El resultado es idéntico al de tokenizarCorpus con un solo proceso.
+    """
+    textos = list(serieDocumentos)
+    numProcesos = min(numProcesos or os.cpu_count() or 1, max(len(textos), 1))
+    if numProcesos <= 1:
+        return tokenizarCorpus(textos, tokenizador)
+
+    # Varias particiones por proceso para equilibrar la carga entre documentos largos y cortos
+    numParticiones = min(numProcesos * 4, len(textos))
+    limites = np.linspace(0, len(textos), numParticiones + 1).astype(int)
+    particiones = [textos[inicio:fin] for inicio, fin in zip(limites[:-1], limites[1:])]
+    with ProcessPoolExecutor(max_workers=numProcesos) as pool:
+        flujos = list(pool.map(tokenizarCorpus, particiones, [tokenizador] * len(particiones)))
+    return FlujoTokens.concatenar(flujos)
+
+
+def obtenerFlujo(documentos, listaStopwords, tokenizador="nltk", numProcesos=1):
+    """ Acepta textos o un FlujoTokens ya construido y retorna el flujo sin stopwords. """
+    if isinstance(documentos, FlujoTokens):
+        flujo = documentos
+    else:
+        flujo = tokenizarCorpus(documentos, tokenizador, numProcesos)
+    return flujo.filtrarStopwords(listaStopwords)
+
+
+def obtenerFrecuencias(documentos, listaStopwords, tokenizador="nltk", numProcesos=1):
+    """
+    Acepta textos, un FlujoTokens o un FrecuenciasCorpus (p. ej. de la ingesta por
+    segmentos) y retorna las frecuencias del corpus sin stopwords.
+    """
+    if isinstance(documentos, FrecuenciasCorpus):
+        return documentos.filtrarStopwords(listaStopwords)
+    return FrecuenciasCorpus.desdeFlujo(obtenerFlujo(documentos, listaStopwords, tokenizador, numProcesos))
+
+
+def ajustarModelos(serieDocumentos, *modelos, tokenizador=None, numProcesos=1, posiciones=False):
+    """
+    Tokeniza el corpus una sola vez y ajusta con ese flujo todos los modelos indicados.
+    El flujo se tokeniza con el tokenizador de los modelos, que debe ser el mismo en todos
+    (y en 'tokenizador', si se indica). Con posiciones=True cada modelo construye además
+    su índice posicional.
+    """
+    tokenizadores = {modelo.tokenizador for modelo in modelos}
+    if tokenizador is not None:
+        tokenizadores.add(tokenizador)
+    if len(tokenizadores) > 1:
+        raise ValueError(f"Los modelos usan tokenizadores distintos: {sorted(tokenizadores)}")
+    tokenizador = tokenizadores.pop() if tokenizadores else "nltk"
+    flujo = tokenizarCorpus(serieDocumentos, tokenizador, numProcesos)
+    for modelo in modelos:
+        modelo.ajustarCorpus(flujo, posiciones=posiciones)
+    return flujo
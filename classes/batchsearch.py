@@ -0,0 +1,79 @@
+import numpy as np
+from classes.sparsematrix import MatrizDispersa
+from classes.topk import seleccionarTopK
+
+# Máximo de puntuaciones (Consultas x Documentos) que se materializan a la vez
+MAX_ELEMENTOS_BLOQUE = 2 ** 22
+
+
+def matrizConsultas(listaPesos, numTerminos):
+    """
+    Construye la matriz dispersa Consultas x Términos (CSR) a partir del peso de cada
+    término de cada consulta (lista de diccionarios término -> peso).
+    """
+    filas = np.repeat(np.arange(len(listaPesos)), [len(pesos) for pesos in listaPesos])
+    columnas = np.fromiter(
+        (terminoIndex for pesos in listaPesos for terminoIndex in pesos), dtype=np.int64, count=len(filas)
+    )
+    valores = np.fromiter(
+        (peso for pesos in listaPesos for peso in pesos.values()), dtype=float, count=len(filas)
+    )
+    return MatrizDispersa.desdeTripletas(
+        filas, columnas, (len(listaPesos), numTerminos), valores=valores, dtype=float
+    )
+
+
+def seleccionarTopKLote(puntuaciones, k, soloPositivas=False):
+    """
+    seleccionarTopK sobre cada fila de una matriz densa Consultas x Documentos.
+    Las k mejores de todas las filas se separan con un solo argpartition por eje;
+    las filas con empates en el límite (o sin k puntuaciones positivas, si se piden
+    solo positivas) se resuelven con seleccionarTopK para conservar el mismo orden.
+    Retorna una lista con los índices seleccionados de cada fila.
+    """
+    numFilas, numDocumentos = puntuaciones.shape
+    if k <= 0 or numDocumentos == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in range(numFilas)]
+    if k >= numDocumentos:
+        return [seleccionarTopK(fila, k, soloPositivas) for fila in puntuaciones]
+
+    seleccion = np.argpartition(-puntuaciones, k - 1, axis=1)[:, :k]
+    valores = np.take_along_axis(puntuaciones, seleccion, axis=1)
+    umbral = valores.min(axis=1)
+    # Exacta: ningún otro documento empata con el k-ésimo valor
+    exactas = np.count_nonzero(puntuaciones >= umbral[:, None], axis=1) == k
+    if soloPositivas:
+        exactas &= umbral > 0
+
+    # Ordenar las seleccionadas: puntuación descendente, índice ascendente
+    orden = np.lexsort((seleccion, -valores), axis=1)
+    seleccion = np.take_along_axis(seleccion, orden, axis=1)
+    return [
+        seleccion[fila] if exactas[fila] else seleccionarTopK(puntuaciones[fila], k, soloPositivas)
+        for fila in range(numFilas)
+    ]
+
+
+def puntuarLote(matrizDocumentos, listaPesos, maxElementos=MAX_ELEMENTOS_BLOQUE):
+    """
+    Puntúa todas las consultas contra la matriz Documentos x Términos con un producto
+    de matrices dispersas: Puntuaciones = Q . matrizDocumentosᵀ.
+    Las consultas se procesan por bloques para no superar maxElementos puntuaciones en
+    memoria; genera (índice de la primera consulta, puntuaciones densas del bloque).
+    """
+    numDocumentos, numTerminos = matrizDocumentos.forma
+    # La transpuesta de una matriz CSC es CSR sin copiar: cada término es una fila
+    transpuesta = matrizDocumentos.convertir("csc").transpuesta()
+    tamanoBloque = max(1, maxElementos // max(numDocumentos, 1))
+    for inicio in range(0, len(listaPesos), tamanoBloque):
+        consultas = matrizConsultas(listaPesos[inicio:inicio + tamanoBloque], numTerminos)
+        yield inicio, consultas.productoDispersa(transpuesta, densa=True)
+
+
+def buscarTopKLote(matrizDocumentos, listaPesos, k, soloPositivas=False, maxElementos=MAX_ELEMENTOS_BLOQUE):
+    """ Retorna, para cada consulta, (índices, puntuaciones) de sus k mejores documentos. """
+    resultados = []
+    for _, puntuaciones in puntuarLote(matrizDocumentos, listaPesos, maxElementos):
+        for fila, indices in enumerate(seleccionarTopKLote(puntuaciones, k, soloPositivas)):
+            resultados.append((indices, puntuaciones[fila, indices]))
+    return resultados
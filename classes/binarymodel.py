@@ -1,102 +1,134 @@
 import numpy as np
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from classes.analyzer import preProcesar, obtenerFrecuencias, tokensConPosicion
+from classes.sparsematrix import MatrizDispersa
+from classes.booleanindex import IndiceBooleano
+from classes.booleanquery import analizarConsulta
+from classes.positionalindex import IndicePosicional, flujoPosicional
+from classes.topk import seleccionarTopK
 
 class ModeloBinario:
     """
-    Utiliza una matriz de ocurrencia término-documento.
+    Utiliza una matriz de ocurrencia término-documento y, para las consultas booleanas,
+    un índice con bitsets o listas de postings por término (ver classes/booleanindex.py).
     """
 
-    def __init__(self):
+    def __init__(self, tokenizador="nltk"):
         self.vocabulario = {} # Diccionario de término a ID
-        self.matrizOcurrencia = None # Matriz de NumPy (Documentos x Términos)
+        self.matrizOcurrencia = None # Matriz dispersa CSC (Documentos x Términos)
+        self.indiceBooleano = None # Documentos de cada término: bitset o lista de postings
+        self.indicePosicional = None # Posiciones de los términos (opcional, para frases y NEAR/n)
         self.listaDocumentos = [] # Lista de IDs/Índices de documentos
         self.listaStopwords = set(stopwords.words('english'))
+        self.tokenizador = tokenizador # 'nltk' o 'rapido' (ver classes/analyzer.py)
+        self.versionIndice = 0 # Cambia cada vez que se vuelve a ajustar el modelo
+
+    def __setstate__(self, estado):
+        """ Permite cargar modelos serializados con la matriz densa original. """
+        estado.setdefault("tokenizador", "nltk")
+        estado.setdefault("versionIndice", 0)
+        estado.setdefault("indicePosicional", None)
+        self.__dict__.update(estado)
+        if isinstance(self.matrizOcurrencia, np.ndarray):
+            self.matrizOcurrencia = MatrizDispersa.desdeDensa(self.matrizOcurrencia, formato="csc")
+        if estado.get("indiceBooleano") is None and self.matrizOcurrencia is not None:
+            self.indiceBooleano = IndiceBooleano.desdeMatriz(self.matrizOcurrencia)
 
     def preProcesar(self, texto):
         """ Tokenización y eliminación de stopwords para un texto. """
-        # Convertir a minúsculas
-        textoMin = texto.lower()
-        # Tokenizar (NLTK es permitido)
-        tokens = word_tokenize(textoMin)
-        # Filtrar stopwords y tokens no alfabéticos
-        tokensFiltrados = [
-            token for token in tokens
-            if token.isalpha() and token not in self.listaStopwords
-        ]
-        return tokensFiltrados
-
-    def ajustarCorpus(self, serieDocumentos):
+        return preProcesar(texto, self.listaStopwords, self.tokenizador)
+
+    def posicionesFrase(self, texto):
+        """ Tokens sin stopwords con su posición (para las frases entre comillas). """
+        return tokensConPosicion(texto, self.listaStopwords, self.tokenizador)
+
+    def ajustarCorpus(self, serieDocumentos, numProcesos=1, posiciones=False):
         """
         'Ajusta' el modelo al corpus, creando el vocabulario y la matriz.
-        serieDocumentos debe ser la columna 'Answer' del DataFrame.
+        serieDocumentos debe ser la columna 'Answer' del DataFrame, o un FlujoTokens
+        ya tokenizado (ver classes.analyzer) para compartirlo entre modelos, o un
+        FrecuenciasCorpus (p. ej. de la ingesta por segmentos, classes/segmentbuilder.py).
+        numProcesos > 1 reparte la tokenización entre varios procesos (None = todos los núcleos).
+        Con posiciones=True se construye además el índice posicional, para las frases entre
+        comillas y NEAR/n (necesita los textos o un FlujoTokens).
         """
         print("\nIniciando ajuste del Modelo Binario...")
-        documentosTokenizados = []
-        documentoID = 0
-
-        # 1. Generar tokens y vocabulario
-        for texto in serieDocumentos:
-            tokens = self.preProcesar(texto)
-            documentosTokenizados.append(tokens)
-            self.listaDocumentos.append(documentoID) # Usamos el índice de la serie como ID
-            documentoID += 1
-
-            for token in tokens:
-                if token not in self.vocabulario:
-                    # Asignar un ID único a cada término
-                    self.vocabulario[token] = len(self.vocabulario)
-
-        # 2. Crear Matriz de Ocurrencia (Documentos x Términos)
-        numDocs = len(documentosTokenizados)
-        numTerminos = len(self.vocabulario)
-
-        # Inicializar la matriz con ceros
-        self.matrizOcurrencia = np.zeros((numDocs, numTerminos), dtype=np.int8)
-
-        # Llenar la matriz con 1s para indicar presencia
-        for docIndex, tokens in enumerate(documentosTokenizados):
-            for token in tokens:
-                # Obtener el ID del término
-                terminoIndex = self.vocabulario[token]
-                # Marcar presencia (1)
-                self.matrizOcurrencia[docIndex, terminoIndex] = 1
+        if posiciones:
+            serieDocumentos = flujoPosicional(serieDocumentos, self.tokenizador, numProcesos)
+
+        # 1. Generar tokens, vocabulario y frecuencias (una sola pasada, sin stopwords)
+        frecuencias = obtenerFrecuencias(serieDocumentos, self.listaStopwords, self.tokenizador, numProcesos)
+
+        # 2. Crear Matriz de Ocurrencia dispersa (Documentos x Términos)
+        self.indexarFrecuencias(frecuencias)
+        numDocs, numTerminos = self.matrizOcurrencia.forma
+        if posiciones:
+            self.indicePosicional = IndicePosicional.desdeFlujo(serieDocumentos, self.vocabulario)
 
         print(f"Ajuste completado. Documentos: {numDocs}, Términos: {numTerminos}")
         print("Matriz de Ocurrencia (Documentos x Términos):")
         print(self.matrizOcurrencia)
 
-    def buscar(self, consulta, k=3):
+    def indexarFrecuencias(self, frecuencias):
         """
-        Realiza una búsqueda simple (AND) y devuelve los primeros k resultados.
+        Construye la matriz de ocurrencia a partir de un FrecuenciasCorpus ya sin stopwords
+        (sin tokenizar). Lo usan ajustarCorpus y la fusión de segmentos de classes/incrementalindex.py.
         """
-        print(f"\nBuscando: '{consulta}' con límite k={k}")
-        tokensConsulta = self.preProcesar(consulta)
-
-        # Máscara binaria para la relevancia: todos los documentos inicialmente relevantes
-        relevanciaBooleana = np.ones(len(self.listaDocumentos), dtype=bool)
+        self.vocabulario = frecuencias.vocabulario
+        self.listaDocumentos = list(range(frecuencias.numDocumentos)) # Usamos el índice de la serie como ID
+
+        # Mismas celdas que la matriz de frecuencias, con 1 en lugar de f(t, D).
+        # Todas las celdas valen 1: los datos son una vista de un único byte, no un arreglo nnz
+        matrizFrecuencia = frecuencias.matrizFrecuencia
+        self.matrizOcurrencia = MatrizDispersa(
+            matrizFrecuencia.indptr, matrizFrecuencia.indices, np.broadcast_to(np.int8(1), (matrizFrecuencia.nnz,)),
+            (frecuencias.numDocumentos, len(self.vocabulario)), formato="csc"
+        )
+        self.indiceBooleano = IndiceBooleano.desdeMatriz(self.matrizOcurrencia)
+        # Las frecuencias no tienen el orden de los tokens: ajustarCorpus lo reconstruye si se pide
+        self.indicePosicional = None
+        self.versionIndice += 1
+
+    def claveConsulta(self, consulta, modo="booleano"):
+        """
+        Clave de la consulta para la caché: el árbol booleano normalizado (el orden de NOT
+        importa) o, en modo 'coordinacion', los tokens sin repetir.
+        """
+        if modo == "coordinacion":
+            return (modo, tuple(sorted(set(self.preProcesar(consulta)))))
+        return analizarConsulta(consulta, self.preProcesar, self.posicionesFrase)
 
-        terminosNoEncontrados = []
+    def buscar(self, consulta, k=3, modo="booleano"):
+        """
+        Realiza una búsqueda booleana y devuelve los primeros k resultados.
+        Admite AND, OR y NOT (en mayúsculas) y paréntesis, p. ej. "cancer AND (skin OR breast) NOT treatment";
+        los términos sin operador se unen con AND. Con índice posicional (ajustarCorpus con
+        posiciones=True) admite también frases entre comillas y "a NEAR/n b".
+
+        modo:
+            'booleano' devuelve los IDs de los primeros k documentos que cumplen la consulta.
+            'coordinacion' ranquea por número de términos de la consulta presentes
+            (ver buscarCoordinacion) y devuelve (ID, coincidencias).
+        """
+        if modo == "coordinacion":
+            return self.buscarCoordinacion(consulta, k)
+        if modo != "booleano":
+            raise ValueError(f"Modo de búsqueda no soportado: {modo}")
 
-        # 1. Aplicar la lógica AND para cada término de la consulta
-        for token in tokensConsulta:
-            if token in self.vocabulario:
-                terminoIndex = self.vocabulario[token]
-                vectorTermino = self.matrizOcurrencia[:, terminoIndex]
+        print(f"\nBuscando: '{consulta}' con límite k={k}")
+        arbol = analizarConsulta(consulta, self.preProcesar, self.posicionesFrase)
 
-                # Operación AND
-                relevanciaBooleana = relevanciaBooleana & (vectorTermino == 1)
-            else:
-                terminosNoEncontrados.append(token)
-                relevanciaBooleana[:] = False
-                break
+        # 1. Evaluar la consulta con operaciones de conjuntos sobre bitsets y listas de postings
+        # (una consulta sin términos devuelve todos los documentos)
+        relevantes = self.indiceBooleano.evaluar(arbol, self.vocabulario, self.indicePosicional)
 
         # 2. Obtener los índices de los documentos relevantes
-        indicesRelevantes = np.where(relevanciaBooleana)[0]
+        indicesRelevantes = relevantes.comoLista()
 
         # 3. Aplicar el límite k
         # Como es un modelo binario, no hay ranking, simplemente tomamos los primeros 'k'
-        indicesLimitados = indicesRelevantes[:k]
+        # Se retornan los IDs de documento (tras una fusión incremental la fila no siempre es el ID)
+        indicesLimitados = np.array([self.listaDocumentos[i] for i in indicesRelevantes[:k]], dtype=np.int64)
 
         if len(indicesRelevantes) == 0:
             print("No se encontraron documentos relevantes.")
@@ -105,4 +137,26 @@ class ModeloBinario:
         print(f"Documentos relevantes encontrados (total): {len(indicesRelevantes)}")
         print(f"Documentos retornados (top k={k}): {len(indicesLimitados)}")
         print(f"Top {k} resultados encontrados (ID):")
-        return indicesLimitados
\ No newline at end of file
+        return indicesLimitados
+
+    def buscarCoordinacion(self, consulta, k=3):
+        """
+        Ranking por coincidencia de coordinación: la puntuación de un documento es el número
+        de términos distintos de la consulta que contiene. Los operadores se tratan como
+        palabras (stopwords) y los términos fuera del vocabulario no descartan la consulta,
+        así las preguntas largas en lenguaje natural (p. ej. las de los Qrels) dan resultados.
+        Retorna (ID, coincidencias) de los k mejores; los empates quedan en orden de documento.
+        """
+        print(f"\nBuscando (coordinación): '{consulta}' con límite k={k}")
+        terminos = sorted({self.vocabulario[token] for token in self.preProcesar(consulta) if token in self.vocabulario})
+
+        # Conteo de coincidencias por documento sumando los bitsets y las listas de postings
+        conteos = self.indiceBooleano.contarCoincidencias(terminos)
+        topKIndices = seleccionarTopK(conteos, k, soloPositivas=True)
+
+        if len(topKIndices) == 0:
+            print("No se encontraron documentos relevantes.")
+            return []
+
+        print(f"Top {k} resultados encontrados (ID, Coincidencias):")
+        return [(self.listaDocumentos[i], int(conteos[i])) for i in topKIndices]
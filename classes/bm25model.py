@@ -1,6 +1,13 @@
 import numpy as np
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from classes.analyzer import preProcesar, obtenerFrecuencias, tokensConPosicion
+from classes.sparsematrix import MatrizDispersa
+from classes.invertedindex import IndiceInvertido
+from classes.dynamicpruning import CursorPostings, CursorComprimido, recuperarTopK
+from classes.topk import seleccionarTopK
+from classes.batchsearch import buscarTopKLote
+from classes.booleanquery import analizarConsulta, restriccionesPosicionales
+from classes.positionalindex import IndicePosicional, flujoPosicional
 
 # Definición de la clase BM25
 
@@ -9,113 +16,281 @@ class ModeloBM25:
     Implementación del Modelo de Ranking BM25 utilizando solo NumPy.
     """
 
-    def __init__(self, k1=1.2, b=0.75, idioma='spanish'):
-        self.k1 = k1                       # Parámetro de ajuste de saturación de TF
-        self.b = b                         # Parámetro de ajuste de normalización por longitud
+    def __init__(self, k1=1.2, b=0.75, idioma='spanish', tokenizador="nltk"):
+        self._k1 = k1                      # Parámetro de ajuste de saturación de TF
+        self._b = b                        # Parámetro de ajuste de normalización por longitud
         self.vocabulario = {}              # Término a ID (índice de columna)
         self.listaStopwords = set(stopwords.words(idioma))
+        self.tokenizador = tokenizador     # 'nltk' o 'rapido' (ver classes/analyzer.py)
         self.listaDocumentos = []          # Lista de IDs/Índices de documentos
-        self.matrizFrecuencia = None       # Matriz de NumPy (Documentos x Términos)
+        self.matrizFrecuencia = None       # Matriz dispersa CSC (Documentos x Términos)
+        self.indiceInvertido = None        # Término -> postings (comparte arreglos con matrizFrecuencia)
         self.vectorLongitudDocumento = None# Vector con la longitud de cada documento |D|
         self.longitudPromedio = 0.0        # Longitud promedio de los documentos avgdl
         self.vectorIdf = None              # Vector de NumPy con los pesos IDF de BM25
+        self.vectorNormalizacion = None    # k1 * (1 - b + b * |D| / avgdl) precalculado por documento
+        self.precalcularImpactos = False   # Guardar la contribución de cada posting en el índice
+        self.bitsImpacto = 8               # Bits por impacto cuantizado (None = sin cuantizar)
+        self.comprimirPostings = False     # Guardar las postings solo comprimidas por bloques
+        self.estadisticasBusqueda = {}     # Postings evaluados / omitidos en la última búsqueda
+        self.indicePosicional = None       # Posiciones de los términos (opcional, para frases y NEAR/n)
+        self.versionIndice = 0             # Cambia cada vez que cambian las puntuaciones (ajuste, k1, b)
+
+    def __setstate__(self, estado):
+        """ Permite cargar modelos serializados con versiones anteriores de la clase. """
+        # k1 y b ahora son propiedades que recalculan los impactos
+        for parametro in ("k1", "b"):
+            if parametro in estado:
+                estado["_" + parametro] = estado.pop(parametro)
+        estado.setdefault("precalcularImpactos", False)
+        estado.setdefault("bitsImpacto", 8)
+        estado.setdefault("comprimirPostings", False)
+        estado.setdefault("vectorNormalizacion", None)
+        estado.setdefault("tokenizador", "nltk")
+        estado.setdefault("versionIndice", 0)
+        estado.setdefault("indicePosicional", None)
+        self.__dict__.update(estado)
+
+        if isinstance(self.matrizFrecuencia, np.ndarray):
+            self.matrizFrecuencia = MatrizDispersa.desdeDensa(self.matrizFrecuencia, formato="csc")
+        if getattr(self, "indiceInvertido", None) is None and self.matrizFrecuencia is not None:
+            self.indiceInvertido = IndiceInvertido.desdeMatriz(self.matrizFrecuencia)
+        if self.vectorNormalizacion is None and self.indiceInvertido is not None:
+            self.calcularImpactos()
+        self.estadisticasBusqueda = {}
+
+    # --- Parámetros ---
+    # Cambiar k1 o b recalcula la normalización, los impactos y las cotas
+    # a partir de las frecuencias ya indexadas, sin volver a ajustar el corpus.
+
+    @property
+    def k1(self):
+        return self._k1
+
+    @k1.setter
+    def k1(self, valor):
+        self._k1 = valor
+        self.calcularImpactos()
+
+    @property
+    def b(self):
+        return self._b
+
+    @b.setter
+    def b(self, valor):
+        self._b = valor
+        self.calcularImpactos()
 
     def preProcesar(self, texto):
         """ Tokenización y eliminación de stopwords. """
-        textoMin = texto.lower()
-        tokens = word_tokenize(textoMin)
-        tokensFiltrados = [
-            token for token in tokens
-            if token.isalpha() and token not in self.listaStopwords
-        ]
-        return tokensFiltrados
+        return preProcesar(texto, self.listaStopwords, self.tokenizador)
+
+    def posicionesFrase(self, texto):
+        """ Tokens sin stopwords con su posición (para las frases entre comillas). """
+        return tokensConPosicion(texto, self.listaStopwords, self.tokenizador)
+
+    def restriccionesConsulta(self, consulta):
+        """ Frases entre comillas y NEAR/n de la consulta (ninguna si no hay índice posicional). """
+        if self.indicePosicional is None:
+            return ()
+        return restriccionesPosicionales(analizarConsulta(consulta, self.preProcesar, self.posicionesFrase))
 
     # --- Ajuste (Fit) del Modelo ---
 
-    def ajustarCorpus(self, serieDocumentos):
+    def ajustarCorpus(self, serieDocumentos, precalcularImpactos=False, bitsImpacto=8, numProcesos=1, posiciones=False,
+                      comprimirPostings=False):
         """
         Crea el vocabulario, calcula las longitudes de documento, IDF,
         y la matriz de frecuencia necesaria para la puntuación.
+        serieDocumentos puede ser un FlujoTokens ya tokenizado o un FrecuenciasCorpus
+        (ver classes.analyzer y la ingesta por segmentos en classes/segmentbuilder.py).
+        numProcesos > 1 reparte la tokenización entre varios procesos (None = todos los núcleos).
+
+        Con precalcularImpactos=True se guarda en el índice la contribución
+        idf x tf saturada de cada posting, cuantizada a 'bitsImpacto' bits
+        (None la guarda sin cuantizar), y la búsqueda solo acumula impactos.
+
+        Con posiciones=True se construye además el índice posicional, para las frases entre
+        comillas y NEAR/n (necesita los textos o un FlujoTokens).
+
+        Con comprimirPostings=True las postings se guardan comprimidas por bloques de 128
+        (diferencias de IDs y frame-of-reference, ver classes/compressedpostings.py) y la
+        matriz de frecuencias sin comprimir no se conserva.
         """
         print("\nIniciando ajuste del Modelo BM25...")
+        self.precalcularImpactos = precalcularImpactos
+        self.bitsImpacto = bitsImpacto
+        self.comprimirPostings = comprimirPostings
+        if posiciones:
+            serieDocumentos = flujoPosicional(serieDocumentos, self.tokenizador, numProcesos)
 
-        documentosTokenizados = []
-        longitudes = []
+        # 1. Tokenizar, generar vocabulario y calcular longitudes (una sola pasada)
+        frecuencias = obtenerFrecuencias(serieDocumentos, self.listaStopwords, self.tokenizador, numProcesos)
+        self.indexarFrecuencias(frecuencias)
+        numTerminos = len(self.vocabulario)
+        if posiciones:
+            self.indicePosicional = IndicePosicional.desdeFlujo(serieDocumentos, self.vocabulario)
 
-        # 1. Tokenizar, generar vocabulario y calcular longitudes
-        for docId, texto in enumerate(serieDocumentos):
-            tokens = self.preProcesar(texto)
-            documentosTokenizados.append(tokens)
-            longitudes.append(len(tokens))
-            self.listaDocumentos.append(docId)
-            for token in tokens:
-                if token not in self.vocabulario:
-                    self.vocabulario[token] = len(self.vocabulario)
+        print(f"Ajuste completado. Documentos: {self.numDocumentos}, Términos: {numTerminos}")
+        print(f"Longitud Promedio (avgdl): {self.longitudPromedio:.2f}")
+        if self.comprimirPostings:
+            comprimidas = self.indiceInvertido.comprimidas
+            print(f"Postings comprimidas: {comprimidas.nbytes} bytes ({comprimidas.bytesSinComprimir} sin comprimir)")
+
+    def indexarFrecuencias(self, frecuencias):
+        """
+        Construye el índice a partir de un FrecuenciasCorpus ya sin stopwords (sin tokenizar):
+        longitudes, matriz de frecuencias, IDF, normalización e impactos.
+        Lo usan ajustarCorpus y la fusión de segmentos de classes/incrementalindex.py.
+        """
+        self.vocabulario = frecuencias.vocabulario
+        self.listaDocumentos = list(range(frecuencias.numDocumentos))
 
-        self.vectorLongitudDocumento = np.array(longitudes, dtype=float)
+        self.vectorLongitudDocumento = frecuencias.longitudes.astype(float)
         self.numDocumentos = len(self.listaDocumentos)
         self.longitudPromedio = np.mean(self.vectorLongitudDocumento)
-        numTerminos = len(self.vocabulario)
 
-        # 2. Crear Matriz de Frecuencia de Término (Count Matrix)
-        self.matrizFrecuencia = np.zeros((self.numDocumentos, numTerminos), dtype=np.int32)
-        for docIndex, tokens in enumerate(documentosTokenizados):
-            for token in tokens:
-                if token in self.vocabulario:
-                    terminoIndex = self.vocabulario[token]
-                    self.matrizFrecuencia[docIndex, terminoIndex] += 1
+        # Matriz de Frecuencia de Término dispersa (Count Matrix)
+        self.matrizFrecuencia = frecuencias.matrizFrecuencia
+        self.indiceInvertido = IndiceInvertido.desdeMatriz(self.matrizFrecuencia)
 
-        # 3. Calcular IDF (Específico de BM25)
+        # Calcular IDF (Específico de BM25)
         # BM25 IDF: log( (N - df_t + 0.5) / (df_t + 0.5) )
-        documentosConTermino = np.sum(self.matrizFrecuencia > 0, axis=0) # df_t
-        N = self.numDocumentos
+        documentosConTermino = self.matrizFrecuencia.conteoPorColumna() # df_t
+        self.vectorIdf = self.formulaIdf(self.numDocumentos, documentosConTermino)
 
-        # Uso de NumPy para aplicar la fórmula a todos los términos
-        self.vectorIdf = np.log((N - documentosConTermino + 0.5) / (documentosConTermino + 0.5))
+        # Normalización por documento, impactos y cotas para WAND / Block-Max WAND
+        self.calcularImpactos()
+        if self.comprimirPostings:
+            # La matriz de frecuencias comparte los arreglos del índice: solo quedan las postings comprimidas
+            self.indiceInvertido.comprimir()
+            self.matrizFrecuencia = None
+        # Las frecuencias no tienen el orden de los tokens: ajustarCorpus lo reconstruye si se pide
+        self.indicePosicional = None
 
-        print(f"Ajuste completado. Documentos: {self.numDocumentos}, Términos: {numTerminos}")
-        print(f"Longitud Promedio (avgdl): {self.longitudPromedio:.2f}")
+    @staticmethod
+    def formulaIdf(numDocumentos, documentosConTermino):
+        """ IDF de BM25 para un vector de df_t (uso de NumPy para todos los términos a la vez). """
+        return np.log((numDocumentos - documentosConTermino + 0.5) / (documentosConTermino + 0.5))
+
+    def contribucionesPostings(self, documentos, frecuencias):
+        """ Contribución BM25 (idf x tf saturada) de cada posting del índice (ver IndiceInvertido.arreglos). """
+        terminos = self.indiceInvertido.terminosPorPosting()
+        normalizacionDoc = self.vectorNormalizacion[documentos]
+        return self.vectorIdf[terminos] * (frecuencias * (self.k1 + 1) / (frecuencias + normalizacionDoc))
+
+    def calcularImpactos(self, tamanoBloque=128):
+        """
+        Precalcula la normalización por longitud de cada documento, los impactos
+        cuantizados (si están activados) y las cotas por término y por bloque.
+        Se usa al ajustar el corpus y cada vez que cambian k1 o b.
+        """
+        if getattr(self, "indiceInvertido", None) is None:
+            return
 
+        # Normalización por longitud (B): k1 * (1 - b + b * (|D| / avgdl))
+        self.vectorNormalizacion = self.k1 * (
+            (1 - self.b) + self.b * (self.vectorLongitudDocumento / self.longitudPromedio)
+        )
+
+        contribuciones = self.contribucionesPostings(*self.indiceInvertido.arreglos())
+        if self.precalcularImpactos:
+            self.indiceInvertido.cuantizarImpactos(contribuciones, self.bitsImpacto)
+            # Las cotas deben acotar las puntuaciones que realmente se acumulan
+            contribuciones = self.indiceInvertido.impactosDecuantizados()
+        else:
+            self.indiceInvertido.impactos = None
+            self.indiceInvertido.escalaImpactos = 1.0
+        self.indiceInvertido.calcularCotas(contribuciones, tamanoBloque)
+        self.versionIndice = getattr(self, "versionIndice", 0) + 1
 
     # --- Búsqueda (Search) del Modelo ---
 
-    def buscar(self, consulta, k=3):
+    def buscar(self, consulta, k=3, modo="exhaustivo"):
         """
         Calcula las puntuaciones BM25 para la consulta y ranquea los documentos.
+
+        modo:
+            'exhaustivo' puntúa todos los postings de los términos de la consulta.
+            'wand' y 'bmw' (Block-Max WAND) usan cotas superiores para saltar los
+            postings que no pueden entrar en el top-k. Los postings evaluados y
+            omitidos quedan en self.estadisticasBusqueda.
+
+        Con índice posicional, las frases entre comillas y "a NEAR/n b" filtran los documentos:
+        solo entran en el ranking (puntuados con todos los términos) los que las cumplen.
         """
         print(f"\nBuscando (BM25): '{consulta}'")
         tokensConsulta = self.preProcesar(consulta)
-        puntuaciones = np.zeros(self.numDocumentos, dtype=float)
+        if modo not in ("exhaustivo", "wand", "bmw"):
+            raise ValueError(f"Modo de búsqueda no soportado: {modo}")
 
-        # Normalización por longitud (B): k1 * (1 - b + b * (|D| / avgdl))
-        normalizacionDoc = self.k1 * (
-            (1 - self.b) + self.b * (self.vectorLongitudDocumento / self.longitudPromedio)
-        )
+        # Documentos que cumplen las frases / NEAR/n: se intersectan las postings y solo
+        # después se comparan posiciones. Con filtro se puntúa de forma exhaustiva
+        restricciones = self.restriccionesConsulta(consulta)
+        permitidos = None
+        if restricciones:
+            permitidos = self.indicePosicional.documentosRestricciones(restricciones, self.vocabulario)
+            if len(permitidos) == 0:
+                print("No se encontraron documentos relevantes.")
+                return []
+        elif modo in ("wand", "bmw"):
+            return self.buscarConPoda(tokensConsulta, k, usarBloques=(modo == "bmw"))
 
+        # Puntuación término a término (term-at-a-time) sobre las listas de postings:
+        # solo se visitan los documentos que contienen algún término de la consulta.
+        usaImpactos = self.indiceInvertido.impactos is not None
+        listasDocumentos = []
+        listasContribuciones = []
         for token in tokensConsulta:
             if token in self.vocabulario:
                 terminoIndex = self.vocabulario[token]
-                # Obtener la columna de IDF y la columna de frecuencia (tf)
                 idfTermino = self.vectorIdf[terminoIndex]
-                frecuenciasTermino = self.matrizFrecuencia[:, terminoIndex] # f(t_i, D)
 
-                # Expresión del numerador de la fórmula: f(t_i, D) * (k1 + 1)
-                numerador = frecuenciasTermino * (self.k1 + 1)
+                # Solo sumamos para los términos que tienen un IDF positivo (términos relevantes)
+                if idfTermino <= 0:
+                    continue
+
+                if usaImpactos:
+                    # Impactos precalculados: solo hay que acumularlos
+                    documentosTermino, impactosTermino = self.indiceInvertido.postingsImpacto(terminoIndex)
+                    listasDocumentos.append(documentosTermino)
+                    listasContribuciones.append(impactosTermino)
+                    continue
 
-                # Expresión del denominador: f(t_i, D) + Normalización por longitud
+                # Postings del término: documentos que lo contienen y su f(t_i, D)
+                documentosTermino, frecuenciasTermino = self.indiceInvertido.postings(terminoIndex)
+                normalizacionDoc = self.vectorNormalizacion[documentosTermino]
+
+                # IDF * f(t_i, D) * (k1 + 1) / (f(t_i, D) + Normalización por longitud)
+                numerador = frecuenciasTermino * (self.k1 + 1)
                 denominador = frecuenciasTermino + normalizacionDoc
+                listasDocumentos.append(documentosTermino)
+                listasContribuciones.append(idfTermino * (numerador / denominador))
 
-                # Acumular puntuaciones (IDF * Factor de saturación/normalización)
-                # Solo sumamos para los términos que tienen un IDF positivo (términos relevantes)
-                if idfTermino > 0:
-                    puntuaciones += idfTermino * (numerador / denominador)
+        postingsEvaluados = sum(len(documentos) for documentos in listasDocumentos)
+        self.estadisticasBusqueda = {
+            "postingsTotales": postingsEvaluados,
+            "postingsEvaluados": postingsEvaluados,
+            "postingsOmitidos": 0,
+        }
+
+        if not listasDocumentos:
+            print("No se encontraron documentos relevantes.")
+            return []
 
-        # 1. Obtener los índices de los documentos ordenados por puntuación (descendente)
-        indicesOrdenados = np.argsort(puntuaciones)[::-1]
+        # Acumular las contribuciones por documento candidato
+        candidatos, posiciones = np.unique(np.concatenate(listasDocumentos), return_inverse=True)
+        puntuaciones = np.bincount(posiciones, weights=np.concatenate(listasContribuciones))
+        if usaImpactos:
+            puntuaciones *= self.indiceInvertido.escalaImpactos
+        if permitidos is not None:
+            mascara = np.isin(candidatos, permitidos, assume_unique=True)
+            candidatos, puntuaciones = candidatos[mascara], puntuaciones[mascara]
 
-        # 2. Seleccionar los top K documentos con puntuaciones > 0
-        topKIndices = [i for i in indicesOrdenados if puntuaciones[i] > 0][:k]
-        topKScores = puntuaciones[topKIndices]
+        # Seleccionar los top K candidatos con puntuaciones > 0 (ordenados, descendente)
+        indicesOrdenados = seleccionarTopK(puntuaciones, k, soloPositivas=True)
+        topKIndices = candidatos[indicesOrdenados]
+        topKScores = puntuaciones[indicesOrdenados]
 
         if len(topKIndices) == 0:
             print("No se encontraron documentos relevantes.")
@@ -124,4 +299,123 @@ class ModeloBM25:
         resultados = [(self.listaDocumentos[i], topKScores[idx]) for idx, i in enumerate(topKIndices)]
 
         print(f"Top {k} resultados encontrados (ID, Puntuación BM25):")
-        return resultados
\ No newline at end of file
+        return resultados
+
+    def buscarLote(self, consultas, k=3):
+        """
+        Busca varias consultas a la vez y retorna, para cada una, la misma lista de
+        (ID, puntuación) que buscar en modo exhaustivo.
+
+        Las consultas forman una matriz dispersa Consultas x Términos (peso = repeticiones
+        del término) que se multiplica por la matriz de contribuciones de los postings,
+        puntuando todas las consultas de un bloque en un solo producto de matrices.
+        """
+        # Las consultas repetidas se preprocesan una sola vez
+        pesosPorConsulta = {consulta: None for consulta in consultas}
+        for consulta in pesosPorConsulta:
+            pesosPorConsulta[consulta] = self.pesosConsulta(self.preProcesar(consulta))
+        listaPesos = [pesosPorConsulta[consulta] for consulta in consultas]
+
+        # Con postings comprimidas se descomprimen todas: el producto recorre el índice completo
+        documentos, frecuencias = self.indiceInvertido.arreglos()
+        usaImpactos = self.indiceInvertido.impactos is not None
+        if usaImpactos:
+            contribuciones = self.indiceInvertido.impactos
+            escala = self.indiceInvertido.escalaImpactos
+        else:
+            contribuciones = self.contribucionesPostings(documentos, frecuencias)
+            escala = 1.0
+        matrizContribuciones = MatrizDispersa(
+            self.indiceInvertido.inicios, documentos, contribuciones,
+            (self.indiceInvertido.numDocumentos, self.indiceInvertido.numTerminos), formato="csc"
+        )
+
+        return [
+            [(self.listaDocumentos[i], puntuacion * escala) for i, puntuacion in zip(indices, puntuaciones)]
+            for indices, puntuaciones in buscarTopKLote(matrizContribuciones, listaPesos, k, soloPositivas=True)
+        ]
+
+    def buscarConPoda(self, tokensConsulta, k, usarBloques=True):
+        """
+        Recuperación top-k con WAND / Block-Max WAND sobre el índice invertido.
+        Los términos repetidos en la consulta se agrupan multiplicando su peso.
+        Con postings comprimidas cada cursor decodifica solo los bloques en los que se detiene.
+        """
+        cursores = []
+        comprimidas = self.indiceInvertido.comprimidas
+        for terminoIndex, peso in self.pesosConsulta(tokensConsulta).items():
+            ultimoDocBloque, maximoBloque = self.indiceInvertido.bloques(terminoIndex)
+            argumentos = (
+                self._crearPuntuador(terminoIndex, peso),
+                peso * self.indiceInvertido.maximoTermino[terminoIndex],
+                ultimoDocBloque,
+                peso * maximoBloque,
+            )
+            if comprimidas is not None:
+                cursores.append(CursorComprimido(comprimidas, terminoIndex, *argumentos))
+            else:
+                cursores.append(CursorPostings(*self.indiceInvertido.postings(terminoIndex), *argumentos))
+
+        topK, self.estadisticasBusqueda = recuperarTopK(cursores, k, usarBloques)
+        print(
+            f"Postings evaluados: {self.estadisticasBusqueda['postingsEvaluados']} | "
+            f"omitidos: {self.estadisticasBusqueda['postingsOmitidos']}"
+        )
+
+        if len(topK) == 0:
+            print("No se encontraron documentos relevantes.")
+            return []
+
+        resultados = [(self.listaDocumentos[i], puntuacion) for i, puntuacion in topK]
+        print(f"Top {k} resultados encontrados (ID, Puntuación BM25):")
+        return resultados
+
+    def pesosConsulta(self, tokensConsulta):
+        """ Peso de cada término de la consulta = número de veces que aparece (solo IDF positivo). """
+        pesos = {}
+        for token in tokensConsulta:
+            if token in self.vocabulario and self.vectorIdf[self.vocabulario[token]] > 0:
+                terminoIndex = self.vocabulario[token]
+                pesos[terminoIndex] = pesos.get(terminoIndex, 0) + 1
+        return pesos
+
+    def contribucionTermino(self, terminoIndex):
+        """
+        Retorna (IDs de documento, contribución BM25) de los postings de un término.
+        Con impactos precalculados la contribución se da en unidades de impacto (enteros),
+        como en la búsqueda exhaustiva, y resultadosAcumulados aplica la escala.
+        """
+        if self.indiceInvertido.impactos is not None:
+            documentosTermino, impactosTermino = self.indiceInvertido.postingsImpacto(terminoIndex)
+            return documentosTermino, impactosTermino.astype(float)
+
+        documentosTermino, frecuenciasTermino = self.indiceInvertido.postings(terminoIndex)
+        normalizacionDoc = self.vectorNormalizacion[documentosTermino]
+        saturada = frecuenciasTermino * (self.k1 + 1) / (frecuenciasTermino + normalizacionDoc)
+        return documentosTermino, self.vectorIdf[terminoIndex] * saturada
+
+    def resultadosAcumulados(self, puntuaciones, pesos, k):
+        """
+        Top-k a partir de las puntuaciones ya acumuladas de todos los documentos
+        (suma de peso x contribucionTermino, ver classes/incrementalsearch.py).
+        """
+        topKIndices = seleccionarTopK(puntuaciones, k, soloPositivas=True)
+        escala = self.indiceInvertido.escalaImpactos if self.indiceInvertido.impactos is not None else 1.0
+        return [(self.listaDocumentos[i], puntuaciones[i] * escala) for i in topKIndices]
+
+    def _crearPuntuador(self, terminoIndex, peso):
+        """ Retorna una función que calcula la contribución BM25 de un posting (posición, documento y frecuencia). """
+        if self.indiceInvertido.impactos is not None:
+            # Con impactos precalculados la contribución ya está guardada en el posting
+            impactosTermino = self.indiceInvertido.impactosTermino(terminoIndex)
+            escala = self.indiceInvertido.escalaImpactos
+            return lambda posicion, doc, frecuencia: peso * (impactosTermino[posicion] * escala)
+
+        pesoIdf = peso * self.vectorIdf[terminoIndex]
+        k1 = self.k1
+        normalizacion = self.vectorNormalizacion
+
+        def puntuar(posicion, doc, frecuencia):
+            return pesoIdf * (frecuencia * (k1 + 1) / (frecuencia + normalizacion[doc]))
+
+        return puntuar
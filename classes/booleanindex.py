@@ -0,0 +1,272 @@
+import numpy as np
+from classes.booleanquery import tokensHoja
+
+# Un término se guarda como bitset si df > numDocumentos * DENSIDAD_BITSET:
+# a partir de N / 32 documentos el bitset (N bits) ocupa menos que la lista de IDs int32
+DENSIDAD_BITSET = 1 / 32
+_TIPO_PALABRA = np.dtype("<u8")   # 64 documentos por palabra; el documento i es el bit i % 64
+
+
+def _numPalabras(numDocumentos):
+    return -(-numDocumentos // 64)
+
+
+def empaquetar(documentos, numDocumentos):
+    """ Bitset (uint64) con los documentos indicados. """
+    mascara = np.zeros(_numPalabras(numDocumentos) * 64, dtype=bool)
+    mascara[documentos] = True
+    return np.packbits(mascara, bitorder="little").view(_TIPO_PALABRA)
+
+
+def desempaquetarBits(bits, numDocumentos):
+    """ Un 0 / 1 (uint8) por documento. """
+    return np.unpackbits(bits.view(np.uint8), bitorder="little")[:numDocumentos]
+
+
+def desempaquetar(bits, numDocumentos):
+    """ Filas (ordenadas) de los documentos presentes en el bitset. """
+    return np.flatnonzero(desempaquetarBits(bits, numDocumentos))
+
+
+class ConjuntoDocumentos:
+    """
+    Conjunto de filas de documentos, en una de dos representaciones según su densidad:
+    - documentos: arreglo ordenado de filas (conjuntos pequeños)
+    - bits: bitset empaquetado de 64 documentos por palabra uint64 (conjuntos grandes)
+    Cada operación elige el algoritmo según la representación de los operandos:
+    bitset con bitset opera palabra a palabra, lista con bitset consulta los bits de la
+    lista y lista con lista usa búsqueda binaria de la menor en la mayor.
+    """
+
+    __slots__ = ("numDocumentos", "documentos", "bits")
+
+    def __init__(self, numDocumentos, documentos=None, bits=None):
+        self.numDocumentos = numDocumentos
+        self.documentos = documentos
+        self.bits = bits
+
+    @classmethod
+    def vacio(cls, numDocumentos):
+        return cls(numDocumentos, documentos=np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def todos(cls, numDocumentos):
+        bits = np.full(_numPalabras(numDocumentos), np.iinfo(np.uint64).max, dtype=_TIPO_PALABRA)
+        if numDocumentos % 64:
+            bits[-1] = (1 << (numDocumentos % 64)) - 1
+        return cls(numDocumentos, bits=bits)
+
+    @property
+    def cardinalidad(self):
+        if self.documentos is not None:
+            return len(self.documentos)
+        return int(np.bitwise_count(self.bits).sum())
+
+    def estaVacio(self):
+        if self.documentos is not None:
+            return len(self.documentos) == 0
+        return not self.bits.any()
+
+    def comoBits(self):
+        if self.bits is None:
+            self.bits = empaquetar(self.documentos, self.numDocumentos)
+        return self.bits
+
+    def comoLista(self):
+        if self.documentos is None:
+            self.documentos = desempaquetar(self.bits, self.numDocumentos)
+        return self.documentos
+
+    def contiene(self, filas):
+        """ Máscara: qué filas (arreglo) pertenecen al conjunto. """
+        filas = np.asarray(filas, dtype=np.int64)
+        if self.documentos is not None:
+            if len(self.documentos) == 0:
+                return np.zeros(len(filas), dtype=bool)
+            posiciones = np.minimum(np.searchsorted(self.documentos, filas), len(self.documentos) - 1)
+            return self.documentos[posiciones] == filas
+        palabras = self.bits[filas >> 6]
+        return ((palabras >> (filas & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def interseccion(self, otro):
+        if self.documentos is None and otro.documentos is None:
+            return ConjuntoDocumentos(self.numDocumentos, bits=self.bits & otro.bits)
+        # Se recorre la lista más corta y se consulta en el otro conjunto
+        if self.documentos is None or (otro.documentos is not None and len(otro.documentos) < len(self.documentos)):
+            self, otro = otro, self
+        return ConjuntoDocumentos(self.numDocumentos, documentos=self.documentos[otro.contiene(self.documentos)])
+
+    def union(self, otro):
+        if self.documentos is not None and otro.documentos is not None:
+            return ConjuntoDocumentos(self.numDocumentos, documentos=np.union1d(self.documentos, otro.documentos))
+        return ConjuntoDocumentos(self.numDocumentos, bits=self.comoBits() | otro.comoBits())
+
+    def diferencia(self, otro):
+        if self.documentos is not None:
+            return ConjuntoDocumentos(self.numDocumentos, documentos=self.documentos[~otro.contiene(self.documentos)])
+        return ConjuntoDocumentos(self.numDocumentos, bits=self.bits & ~otro.comoBits())
+
+
+def evaluarArbol(arbol, conjuntoTermino, frecuenciaTermino, universo, conjuntoPosicional=None):
+    """
+    Evalúa un árbol de classes/booleanquery.py y retorna un ConjuntoDocumentos.
+
+    conjuntoTermino(token) da los documentos de un término, frecuenciaTermino(token) su df
+    y universo es el conjunto de todos los documentos (NOT x = universo - x).
+    conjuntoPosicional(nodo) evalúa los nodos FRASE y CERCA; sin él (modelo sin índice
+    posicional) se evalúan como el AND de sus términos.
+    En un AND los operandos se intersectan de menor a mayor df (estimado para los
+    subárboles) y los negados se restan al final, así los conjuntos intermedios son
+    pequeños y se corta en cuanto el resultado queda vacío.
+    """
+    if arbol is None:
+        return universo
+
+    def estimar(nodo):
+        tipo = nodo[0]
+        if tipo == "TERMINO":
+            return frecuenciaTermino(nodo[1])
+        if tipo in ("FRASE", "CERCA"):
+            return min(frecuenciaTermino(token) for token in tokensHoja(nodo))
+        if tipo == "NO":
+            return universo.cardinalidad - estimar(nodo[1])
+        estimaciones = [estimar(hijo) for hijo in nodo[1]]
+        return min(estimaciones) if tipo == "Y" else sum(estimaciones)
+
+    def evaluar(nodo):
+        tipo = nodo[0]
+        if tipo == "TERMINO":
+            return conjuntoTermino(nodo[1])
+        if tipo in ("FRASE", "CERCA"):
+            if conjuntoPosicional is not None:
+                return conjuntoPosicional(nodo)
+            return evaluar(("Y", tuple(("TERMINO", token) for token in tokensHoja(nodo))))
+        if tipo == "NO":
+            return universo.diferencia(evaluar(nodo[1]))
+        if tipo == "O":
+            resultado = None
+            for hijo in nodo[1]:
+                conjunto = evaluar(hijo)
+                resultado = conjunto if resultado is None else resultado.union(conjunto)
+            return resultado
+
+        positivos = sorted((hijo for hijo in nodo[1] if hijo[0] != "NO"), key=estimar)
+        negados = [hijo[1] for hijo in nodo[1] if hijo[0] == "NO"]
+        resultado = universo if not positivos else None
+        for hijo in positivos:
+            conjunto = evaluar(hijo)
+            resultado = conjunto if resultado is None else resultado.interseccion(conjunto)
+            if resultado.estaVacio():
+                return resultado
+        for hijo in negados:
+            resultado = resultado.diferencia(evaluar(hijo))
+            if resultado.estaVacio():
+                break
+        return resultado
+
+    return evaluar(arbol)
+
+
+class IndiceBooleano:
+    """
+    Documentos de cada término para la búsqueda booleana: los términos densos
+    (df > N * DENSIDAD_BITSET) como bitsets empaquetados y los demás como su lista de
+    postings ordenada (comparte los arreglos de la matriz de ocurrencia CSC).
+    """
+
+    def __init__(self, inicios, documentos, numDocumentos, filaBitset, bitsets):
+        self.inicios = inicios              # Inicio de la lista de cada término (longitud T + 1)
+        self.documentos = documentos        # Filas de documento de cada posting, ordenadas por término
+        self.numDocumentos = int(numDocumentos)
+        self.filaBitset = filaBitset        # Fila de cada término en bitsets (-1 si se usa la lista)
+        self.bitsets = bitsets              # Términos densos x palabras uint64
+
+    @classmethod
+    def desdeMatriz(cls, matriz, densidad=DENSIDAD_BITSET):
+        matriz = matriz.convertir("csc")
+        numDocumentos, numTerminos = matriz.forma
+        frecuencias = np.diff(matriz.indptr)
+        densos = np.flatnonzero(frecuencias > numDocumentos * densidad)
+        filaBitset = np.full(numTerminos, -1, dtype=np.int32)
+        filaBitset[densos] = np.arange(len(densos))
+
+        # Un bit por posting de los términos densos, todos a la vez
+        numPalabras = _numPalabras(numDocumentos)
+        bitsets = np.zeros(len(densos) * numPalabras, dtype=_TIPO_PALABRA)
+        filaPosting = filaBitset[matriz.indicesMayores()]
+        esDenso = filaPosting >= 0
+        documentos = matriz.indices[esDenso].astype(np.int64)
+        np.bitwise_or.at(
+            bitsets, filaPosting[esDenso] * numPalabras + (documentos >> 6),
+            np.left_shift(np.uint64(1), (documentos & 63).astype(np.uint64))
+        )
+        return cls(matriz.indptr, matriz.indices, numDocumentos, filaBitset, bitsets.reshape(len(densos), numPalabras))
+
+    @property
+    def numTerminos(self):
+        return len(self.inicios) - 1
+
+    def frecuenciaDocumento(self, terminoIndex):
+        return int(self.inicios[terminoIndex + 1] - self.inicios[terminoIndex])
+
+    def conjunto(self, terminoIndex):
+        """ Documentos del término, sin copiar (bitset o lista de postings). """
+        fila = self.filaBitset[terminoIndex]
+        if fila >= 0:
+            return ConjuntoDocumentos(self.numDocumentos, bits=self.bitsets[fila])
+        return ConjuntoDocumentos(
+            self.numDocumentos, documentos=self.documentos[self.inicios[terminoIndex]:self.inicios[terminoIndex + 1]]
+        )
+
+    def contarCoincidencias(self, terminos):
+        """
+        Cuántos de los términos (índices, sin repetir) contiene cada documento.
+        Los bitsets se suman palabra a palabra en un contador por planos de bits (el plano b
+        guarda el bit b del contador de 64 documentos a la vez, con acarreo como en una suma
+        binaria) y las listas de postings se cuentan con bincount.
+        """
+        dispersos = [t for t in terminos if self.filaBitset[t] < 0]
+        conteos = np.bincount(
+            np.concatenate([self.documentos[self.inicios[t]:self.inicios[t + 1]] for t in dispersos] + [np.zeros(0, dtype=np.int64)]),
+            minlength=self.numDocumentos
+        ).astype(np.int32)
+
+        planos = []
+        for t in terminos:
+            if self.filaBitset[t] < 0:
+                continue
+            acarreo = self.bitsets[self.filaBitset[t]]
+            for b, plano in enumerate(planos):
+                planos[b] = plano ^ acarreo
+                acarreo = plano & acarreo
+            if acarreo.any():
+                planos.append(acarreo)
+        for b, plano in enumerate(planos):
+            conteos += desempaquetarBits(plano, self.numDocumentos).astype(np.int32) << b
+        return conteos
+
+    def evaluar(self, arbol, vocabulario, indicePosicional=None):
+        """
+        Evalúa un árbol de analizarConsulta; los tokens fuera del vocabulario no tienen documentos.
+        Las frases y NEAR/n se comprueban con el índice posicional, si lo hay.
+        """
+        def conjuntoTermino(token):
+            terminoIndex = vocabulario.get(token)
+            if terminoIndex is None:
+                return ConjuntoDocumentos.vacio(self.numDocumentos)
+            return self.conjunto(terminoIndex)
+
+        def frecuenciaTermino(token):
+            terminoIndex = vocabulario.get(token)
+            return 0 if terminoIndex is None else self.frecuenciaDocumento(terminoIndex)
+
+        conjuntoPosicional = None
+        if indicePosicional is not None:
+            def conjuntoPosicional(nodo):
+                return ConjuntoDocumentos(
+                    self.numDocumentos, documentos=indicePosicional.documentosRestriccion(nodo, vocabulario)
+                )
+
+        return evaluarArbol(
+            arbol, conjuntoTermino, frecuenciaTermino, ConjuntoDocumentos.todos(self.numDocumentos), conjuntoPosicional
+        )
@@ -0,0 +1,161 @@
+import re
+
+# Operadores en mayúsculas, para no confundirlos con palabras de la consulta
+OPERADORES = ("AND", "OR", "NOT")
+_PATRON_PIEZAS = re.compile(r'"[^"]*"?|\(|\)|[^\s()"]+')
+_PATRON_CERCA = re.compile(r"NEAR/(\d+)$")   # a NEAR/n b: a lo sumo n posiciones entre a y b
+
+
+def analizarConsulta(consulta, preProcesar, posicionesFrase=None):
+    """
+    Convierte una consulta booleana en un árbol de tuplas:
+        ("Y", hijos) | ("O", hijos) | ("NO", hijo) | ("TERMINO", token)
+        | ("FRASE", ((token, distancia), ...)) | ("CERCA", (tokenA, tokenB, n))
+    Precedencia NEAR/n > NOT > AND > OR, con paréntesis; dos términos seguidos sin operador
+    se unen con AND (así una consulta sin operadores se comporta como antes).
+    Las frases van entre comillas y 'distancia' es la posición de cada token respecto al
+    primero, según posicionesFrase(texto) -> [(token, posición)] (ver analyzer.tokensConPosicion);
+    sin posicionesFrase una frase es el AND de sus palabras. "a NEAR/n b" es ("CERCA", ...)
+    junto con los dos términos, así sin índice posicional equivale a "a AND b".
+
+    Cada palabra pasa por preProcesar (minúsculas, tokenización y stopwords): si queda vacía
+    (stopword) se ignora y si produce varios tokens se unen con AND.
+    El análisis es tolerante, porque se busca mientras se escribe: los paréntesis sin cerrar
+    y los operadores sin operando se ignoran.
+    Los hijos de Y / O se ordenan y no se repiten, así dos consultas equivalentes producen
+    el mismo árbol (se usa como clave de la caché de consultas).
+    Retorna None si la consulta no tiene términos.
+    """
+    return _Analizador(_PATRON_PIEZAS.findall(consulta), preProcesar, posicionesFrase).consulta()
+
+
+def tokensHoja(nodo):
+    """ Tokens de un nodo hoja (TERMINO, FRASE o CERCA). """
+    if nodo[0] == "TERMINO":
+        return [nodo[1]]
+    if nodo[0] == "FRASE":
+        return [token for token, _ in nodo[1]]
+    return list(nodo[1][:2])
+
+
+def restriccionesPosicionales(arbol):
+    """
+    Nodos FRASE y CERCA que la consulta exige: la raíz o los hijos directos de un Y en la raíz.
+    Los modelos con ranking los usan como filtro (solo puntúan los documentos que los cumplen
+    todos); los que están bajo NOT u OR no son obligatorios y no filtran.
+    """
+    if arbol is None:
+        return ()
+    if arbol[0] in ("FRASE", "CERCA"):
+        return (arbol,)
+    if arbol[0] != "Y":
+        return ()
+    return tuple(hijo for hijo in arbol[1] if hijo[0] in ("FRASE", "CERCA"))
+
+
+def _combinar(operador, hijos):
+    """ Nodo Y / O sin hijos vacíos, aplanando los hijos del mismo operador. """
+    planos = set()
+    for hijo in hijos:
+        if hijo is None:
+            continue
+        if hijo[0] == operador:
+            planos.update(hijo[1])
+        else:
+            planos.add(hijo)
+    if not planos:
+        return None
+    if len(planos) == 1:
+        return planos.pop()
+    return (operador, tuple(sorted(planos)))
+
+
+class _Analizador:
+    """ Analizador descendente recursivo sobre las piezas de la consulta. """
+
+    def __init__(self, piezas, preProcesar, posicionesFrase):
+        self.piezas = piezas
+        self.posicion = 0
+        self.preProcesar = preProcesar
+        self.posicionesFrase = posicionesFrase
+
+    def _actual(self):
+        return self.piezas[self.posicion] if self.posicion < len(self.piezas) else None
+
+    def consulta(self):
+        arbol = self._o()
+        # Lo único que puede sobrar es un ')' sin abrir: se ignora y se sigue (AND implícito)
+        while self._actual() is not None:
+            self.posicion += 1
+            arbol = _combinar("Y", [arbol, self._o()])
+        return arbol
+
+    def _o(self):
+        hijos = [self._y()]
+        while self._actual() == "OR":
+            self.posicion += 1
+            hijos.append(self._y())
+        return _combinar("O", hijos)
+
+    def _y(self):
+        hijos = [self._no()]
+        while True:
+            pieza = self._actual()
+            if pieza is None or pieza in (")", "OR"):
+                break
+            if pieza == "AND" or _PATRON_CERCA.match(pieza):
+                # NEAR/n sin término a la izquierda se ignora
+                self.posicion += 1
+                continue
+            hijos.append(self._no())
+        return _combinar("Y", hijos)
+
+    def _no(self):
+        pieza = self._actual()
+        if pieza == "NOT":
+            self.posicion += 1
+            hijo = self._no()
+            return None if hijo is None else ("NO", hijo)
+        if pieza == "(":
+            self.posicion += 1
+            arbol = self._o()
+            if self._actual() == ")":
+                self.posicion += 1
+            return arbol
+        if pieza is None or pieza in (")", "OR", "AND"):
+            return None
+        self.posicion += 1
+        if pieza.startswith('"'):
+            return self._frase(pieza.strip('"'))
+
+        # Palabra, seguida quizá de "NEAR/n palabra" (encadenable: a NEAR/2 b NEAR/3 c)
+        tokens = self.preProcesar(pieza)
+        hijos = [("TERMINO", token) for token in tokens]
+        while self._esCerca():
+            distancia = int(_PATRON_CERCA.match(self._actual()).group(1))
+            siguientes = self.preProcesar(self.piezas[self.posicion + 1])
+            self.posicion += 2
+            if tokens and siguientes:
+                tokenA, tokenB = sorted((tokens[-1], siguientes[0]))
+                hijos.append(("CERCA", (tokenA, tokenB, distancia)))
+            hijos.extend(("TERMINO", token) for token in siguientes)
+            tokens = siguientes or tokens
+        return _combinar("Y", hijos)
+
+    def _esCerca(self):
+        """ Indica si sigue un NEAR/n con una palabra a su derecha. """
+        pieza = self._actual()
+        if pieza is None or not _PATRON_CERCA.match(pieza) or self.posicion + 1 >= len(self.piezas):
+            return False
+        siguiente = self.piezas[self.posicion + 1]
+        return not (siguiente in ("(", ")") or siguiente in OPERADORES
+                    or siguiente.startswith('"') or _PATRON_CERCA.match(siguiente))
+
+    def _frase(self, texto):
+        if self.posicionesFrase is None:
+            return _combinar("Y", [("TERMINO", token) for token in self.preProcesar(texto)])
+        tokens = self.posicionesFrase(texto)
+        if len(tokens) <= 1:
+            return _combinar("Y", [("TERMINO", token) for token, _ in tokens])
+        inicio = tokens[0][1]
+        return ("FRASE", tuple((token, posicion - inicio) for token, posicion in tokens))
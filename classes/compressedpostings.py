@@ -0,0 +1,182 @@
+import numpy as np
+
+TAMANO_BLOQUE = 128
+_TIPO_PALABRA = np.dtype("<u8")
+
+
+def _anchoBits(valores):
+    """ Bits necesarios para representar cada valor (0 -> 0 bits); exacto para enteros < 2**53. """
+    return np.frexp(np.asarray(valores, dtype=float))[1].astype(np.uint8)
+
+
+def _acumular(palabras, indices, valores):
+    """ palabras[indices] |= valores, con indices no decrecientes (un OR por palabra distinta). """
+    if len(indices) == 0:
+        return
+    inicios = np.flatnonzero(np.r_[True, indices[1:] != indices[:-1]])
+    palabras[indices[inicios]] |= np.bitwise_or.reduceat(valores, inicios)
+
+
+def _escribir(palabras, desplazamientos, valores, anchos):
+    """ Escribe cada valor en su desplazamiento (en bits); los que cruzan de palabra siguen en la siguiente. """
+    palabra = desplazamientos >> 6
+    corrimiento = (desplazamientos & 63).astype(np.uint64)
+    _acumular(palabras, palabra, valores << corrimiento)
+    cruza = corrimiento + anchos.astype(np.uint64) > 64
+    _acumular(palabras, palabra[cruza] + 1, valores[cruza] >> (np.uint64(64) - corrimiento[cruza]))
+
+
+def _leer(palabras, desplazamientos, anchos):
+    """ Lee valores de 'anchos' bits a partir de cada desplazamiento (en bits). """
+    palabra = desplazamientos >> 6
+    corrimiento = (desplazamientos & 63).astype(np.uint64)
+    bajos = palabras[palabra] >> corrimiento
+    # Dos corrimientos para no desplazar 64 bits cuando el valor empieza al inicio de la palabra
+    altos = (palabras[palabra + 1] << np.uint64(1)) << (np.uint64(63) - corrimiento)
+    mascara = (np.uint64(1) << anchos.astype(np.uint64)) - np.uint64(1)
+    return (bajos | altos) & mascara
+
+
+class PostingsComprimidas:
+    """
+    Listas de postings (IDs de documento + frecuencias) comprimidas por bloques.
+
+    Cada lista se divide en bloques de 'tamanoBloque' postings (como las cotas de Block-Max
+    WAND) y cada bloque se empaqueta con frame-of-reference: los IDs como diferencias con el
+    documento anterior (menos 1) y las frecuencias como f - 1, cada campo con los bits del
+    mayor valor del bloque. Los bloques empiezan en una palabra uint64 propia.
+    Por bloque se guardan punteros de salto: su primera palabra, su primer posting y su
+    último documento, así se puede buscar el bloque de un documento y decodificar solo ese.
+    """
+
+    def __init__(self, inicios, iniciosBloque, inicioPostingBloque, ultimoDocBloque, documentoBaseBloque,
+                 palabraBloque, bitsDocumento, bitsFrecuencia, palabras, tipoFrecuencia, tamanoBloque):
+        self.inicios = inicios                          # Inicio de las postings de cada término (longitud T + 1)
+        self.iniciosBloque = iniciosBloque              # Primer bloque de cada término (longitud T + 1)
+        self.inicioPostingBloque = inicioPostingBloque  # Primer posting de cada bloque (longitud B + 1)
+        self.ultimoDocBloque = ultimoDocBloque          # Último documento de cada bloque (punteros de salto)
+        self.documentoBaseBloque = documentoBaseBloque  # Documento anterior al bloque (-1 en el primero del término)
+        self.palabraBloque = palabraBloque              # Primera palabra de cada bloque (longitud B + 1)
+        self.bitsDocumento = bitsDocumento              # Bits por diferencia de ID en cada bloque
+        self.bitsFrecuencia = bitsFrecuencia            # Bits por frecuencia en cada bloque
+        self.palabras = palabras                        # Bloques empaquetados (más una palabra de relleno)
+        self.tipoFrecuencia = tipoFrecuencia            # dtype original de las frecuencias (p. ej. '<i4')
+        self.tamanoBloque = int(tamanoBloque)
+
+    @classmethod
+    def comprimir(cls, inicios, documentos, frecuencias, tamanoBloque=TAMANO_BLOQUE):
+        """ Comprime postings ordenadas por término y documento (esquema CSC); las frecuencias deben ser enteros >= 1. """
+        inicios = np.asarray(inicios, dtype=np.int64)
+        documentos = np.asarray(documentos, dtype=np.int64)
+        frecuencias = np.asarray(frecuencias)
+        if not np.issubdtype(frecuencias.dtype, np.integer) or (len(frecuencias) and frecuencias.min() < 1):
+            raise ValueError("Solo se comprimen frecuencias enteras mayores o iguales a 1")
+        numTerminos = len(inicios) - 1
+
+        # Bloques de cada término (misma división que IndiceInvertido.calcularCotas)
+        longitudes = np.diff(inicios)
+        bloquesPorTermino = -(-longitudes // tamanoBloque)
+        iniciosBloque = np.zeros(numTerminos + 1, dtype=np.int64)
+        np.cumsum(bloquesPorTermino, out=iniciosBloque[1:])
+        terminoBloque = np.repeat(np.arange(numTerminos), bloquesPorTermino)
+        ordenEnTermino = np.arange(len(terminoBloque)) - iniciosBloque[terminoBloque]
+        inicioPostingBloque = np.append(inicios[terminoBloque] + ordenEnTermino * tamanoBloque, len(documentos))
+        finBloque = np.minimum(inicioPostingBloque[:-1] + tamanoBloque, inicios[terminoBloque + 1])
+        esPrimero = ordenEnTermino == 0
+        numPostingsBloque = finBloque - inicioPostingBloque[:-1]
+
+        # Diferencias con el documento anterior del mismo término (el primero, con -1)
+        anteriores = np.empty_like(documentos)
+        anteriores[1:] = documentos[:-1]
+        anteriores[inicios[:-1][longitudes > 0]] = -1
+        diferencias = (documentos - anteriores - 1).astype(np.uint64)
+        valoresFrecuencia = (frecuencias.astype(np.int64) - 1).astype(np.uint64)
+
+        ultimoDocBloque = documentos[finBloque - 1].astype(np.int32) if len(documentos) else np.zeros(0, dtype=np.int32)
+        documentoBaseBloque = np.where(esPrimero, -1, np.r_[np.int32(-1), ultimoDocBloque[:-1]]).astype(np.int32)
+
+        # Bits de cada bloque según su mayor valor
+        if len(documentos):
+            bitsDocumento = _anchoBits(np.maximum.reduceat(diferencias, inicioPostingBloque[:-1]))
+            bitsFrecuencia = _anchoBits(np.maximum.reduceat(valoresFrecuencia, inicioPostingBloque[:-1]))
+        else:
+            bitsDocumento = bitsFrecuencia = np.zeros(0, dtype=np.uint8)
+        bitsBloque = numPostingsBloque * (bitsDocumento.astype(np.int64) + bitsFrecuencia)
+        palabraBloque = np.zeros(len(numPostingsBloque) + 1, dtype=np.int64)
+        np.cumsum(-(-bitsBloque // 64), out=palabraBloque[1:])
+
+        # Desplazamiento en bits de cada posting: primero los IDs del bloque y luego las frecuencias
+        bloquePosting = np.repeat(np.arange(len(numPostingsBloque)), numPostingsBloque)
+        ordenEnBloque = np.arange(len(documentos)) - inicioPostingBloque[bloquePosting]
+        anchoDocumento = bitsDocumento[bloquePosting].astype(np.int64)
+        anchoFrecuencia = bitsFrecuencia[bloquePosting].astype(np.int64)
+        baseBits = palabraBloque[bloquePosting] * 64
+        palabras = np.zeros(palabraBloque[-1] + 1, dtype=_TIPO_PALABRA)
+        _escribir(palabras, baseBits + ordenEnBloque * anchoDocumento, diferencias, anchoDocumento)
+        _escribir(
+            palabras, baseBits + numPostingsBloque[bloquePosting] * anchoDocumento + ordenEnBloque * anchoFrecuencia,
+            valoresFrecuencia, anchoFrecuencia
+        )
+
+        return cls(
+            inicios, iniciosBloque, inicioPostingBloque, ultimoDocBloque, documentoBaseBloque,
+            palabraBloque, bitsDocumento, bitsFrecuencia, palabras, frecuencias.dtype.str, tamanoBloque
+        )
+
+    @property
+    def numTerminos(self):
+        return len(self.inicios) - 1
+
+    @property
+    def numPostings(self):
+        return int(self.inicios[-1])
+
+    @property
+    def nbytes(self):
+        """ Bytes que ocupan los arreglos (bloques empaquetados y punteros de salto). """
+        return sum(valor.nbytes for valor in vars(self).values() if isinstance(valor, np.ndarray))
+
+    @property
+    def bytesSinComprimir(self):
+        """ Bytes de los mismos arreglos sin comprimir (inicios, IDs int32 y frecuencias). """
+        return self.inicios.nbytes + self.numPostings * (4 + np.dtype(self.tipoFrecuencia).itemsize)
+
+    def frecuenciaDocumento(self, terminoIndex):
+        return int(self.inicios[terminoIndex + 1] - self.inicios[terminoIndex])
+
+    def decodificarBloques(self, bloques):
+        """
+        Retorna (IDs de documento, frecuencias) de los bloques indicados, concatenados en ese orden.
+        Se decodifican todos a la vez: lectura de los campos de bits y suma acumulada por bloque.
+        """
+        bloques = np.asarray(bloques, dtype=np.int64)
+        longitudes = self.inicioPostingBloque[bloques + 1] - self.inicioPostingBloque[bloques]
+        primeros = np.cumsum(longitudes) - longitudes
+        ordenEnBloque = np.arange(longitudes.sum()) - np.repeat(primeros, longitudes)
+        anchoDocumento = np.repeat(self.bitsDocumento[bloques].astype(np.int64), longitudes)
+        anchoFrecuencia = np.repeat(self.bitsFrecuencia[bloques].astype(np.int64), longitudes)
+        baseBits = np.repeat(self.palabraBloque[bloques] * 64, longitudes)
+
+        diferencias = _leer(self.palabras, baseBits + ordenEnBloque * anchoDocumento, anchoDocumento).astype(np.int64) + 1
+        frecuencias = _leer(
+            self.palabras, baseBits + np.repeat(longitudes, longitudes) * anchoDocumento + ordenEnBloque * anchoFrecuencia,
+            anchoFrecuencia
+        ) + np.uint64(1)
+
+        # Suma acumulada por bloque a partir del documento anterior al bloque
+        acumulado = np.cumsum(diferencias)
+        if len(acumulado):
+            acumulado -= np.repeat(acumulado[primeros] - diferencias[primeros] - self.documentoBaseBloque[bloques], longitudes)
+        return acumulado.astype(np.int32), frecuencias.astype(self.tipoFrecuencia)
+
+    def bloquesTermino(self, terminoIndex):
+        """ Índices de los bloques del término. """
+        return np.arange(self.iniciosBloque[terminoIndex], self.iniciosBloque[terminoIndex + 1])
+
+    def postings(self, terminoIndex):
+        """ Retorna (IDs de documento, frecuencias) del término, decodificando sus bloques. """
+        return self.decodificarBloques(self.bloquesTermino(terminoIndex))
+
+    def descomprimir(self):
+        """ Retorna (IDs de documento, frecuencias) de todas las postings. """
+        return self.decodificarBloques(np.arange(len(self.bitsDocumento)))
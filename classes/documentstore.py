@@ -0,0 +1,201 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Caracteres de la vista previa que se precalcula para cada documento
+CARACTERES_VISTA_PREVIA = 200
+# Campos que se usan (en este orden) para la vista previa
+CAMPOS_VISTA_PREVIA = ("Answer", "answer", "Question", "question")
+ARCHIVO_CABECERA_DOCUMENTOS = "documentos.json"
+
+
+class ColumnaTexto:
+    """
+    Columna de textos guardada como un único buffer UTF-8 y los desplazamientos de inicio
+    de cada valor: el texto i es buffer[desplazamientos[i]:desplazamientos[i + 1]].
+    Los valores nulos se marcan aparte y se leen como None.
+    """
+
+    def __init__(self, buffer, desplazamientos, nulos):
+        self.buffer = buffer
+        self.desplazamientos = desplazamientos
+        self.nulos = nulos
+
+    @classmethod
+    def desdeValores(cls, valores):
+        valores = list(valores)
+        nulos = np.array([valor is None or (isinstance(valor, float) and np.isnan(valor)) for valor in valores],
+                         dtype=bool)
+        codificados = [b"" if nulo else str(valor).encode("utf-8") for valor, nulo in zip(valores, nulos)]
+        desplazamientos = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=desplazamientos[1:])
+        buffer = np.frombuffer(b"".join(codificados), dtype=np.uint8)
+        return cls(buffer, desplazamientos, nulos)
+
+    def __len__(self):
+        return len(self.desplazamientos) - 1
+
+    def valor(self, i):
+        if self.nulos[i]:
+            return None
+        return self.buffer[self.desplazamientos[i]:self.desplazamientos[i + 1]].tobytes().decode("utf-8")
+
+    def valores(self, ids):
+        """ Textos de varios documentos (los límites se obtienen de una vez para todo el lote). """
+        ids = np.asarray(ids, dtype=np.int64)
+        inicios, finales, nulos = self.desplazamientos[ids], self.desplazamientos[ids + 1], self.nulos[ids]
+        buffer = self.buffer
+        return [
+            None if nulo else buffer[inicio:final].tobytes().decode("utf-8")
+            for inicio, final, nulo in zip(inicios.tolist(), finales.tolist(), nulos.tolist())
+        ]
+
+
+class AlmacenDocumentos:
+    """
+    Almacén columnar de documentos: cada columna de texto (Question, Answer, Topic, ...) es
+    una ColumnaTexto y las columnas numéricas se guardan como arreglos de NumPy.
+    Leer k documentos no construye filas de pandas, y la vista previa de cada documento
+    se precalcula al construir el almacén.
+    Se puede guardar en un directorio (.npy + cabecera JSON) y abrir con memoria mapeada.
+    """
+
+    def __init__(self, columnas, vistasPrevias, vistaPreviaRecortada):
+        self.columnas = columnas                          # Nombre -> ColumnaTexto o arreglo de NumPy
+        self.vistasPrevias = vistasPrevias                # ColumnaTexto con las vistas previas
+        self.vistaPreviaRecortada = vistaPreviaRecortada  # True si el texto original era más largo
+
+    @classmethod
+    def desdeDataFrame(cls, dfCorpus, caracteresVistaPrevia=CARACTERES_VISTA_PREVIA):
+        columnas = {}
+        for nombre in dfCorpus.columns:
+            serie = dfCorpus[nombre]
+            if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+                columnas[str(nombre)] = serie.to_numpy()
+            else:
+                columnas[str(nombre)] = ColumnaTexto.desdeValores(serie.tolist())
+
+        # Texto de la vista previa: el primer campo no vacío de CAMPOS_VISTA_PREVIA
+        textos = [None] * len(dfCorpus)
+        for campo in CAMPOS_VISTA_PREVIA:
+            if campo not in dfCorpus.columns:
+                continue
+            for i, valor in enumerate(dfCorpus[campo].tolist()):
+                if textos[i] is None and isinstance(valor, str) and valor:
+                    textos[i] = valor
+        recortada = np.array([texto is not None and len(texto) > caracteresVistaPrevia for texto in textos], dtype=bool)
+        vistasPrevias = ColumnaTexto.desdeValores(
+            [texto if texto is None else texto[:caracteresVistaPrevia] for texto in textos]
+        )
+        return cls(columnas, vistasPrevias, recortada)
+
+    def __len__(self):
+        return len(self.vistaPreviaRecortada)
+
+    def contiene(self, idDocumento):
+        return isinstance(idDocumento, (int, np.integer)) and 0 <= idDocumento < len(self)
+
+    def obtener(self, idDocumento):
+        """ Documento como diccionario columna -> valor. """
+        return self.obtenerLote([idDocumento])[0]
+
+    def obtenerLote(self, idDocumentos):
+        """ Documentos de un arreglo de IDs, como lista de diccionarios (una lectura por columna). """
+        idDocumentos = np.asarray(idDocumentos, dtype=np.int64)
+        valoresPorColumna = {
+            nombre: columna.valores(idDocumentos) if isinstance(columna, ColumnaTexto) else columna[idDocumentos].tolist()
+            for nombre, columna in self.columnas.items()
+        }
+        return [
+            {nombre: valores[i] for nombre, valores in valoresPorColumna.items()}
+            for i in range(len(idDocumentos))
+        ]
+
+    def campo(self, nombre, idDocumentos):
+        """ Valores de una sola columna para un arreglo de IDs. """
+        columna = self.columnas[nombre]
+        if isinstance(columna, ColumnaTexto):
+            return columna.valores(idDocumentos)
+        return columna[np.asarray(idDocumentos, dtype=np.int64)].tolist()
+
+    def vistasPreviasLote(self, idDocumentos, maxCaracteres=CARACTERES_VISTA_PREVIA):
+        """
+        Vistas previas de varios documentos, recortadas a maxCaracteres (con "..." si el
+        texto era más largo). None si el documento no tiene texto.
+        Si maxCaracteres supera lo precalculado se recorta el texto completo.
+        """
+        idDocumentos = np.asarray(idDocumentos, dtype=np.int64)
+        textos = self.vistasPrevias.valores(idDocumentos)
+        recortadas = self.vistaPreviaRecortada[idDocumentos].tolist()
+        resultado = []
+        for i, (texto, recortada) in enumerate(zip(textos, recortadas)):
+            if texto is None:
+                resultado.append(None)
+            elif len(texto) > maxCaracteres:
+                resultado.append(texto[:maxCaracteres] + "...")
+            elif recortada:
+                # Lo precalculado no alcanza: recortar el texto completo
+                completo = self._textoVistaPrevia(int(idDocumentos[i]))
+                resultado.append(completo[:maxCaracteres] + "..." if len(completo) > maxCaracteres else completo)
+            else:
+                resultado.append(texto)
+        return resultado
+
+    def _textoVistaPrevia(self, idDocumento):
+        for campo in CAMPOS_VISTA_PREVIA:
+            columna = self.columnas.get(campo)
+            if isinstance(columna, ColumnaTexto):
+                valor = columna.valor(idDocumento)
+                if valor:
+                    return valor
+        return ""
+
+    # --- Persistencia ---
+
+    def guardar(self, rutaDirectorio):
+        """ Guarda el almacén en un directorio: un .npy por arreglo y una cabecera JSON. """
+        rutaDirectorio = Path(rutaDirectorio)
+        rutaDirectorio.mkdir(parents=True, exist_ok=True)
+        cabecera = {"columnas": {}, "numDocumentos": len(self)}
+
+        def guardarTexto(nombreArchivo, columna):
+            for parte in ("buffer", "desplazamientos", "nulos"):
+                np.save(rutaDirectorio / f"{nombreArchivo}.{parte}.npy", getattr(columna, parte), allow_pickle=False)
+
+        for i, (nombre, columna) in enumerate(self.columnas.items()):
+            nombreArchivo = f"columna{i}"
+            if isinstance(columna, ColumnaTexto):
+                guardarTexto(nombreArchivo, columna)
+                cabecera["columnas"][nombre] = {"tipo": "texto", "archivo": nombreArchivo}
+            else:
+                np.save(rutaDirectorio / f"{nombreArchivo}.npy", columna, allow_pickle=False)
+                cabecera["columnas"][nombre] = {"tipo": "arreglo", "archivo": nombreArchivo}
+        guardarTexto("vistasPrevias", self.vistasPrevias)
+        np.save(rutaDirectorio / "vistaPreviaRecortada.npy", self.vistaPreviaRecortada, allow_pickle=False)
+
+        with open(rutaDirectorio / ARCHIVO_CABECERA_DOCUMENTOS, "w", encoding="utf-8") as archivo:
+            json.dump(cabecera, archivo, ensure_ascii=False)
+        return rutaDirectorio
+
+    @classmethod
+    def abrir(cls, rutaDirectorio, mmap=True):
+        """ Abre un almacén guardado; con mmap=True los arreglos quedan mapeados en memoria. """
+        rutaDirectorio = Path(rutaDirectorio)
+        modo = "r" if mmap else None
+        with open(rutaDirectorio / ARCHIVO_CABECERA_DOCUMENTOS, encoding="utf-8") as archivo:
+            cabecera = json.load(archivo)
+
+        def cargar(nombreArchivo):
+            return np.load(rutaDirectorio / nombreArchivo, mmap_mode=modo, allow_pickle=False)
+
+        def abrirTexto(nombreArchivo):
+            return ColumnaTexto(*(cargar(f"{nombreArchivo}.{parte}.npy") for parte in ("buffer", "desplazamientos", "nulos")))
+
+        columnas = {}
+        for nombre, descripcion in cabecera["columnas"].items():
+            if descripcion["tipo"] == "texto":
+                columnas[nombre] = abrirTexto(descripcion["archivo"])
+            else:
+                columnas[nombre] = cargar(descripcion["archivo"] + ".npy")
+        return cls(columnas, abrirTexto("vistasPrevias"), cargar("vistaPreviaRecortada.npy"))
@@ -0,0 +1,196 @@
+import heapq
+import numpy as np
+
+
+class CursorPostings:
+    """
+    Cursor sobre la lista de postings de un término para la recuperación documento a documento.
+    """
+
+    def __init__(self, documentos, frecuencias, puntuar, cota, ultimoDocBloque, maximoBloque):
+        self.documentos = documentos            # IDs de documento ordenados
+        self.frecuencias = frecuencias          # f(t, D) de cada posting
+        self.puntuar = puntuar                  # puntuar(posición, doc, frecuencia) -> contribución del posting
+        self.cota = cota                        # Máxima contribución del término (cota WAND)
+        self.ultimoDocBloque = ultimoDocBloque  # Último documento de cada bloque
+        self.maximoBloque = maximoBloque        # Máxima contribución de cada bloque
+        self.bloque = 0
+        self.posicion = 0
+        self.doc = None
+        self._mover(0)
+
+    @property
+    def numPostings(self):
+        return len(self.documentos)
+
+    def _mover(self, posicion):
+        self.posicion = posicion
+        self.doc = int(self.documentos[posicion]) if posicion < len(self.documentos) else None
+
+    def puntuarActual(self):
+        """ Contribución del posting en el que está el cursor. """
+        return self.puntuar(self.posicion, self.doc, self.frecuencias[self.posicion])
+
+    def siguiente(self):
+        """ Avanza al siguiente posting. """
+        self._mover(self.posicion + 1)
+
+    def agotar(self):
+        """ Marca la lista como recorrida por completo. """
+        self._mover(self.numPostings)
+
+    def avanzarHasta(self, doc):
+        """ Avanza al primer posting con ID >= doc usando búsqueda binaria. """
+        desplazamiento = np.searchsorted(self.documentos[self.posicion:], doc)
+        self._mover(self.posicion + int(desplazamiento))
+
+    def cotaBloque(self, doc):
+        """
+        Mueve solo el puntero de bloque (sin tocar postings) al bloque que podría contener
+        doc y retorna (máximo del bloque, último documento del bloque).
+        Si la lista termina antes de doc retorna (0.0, None).
+        """
+        self.bloque += int(np.searchsorted(self.ultimoDocBloque[self.bloque:], doc))
+        if self.bloque >= len(self.ultimoDocBloque):
+            return 0.0, None
+        return self.maximoBloque[self.bloque], int(self.ultimoDocBloque[self.bloque])
+
+
+class CursorComprimido(CursorPostings):
+    """
+    Cursor sobre las postings comprimidas de un término (classes/compressedpostings.py).
+    Solo decodifica los bloques en los que se detiene: avanzarHasta busca el bloque destino
+    con los punteros de salto (último documento de cada bloque) sin decodificar los intermedios.
+    """
+
+    def __init__(self, comprimidas, terminoIndex, puntuar, cota, ultimoDocBloque, maximoBloque):
+        self.comprimidas = comprimidas
+        self.bloques = comprimidas.bloquesTermino(terminoIndex)
+        self.saltos = comprimidas.ultimoDocBloque[self.bloques]
+        self.tamanoBloque = comprimidas.tamanoBloque
+        self._numPostings = comprimidas.frecuenciaDocumento(terminoIndex)
+        self.bloqueDecodificado = None   # Bloque (del término) cuyas postings están en documentosBloque
+        self.documentosBloque = None
+        self.frecuenciasBloque = None
+        super().__init__(None, None, puntuar, cota, ultimoDocBloque, maximoBloque)
+
+    @property
+    def numPostings(self):
+        return self._numPostings
+
+    def _decodificar(self, bloque):
+        if bloque != self.bloqueDecodificado:
+            self.documentosBloque, self.frecuenciasBloque = self.comprimidas.decodificarBloques(self.bloques[bloque:bloque + 1])
+            self.bloqueDecodificado = bloque
+
+    def _mover(self, posicion):
+        self.posicion = posicion
+        if posicion >= self._numPostings:
+            self.doc = None
+            return
+        bloque, desplazamiento = divmod(posicion, self.tamanoBloque)
+        self._decodificar(bloque)
+        self.doc = int(self.documentosBloque[desplazamiento])
+
+    def puntuarActual(self):
+        return self.puntuar(self.posicion, self.doc, self.frecuenciasBloque[self.posicion % self.tamanoBloque])
+
+    def avanzarHasta(self, doc):
+        """ Avanza al primer posting con ID >= doc: salta al bloque que lo contiene y busca dentro de él. """
+        if self.doc is None or self.doc >= doc:
+            return
+        actual = self.posicion // self.tamanoBloque
+        bloque = actual + int(np.searchsorted(self.saltos[actual:], doc))
+        if bloque >= len(self.saltos):
+            self.agotar()
+            return
+        self._decodificar(bloque)
+        inicio = self.posicion % self.tamanoBloque if bloque == actual else 0
+        desplazamiento = inicio + int(np.searchsorted(self.documentosBloque[inicio:], doc))
+        self._mover(bloque * self.tamanoBloque + desplazamiento)
+
+
+def recuperarTopK(cursores, k, usarBloques=True):
+    """
+    Recuperación top-k con poda dinámica WAND (Broder et al., 2003) y, si usarBloques
+    es True, Block-Max WAND (Ding y Suel, 2011).
+
+    Solo se puntúan los documentos cuya cota superior supera el umbral actual
+    (la k-ésima mejor puntuación); el resto de postings se salta con búsqueda binaria.
+
+    Retorna (lista de (doc, puntuación) ordenada de mayor a menor, estadísticas).
+    """
+    postingsTotales = sum(cursor.numPostings for cursor in cursores)
+    postingsEvaluados = 0
+    bloquesDescartados = 0
+    monticulo = []   # Min-heap de (puntuación, -doc) con los mejores k
+    umbral = 0.0     # Solo interesan documentos con puntuación > umbral
+
+    activos = [cursor for cursor in cursores if cursor.doc is not None]
+    while activos and k > 0:
+        activos.sort(key=lambda cursor: cursor.doc)
+
+        # 1. Pivote: primer término en el que la suma de cotas supera el umbral
+        acumulado = 0.0
+        pivote = None
+        for i, cursor in enumerate(activos):
+            acumulado += cursor.cota
+            if acumulado > umbral:
+                pivote = i
+                break
+        if pivote is None:
+            break
+        docPivote = activos[pivote].doc
+        # Incluir los términos que también están posicionados en el documento pivote
+        while pivote + 1 < len(activos) and activos[pivote + 1].doc == docPivote:
+            pivote += 1
+
+        # 2. Block-Max: comprobar con las cotas de bloque antes de puntuar
+        if usarBloques:
+            cotaBloques = 0.0
+            frontera = activos[pivote + 1].doc if pivote + 1 < len(activos) else None
+            for cursor in activos[:pivote + 1]:
+                maximo, ultimoDoc = cursor.cotaBloque(docPivote)
+                cotaBloques += maximo
+                if ultimoDoc is not None and (frontera is None or ultimoDoc + 1 < frontera):
+                    frontera = ultimoDoc + 1
+            if cotaBloques <= umbral:
+                # Ningún documento antes de la frontera puede superar el umbral
+                bloquesDescartados += 1
+                for cursor in activos[:pivote + 1]:
+                    if frontera is None:
+                        cursor.agotar()
+                    else:
+                        cursor.avanzarHasta(frontera)
+                activos = [cursor for cursor in activos if cursor.doc is not None]
+                continue
+
+        # 3. Puntuar el pivote si todos los términos anteriores están en él
+        if activos[0].doc == docPivote:
+            puntuacion = 0.0
+            for cursor in activos[:pivote + 1]:
+                puntuacion += cursor.puntuarActual()
+                postingsEvaluados += 1
+                cursor.siguiente()
+            if len(monticulo) < k:
+                heapq.heappush(monticulo, (puntuacion, -docPivote))
+            elif puntuacion > monticulo[0][0]:
+                heapq.heapreplace(monticulo, (puntuacion, -docPivote))
+            if len(monticulo) == k:
+                umbral = monticulo[0][0]
+        else:
+            # Los documentos anteriores al pivote no pueden superar el umbral
+            for cursor in activos[:pivote]:
+                if cursor.doc < docPivote:
+                    cursor.avanzarHasta(docPivote)
+
+        activos = [cursor for cursor in activos if cursor.doc is not None]
+
+    resultados = [(-docNegativo, puntuacion) for puntuacion, docNegativo in sorted(monticulo, reverse=True)]
+    estadisticas = {
+        "postingsTotales": postingsTotales,
+        "postingsEvaluados": postingsEvaluados,
+        "postingsOmitidos": postingsTotales - postingsEvaluados,
+        "bloquesDescartados": bloquesDescartados,
+    }
+    return resultados, estadisticas
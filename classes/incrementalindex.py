@@ -0,0 +1,722 @@
+import logging
+import threading
+import time
+from array import array
+import numpy as np
+from classes.analyzer import FrecuenciasCorpus
+from classes.binarymodel import ModeloBinario
+from classes.booleanindex import ConjuntoDocumentos, evaluarArbol
+from classes.booleanquery import analizarConsulta, restriccionesPosicionales, tokensHoja
+from classes.tfidfmodel import ModeloVectorialTfIdf
+from classes.bm25model import ModeloBM25
+from classes.positionalindex import IndicePosicional
+from classes.sparsematrix import MatrizDispersa
+from classes.topk import seleccionarTopK
+
+logger = logging.getLogger(__name__)
+
+# Documentos en el segmento en memoria que disparan una fusión en segundo plano
+MAX_DOCUMENTOS_MEMORIA = 1000
+# Proporción de documentos eliminados del segmento base que dispara una fusión
+MAX_PROPORCION_ELIMINADOS = 0.2
+
+CLASES_SOPORTADAS = (ModeloBinario, ModeloVectorialTfIdf, ModeloBM25)
+
+
+class SegmentoMemoria:
+    """
+    Documentos agregados desde la última fusión: ya tokenizados (IDs de término), pero
+    todavía fuera del índice del modelo. Los eliminados se marcan con un byte por documento
+    y se descartan al fusionar. Si el modelo tiene índice posicional se guarda también la
+    posición de cada token (contando las stopwords).
+    """
+
+    def __init__(self):
+        self.idsDocumentos = array("q")   # ID de cada documento del segmento
+        self.terminos = array("i")        # IDs de término de todos los tokens, concatenados
+        self.posiciones = array("i")      # Posición de cada token (vacío sin índice posicional)
+        self.inicios = array("q", [0])    # Inicio de cada documento en 'terminos'
+        self.eliminados = bytearray()     # 1 si el documento se eliminó o se reemplazó
+        self._matriz = None               # Matriz de frecuencias CSC (se construye al buscar)
+        self._indicePosicional = None
+        self._vivos = None
+
+    def __len__(self):
+        return len(self.idsDocumentos)
+
+    def agregar(self, idDocumento, idsTerminos, posiciones=None):
+        """ Agrega un documento y retorna su fila en el segmento. """
+        self.idsDocumentos.append(idDocumento)
+        self.terminos.extend(idsTerminos)
+        if posiciones is not None:
+            self.posiciones.extend(posiciones)
+        self.inicios.append(len(self.terminos))
+        self.eliminados.append(0)
+        self._matriz = None
+        self._indicePosicional = None
+        self._vivos = None
+        return len(self.idsDocumentos) - 1
+
+    def eliminar(self, fila):
+        """ Marca la fila como eliminada y retorna los IDs de término de sus tokens. """
+        self.eliminados[fila] = 1
+        self._vivos = None
+        return np.array(self.terminos[self.inicios[fila]:self.inicios[fila + 1]], dtype=np.int64)
+
+    def ids(self):
+        return np.array(self.idsDocumentos, dtype=np.int64)
+
+    def longitudes(self):
+        """ Número de tokens (sin stopwords) de cada documento. """
+        return np.diff(np.array(self.inicios, dtype=np.int64))
+
+    def vivos(self):
+        """ Máscara de las filas no eliminadas. """
+        if self._vivos is None:
+            self._vivos = np.array(self.eliminados, dtype=np.uint8) == 0
+        return self._vivos
+
+    def matriz(self):
+        """ Matriz de frecuencias CSC (Documentos del segmento x Términos), incluidas las filas eliminadas. """
+        if self._matriz is None:
+            terminos = np.array(self.terminos, dtype=np.int32)
+            filas = np.repeat(np.arange(len(self)), self.longitudes())
+            numTerminos = int(terminos.max()) + 1 if len(terminos) else 0
+            self._matriz = MatrizDispersa.desdeTripletas(
+                filas, terminos, (len(self), numTerminos), formato="csc", dtype=np.int32
+            )
+        return self._matriz
+
+    def postings(self, terminoIndex):
+        """ Retorna (filas, frecuencias) del término en el segmento, incluidas las eliminadas. """
+        matriz = self.matriz()
+        if terminoIndex >= matriz.forma[1]:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        return matriz.segmento(terminoIndex)
+
+    def tripletas(self):
+        """ (término, fila, posición) de cada token, ordenados por fila y posición. """
+        filas = np.repeat(np.arange(len(self)), self.longitudes())
+        return np.array(self.terminos, dtype=np.int64), filas, np.array(self.posiciones, dtype=np.int64)
+
+    def indicePosicional(self):
+        """ Índice posicional del segmento (filas del segmento, incluidas las eliminadas). """
+        if self._indicePosicional is None:
+            terminos, filas, posiciones = self.tripletas()
+            self._indicePosicional = IndicePosicional.desdeTripletas(
+                terminos, filas, posiciones, self.matriz().forma[1], int(posiciones.max()) + 1 if len(posiciones) else 0
+            )
+        return self._indicePosicional
+
+
+class IndiceIncremental:
+    """
+    Indexación incremental sobre un modelo ya ajustado (Binario, TF-IDF o BM25): agregar,
+    actualizar y eliminar documentos sin volver a ajustar el corpus.
+
+    - El índice del modelo es el segmento base; los documentos nuevos se tokenizan y se
+      guardan en un segmento pequeño en memoria (SegmentoMemoria).
+    - Los documentos eliminados del segmento base se marcan en un mapa de bits (lápidas);
+      sus postings siguen en el índice hasta la próxima fusión.
+    - Las estadísticas de la colección (df de cada término, número de documentos y suma de
+      longitudes, de las que salen IDF y avgdl) se actualizan con cada alta y baja, así que
+      las búsquedas puntúan con las estadísticas de los documentos vivos.
+    - Cuando el segmento en memoria o la proporción de eliminados crecen, un hilo en segundo
+      plano fusiona todo en un modelo nuevo (sin volver a tokenizar) y lo publica; mientras
+      tanto las búsquedas siguen usando los segmentos anteriores.
+
+    Actualizar un documento conserva su ID: la versión anterior queda eliminada y la nueva va
+    al segmento en memoria. La fusión ordena las filas por ID, así el modelo binario sigue
+    devolviendo los documentos en orden de ID (las filas se traducen con listaDocumentos).
+    Si el modelo tiene índice posicional, los segmentos en memoria guardan las posiciones:
+    las frases y NEAR/n se evalúan en todos los segmentos y la fusión reconstruye el índice.
+    En TF-IDF las normas de los documentos del segmento base se recalculan con el IDF
+    actual la primera vez que se busca tras un cambio, así el ranking es el de un ajuste
+    completo sobre los documentos vivos también entre fusiones.
+    """
+
+    def __init__(self, modelo, maxDocumentosMemoria=MAX_DOCUMENTOS_MEMORIA,
+                 maxProporcionEliminados=MAX_PROPORCION_ELIMINADOS, fusionAutomatica=True):
+        if not isinstance(modelo, CLASES_SOPORTADAS):
+            raise TypeError(f"Modelo no soportado por el índice incremental: {type(modelo).__name__}")
+        self.maxDocumentosMemoria = maxDocumentosMemoria
+        self.maxProporcionEliminados = maxProporcionEliminados
+        self.fusionAutomatica = fusionAutomatica
+        self.terminosNuevos = {}              # Términos fuera del vocabulario del modelo -> ID
+        self.segmentos = [SegmentoMemoria()]  # El último recibe las altas; los demás se están fusionando
+        self.ubicacion = {}                   # ID de documento en memoria -> (segmento, fila)
+        self.versionIndice = 0                # Cambia con cada alta, baja o fusión
+        self.estadisticasFusion = {"fusiones": 0, "documentosFusionados": 0, "segundosUltimaFusion": 0.0}
+        self._bloqueo = threading.RLock()
+        self._bloqueoFusion = threading.Lock()   # Una sola fusión a la vez
+        self._hiloFusion = None
+        self._segmentosFusion = None          # Segmentos que está fusionando el hilo en curso
+        self._eliminadosDuranteFusion = []
+
+        self._establecerBase(modelo)
+        # Estadísticas de los documentos vivos
+        self.frecuenciaDocumento = self._matrizBase.conteoPorColumna().astype(np.int64)   # df_t
+        self.numDocumentosVivos = self._matrizBase.forma[0]
+        self.sumaLongitudes = float(self._longitudesBase.sum()) if self._longitudesBase is not None else 0.0
+        self.siguienteId = int(self._idsBase.max()) + 1 if len(self._idsBase) else 0
+
+    def _establecerBase(self, modelo):
+        self.modelo = modelo
+        self._matrizBase = _matrizModelo(modelo).convertir("csc")
+        self._numTerminosBase = len(modelo.vocabulario)
+        self._idsBase = np.asarray(modelo.listaDocumentos, dtype=np.int64)
+        self._ordenIdsBase = np.argsort(self._idsBase, kind="stable")
+        self._idsBaseOrdenados = self._idsBase[self._ordenIdsBase]
+        self._longitudesBase = modelo.vectorLongitudDocumento if isinstance(modelo, ModeloBM25) else None
+        self.eliminadosBase = np.zeros(len(self._idsBase), dtype=bool)   # Lápidas del segmento base
+        self.numEliminadosBase = 0
+        self._normasBase = None               # (versionIndice, normas TF-IDF de las filas base)
+
+    # --- Estadísticas ---
+
+    @property
+    def numTerminos(self):
+        return self._numTerminosBase + len(self.terminosNuevos)
+
+    @property
+    def longitudPromedio(self):
+        """ avgdl de los documentos vivos (solo BM25 guarda las longitudes del segmento base). """
+        return self.sumaLongitudes / self.numDocumentosVivos if self.numDocumentosVivos else 0.0
+
+    def estadisticas(self):
+        with self._bloqueo:
+            return {
+                "documentos": self.numDocumentosVivos,
+                "terminos": self.numTerminos,
+                "documentosMemoria": sum(len(segmento) for segmento in self.segmentos),
+                "eliminadosBase": self.numEliminadosBase,
+                "longitudPromedio": self.longitudPromedio if self._longitudesBase is not None else None,
+                **self.estadisticasFusion,
+            }
+
+    def contiene(self, idDocumento):
+        with self._bloqueo:
+            return idDocumento in self.ubicacion or len(self._filasBase([idDocumento])) > 0
+
+    @property
+    def conPosiciones(self):
+        return self.modelo.indicePosicional is not None
+
+    def _tokenizar(self, texto):
+        """ Tokens sin stopwords y sus posiciones (None si el modelo no tiene índice posicional). """
+        if not self.conPosiciones:
+            return self.modelo.preProcesar(texto), None
+        tokensPosicion = self.modelo.posicionesFrase(texto)
+        return [token for token, _ in tokensPosicion], [posicion for _, posicion in tokensPosicion]
+
+    def _idTermino(self, token, crear=False):
+        terminoIndex = self.modelo.vocabulario.get(token)
+        if terminoIndex is None:
+            terminoIndex = self.terminosNuevos.get(token)
+            if terminoIndex is None and crear:
+                # Los términos nuevos reciben IDs a continuación del vocabulario: nunca se renumeran
+                terminoIndex = self.numTerminos
+                self.terminosNuevos[token] = terminoIndex
+        return terminoIndex
+
+    def _actualizarEstadisticas(self, idsTerminos, signo):
+        """ Suma (signo=1) o resta (signo=-1) un documento de las estadísticas. """
+        if len(self.frecuenciaDocumento) < self.numTerminos:
+            faltantes = self.numTerminos - len(self.frecuenciaDocumento)
+            self.frecuenciaDocumento = np.concatenate([self.frecuenciaDocumento, np.zeros(faltantes, dtype=np.int64)])
+        self.frecuenciaDocumento[np.unique(idsTerminos)] += signo
+        self.numDocumentosVivos += signo
+        self.sumaLongitudes += signo * len(idsTerminos)
+
+    # --- Altas, bajas y actualizaciones ---
+
+    def agregarDocumentos(self, textos):
+        """ Agrega documentos nuevos y retorna sus IDs. """
+        # La tokenización (lo más costoso) se hace fuera del bloqueo
+        listasTokens = [self._tokenizar(texto) for texto in textos]
+        with self._bloqueo:
+            ids = []
+            for tokens, posiciones in listasTokens:
+                ids.append(self.siguienteId)
+                self._indexar(self.siguienteId, tokens, posiciones)
+                self.siguienteId += 1
+            self.versionIndice += 1
+        self._programarFusion()
+        return ids
+
+    def actualizarDocumento(self, idDocumento, texto):
+        """ Reemplaza el texto de un documento conservando su ID (si no existía, lo agrega). """
+        tokens, posiciones = self._tokenizar(texto)
+        with self._bloqueo:
+            self._eliminar([idDocumento])
+            self._indexar(int(idDocumento), tokens, posiciones)
+            self.siguienteId = max(self.siguienteId, int(idDocumento) + 1)
+            self.versionIndice += 1
+        self._programarFusion()
+
+    def eliminarDocumentos(self, idDocumentos):
+        """ Elimina documentos por ID y retorna cuántos existían. """
+        with self._bloqueo:
+            numEliminados = self._eliminar(idDocumentos)
+            if numEliminados:
+                self.versionIndice += 1
+        self._programarFusion()
+        return numEliminados
+
+    def _indexar(self, idDocumento, tokens, posiciones=None):
+        idsTerminos = [self._idTermino(token, crear=True) for token in tokens]
+        segmento = self.segmentos[-1]
+        self.ubicacion[idDocumento] = (segmento, segmento.agregar(idDocumento, idsTerminos, posiciones))
+        self._actualizarEstadisticas(np.asarray(idsTerminos, dtype=np.int64), 1)
+
+    def _eliminar(self, idDocumentos):
+        numEliminados = 0
+        idsBase = []
+        for idDocumento in idDocumentos:
+            idDocumento = int(idDocumento)
+            if idDocumento not in self.ubicacion:
+                idsBase.append(idDocumento)
+                continue
+            segmento, fila = self.ubicacion.pop(idDocumento)
+            self._actualizarEstadisticas(segmento.eliminar(fila), -1)
+            numEliminados += 1
+            if self._segmentosFusion is not None and any(segmento is s for s in self._segmentosFusion):
+                self._eliminadosDuranteFusion.append(idDocumento)
+
+        filas = self._filasBase(idsBase)
+        if len(filas) > 0:
+            self.eliminadosBase[filas] = True
+            self.numEliminadosBase += len(filas)
+            # df de los términos de los documentos eliminados (una pasada por los postings)
+            terminos = self._matrizBase.indicesMayores()[np.isin(self._matrizBase.indices, filas)]
+            self.frecuenciaDocumento -= np.bincount(terminos, minlength=len(self.frecuenciaDocumento))
+            self.numDocumentosVivos -= len(filas)
+            if self._longitudesBase is not None:
+                self.sumaLongitudes -= float(self._longitudesBase[filas].sum())
+            numEliminados += len(filas)
+            if self._segmentosFusion is not None:
+                self._eliminadosDuranteFusion.extend(self._idsBase[filas].tolist())
+        return numEliminados
+
+    def _filasBase(self, idDocumentos):
+        """ Filas del segmento base (no eliminadas) de los IDs indicados. """
+        idDocumentos = np.asarray(idDocumentos, dtype=np.int64)
+        if len(idDocumentos) == 0 or len(self._idsBase) == 0:
+            return np.zeros(0, dtype=np.int64)
+        posiciones = np.minimum(np.searchsorted(self._idsBaseOrdenados, idDocumentos), len(self._idsBase) - 1)
+        encontradas = self._idsBaseOrdenados[posiciones] == idDocumentos
+        filas = self._ordenIdsBase[posiciones[encontradas]]
+        return np.unique(filas[~self.eliminadosBase[filas]])
+
+    # --- Búsqueda ---
+
+    def buscar(self, consulta, k=3, modo=None):
+        """
+        Busca en el segmento base y en los segmentos en memoria, sin los eliminados y con
+        las estadísticas actuales. Retorna lo mismo que modelo.buscar.
+        modo: con el modelo binario, 'booleano' (por defecto) o 'coordinacion'.
+        """
+        if isinstance(self.modelo, ModeloBinario):
+            with self._bloqueo:
+                if modo == "coordinacion":
+                    return self._buscarCoordinacion(consulta, k)
+                if modo not in (None, "booleano"):
+                    raise ValueError(f"Modo de búsqueda no soportado: {modo}")
+                return self._buscarBinario(consulta, k)
+        if modo is not None:
+            raise ValueError(f"Modo de búsqueda no soportado: {modo}")
+        tokensConsulta = self.modelo.preProcesar(consulta)
+        with self._bloqueo:
+            # Como en el modelo, las frases y NEAR/n obligatorios filtran el ranking
+            permitidos = self._documentosRestricciones(self.modelo.restriccionesConsulta(consulta))
+            if isinstance(self.modelo, ModeloVectorialTfIdf):
+                return self._buscarTfIdf(tokensConsulta, k, permitidos)
+            return self._buscarBM25(tokensConsulta, k, permitidos)
+
+    def _postingsVivos(self, terminoIndex):
+        """ Postings no eliminados del término en cada segmento: lista de (filas, valores, segmento). """
+        listas = []
+        if terminoIndex < self._numTerminosBase:
+            filas, valores = self._matrizBase.segmento(terminoIndex)
+            vivos = ~self.eliminadosBase[filas]
+            listas.append((filas[vivos], valores[vivos], None))
+        for segmento in self.segmentos:
+            filas, frecuencias = segmento.postings(terminoIndex)
+            vivos = segmento.vivos()[filas]
+            listas.append((filas[vivos], frecuencias[vivos], segmento))
+        return listas
+
+    def _ids(self, filas, segmento):
+        return self._idsBase[filas] if segmento is None else segmento.ids()[filas]
+
+    def _documentosRestriccion(self, nodo):
+        """ IDs vivos (ordenados) que cumplen un nodo FRASE o CERCA, en todos los segmentos. """
+        filas = self.modelo.indicePosicional.documentosRestriccion(nodo, self.modelo.vocabulario)
+        listasIds = [self._idsBase[filas[~self.eliminadosBase[filas]]]]
+        for segmento in self.segmentos:
+            indice = segmento.indicePosicional()
+            # Solo los términos que ya aparecen en el segmento (el resto no tiene postings en él)
+            vocabulario = {}
+            for token in tokensHoja(nodo):
+                terminoIndex = self._idTermino(token)
+                if terminoIndex is not None and terminoIndex < indice.numTerminos:
+                    vocabulario[token] = terminoIndex
+            filas = indice.documentosRestriccion(nodo, vocabulario)
+            listasIds.append(segmento.ids()[filas[segmento.vivos()[filas]]])
+        return np.unique(np.concatenate(listasIds))
+
+    def _documentosRestricciones(self, nodos):
+        """ IDs que cumplen todos los nodos (None si no hay restricciones). """
+        permitidos = None
+        for nodo in nodos:
+            ids = self._documentosRestriccion(nodo)
+            permitidos = ids if permitidos is None else np.intersect1d(permitidos, ids, assume_unique=True)
+        return permitidos
+
+    def _frecuenciasConsulta(self, tokensConsulta):
+        """ Término -> repeticiones en la consulta, solo de términos presentes en algún documento vivo. """
+        frecuencias = {}
+        for token in tokensConsulta:
+            terminoIndex = self._idTermino(token)
+            if terminoIndex is not None and self.frecuenciaDocumento[terminoIndex] > 0:
+                frecuencias[terminoIndex] = frecuencias.get(terminoIndex, 0) + 1
+        return frecuencias
+
+    @staticmethod
+    def _topK(listasIds, listasContribuciones, k, permitidos=None):
+        if not listasIds:
+            return []
+        candidatos, posiciones = np.unique(np.concatenate(listasIds), return_inverse=True)
+        puntuaciones = np.bincount(posiciones, weights=np.concatenate(listasContribuciones))
+        if permitidos is not None:
+            puntuaciones[~np.isin(candidatos, permitidos)] = 0.0
+        return [(int(candidatos[i]), puntuaciones[i]) for i in seleccionarTopK(puntuaciones, k, soloPositivas=True)]
+
+    def _buscarBM25(self, tokensConsulta, k, permitidos=None):
+        pesos = self._frecuenciasConsulta(tokensConsulta)
+        if not pesos or self.numDocumentosVivos == 0:
+            return []
+        k1, b = self.modelo.k1, self.modelo.b
+        longitudPromedio = self.longitudPromedio
+        terminos = np.fromiter(pesos, dtype=np.int64, count=len(pesos))
+        idf = ModeloBM25.formulaIdf(self.numDocumentosVivos, self.frecuenciaDocumento[terminos])
+
+        listasIds, listasContribuciones = [], []
+        for (terminoIndex, peso), idfTermino in zip(pesos.items(), idf):
+            # Como en el modelo, solo suman los términos con IDF positivo
+            if idfTermino <= 0:
+                continue
+            for filas, frecuencias, segmento in self._postingsVivos(terminoIndex):
+                longitudes = self._longitudesBase[filas] if segmento is None else segmento.longitudes()[filas]
+                normalizacion = k1 * ((1 - b) + b * (longitudes / longitudPromedio))
+                listasIds.append(self._ids(filas, segmento))
+                listasContribuciones.append(peso * idfTermino * (frecuencias * (k1 + 1) / (frecuencias + normalizacion)))
+        return self._topK(listasIds, listasContribuciones, k, permitidos)
+
+    def _normasBaseTfIdf(self, idf):
+        """
+        Norma de cada fila del segmento base con el IDF actual, relativa a la de la última
+        fusión: las filas guardan tf * idfFusion / normaFusion, así basta escalar cada peso por
+        idf / idfFusion. Se recalcula solo si cambiaron las estadísticas (versionIndice).
+        """
+        if self._normasBase is None or self._normasBase[0] != self.versionIndice:
+            razon = idf[:self._numTerminosBase] / self.modelo.vectorIdf
+            self._normasBase = (self.versionIndice, _normasTfIdf(self._matrizBase, razon))
+        return self._normasBase[1]
+
+    def _buscarTfIdf(self, tokensConsulta, k, permitidos=None):
+        frecuencias = self._frecuenciasConsulta(tokensConsulta)
+        if not frecuencias:
+            return []
+        idf = ModeloVectorialTfIdf.formulaIdf(self.numDocumentosVivos, self.frecuenciaDocumento)
+        pesos = {terminoIndex: freq * idf[terminoIndex] for terminoIndex, freq in frecuencias.items()}
+        normaConsulta = np.sqrt(sum(peso ** 2 for peso in pesos.values()))
+        idfBase = self.modelo.vectorIdf
+        normasBase = self._normasBaseTfIdf(idf)
+        normasSegmentos = {}
+
+        listasIds, listasContribuciones = [], []
+        for terminoIndex, peso in pesos.items():
+            for filas, valores, segmento in self._postingsVivos(terminoIndex):
+                if segmento is None:
+                    # Peso normalizado con el IDF de la última fusión: se cambia por el IDF y la norma actuales
+                    valores = valores * (idf[terminoIndex] / idfBase[terminoIndex]) / normasBase[filas]
+                else:
+                    if id(segmento) not in normasSegmentos:
+                        normasSegmentos[id(segmento)] = _normasTfIdf(segmento.matriz(), idf)
+                    valores = valores * idf[terminoIndex] / normasSegmentos[id(segmento)][filas]
+                listasIds.append(self._ids(filas, segmento))
+                listasContribuciones.append(peso / normaConsulta * valores)
+        return self._topK(listasIds, listasContribuciones, k, permitidos)
+
+    def _buscarBinario(self, consulta, k):
+        """
+        Consulta booleana (AND / OR / NOT, frases y NEAR/n) sobre los IDs vivos, con el mismo
+        evaluador que el modelo. Los documentos salen en orden de ID.
+        """
+        siguienteId = self.siguienteId
+
+        def conjuntoTermino(token):
+            terminoIndex = self._idTermino(token)
+            if terminoIndex is None or self.frecuenciaDocumento[terminoIndex] == 0:
+                return ConjuntoDocumentos.vacio(siguienteId)
+            return ConjuntoDocumentos(siguienteId, documentos=np.unique(np.concatenate([
+                self._ids(filas, segmento) for filas, _, segmento in self._postingsVivos(terminoIndex)
+            ])))
+
+        def frecuenciaTermino(token):
+            terminoIndex = self._idTermino(token)
+            return 0 if terminoIndex is None else int(self.frecuenciaDocumento[terminoIndex])
+
+        # Consulta sin términos: como en el modelo, todos los documentos son relevantes
+        universo = ConjuntoDocumentos(siguienteId, documentos=np.sort(np.concatenate(
+            [self._idsBase[~self.eliminadosBase]] + [segmento.ids()[segmento.vivos()] for segmento in self.segmentos]
+        )))
+        conjuntoPosicional = None
+        if self.conPosiciones:
+            def conjuntoPosicional(nodo):
+                return ConjuntoDocumentos(siguienteId, documentos=self._documentosRestriccion(nodo))
+
+        arbol = analizarConsulta(consulta, self.modelo.preProcesar, self.modelo.posicionesFrase)
+        documentos = evaluarArbol(arbol, conjuntoTermino, frecuenciaTermino, universo, conjuntoPosicional).comoLista()
+        return documentos[:k] if len(documentos) else []
+
+    def _buscarCoordinacion(self, consulta, k):
+        """ Ranking por número de términos distintos de la consulta en cada documento vivo. """
+        listasIds = []
+        for terminoIndex in {self._idTermino(token) for token in self.modelo.preProcesar(consulta)}:
+            if terminoIndex is None or self.frecuenciaDocumento[terminoIndex] == 0:
+                continue
+            listasIds.append(np.unique(np.concatenate([
+                self._ids(filas, segmento) for filas, _, segmento in self._postingsVivos(terminoIndex)
+            ])))
+        resultados = self._topK(listasIds, [np.ones(len(ids), dtype=np.int64) for ids in listasIds], k)
+        return [(idDocumento, int(coincidencias)) for idDocumento, coincidencias in resultados]
+
+    # --- Fusión ---
+
+    def _programarFusion(self):
+        """ Inicia una fusión en segundo plano si el segmento en memoria o los eliminados crecieron. """
+        if not self.fusionAutomatica:
+            return
+        with self._bloqueo:
+            necesaria = (
+                len(self.segmentos[-1]) >= self.maxDocumentosMemoria
+                or self.numEliminadosBase > self.maxProporcionEliminados * len(self._idsBase)
+            )
+            if necesaria and (self._hiloFusion is None or not self._hiloFusion.is_alive()):
+                self._hiloFusion = threading.Thread(target=self.fusionar, name="FusionIndice", daemon=True)
+                self._hiloFusion.start()
+
+    def esperarFusion(self):
+        """ Espera a que termine la fusión en segundo plano, si hay una en curso. """
+        hilo = self._hiloFusion
+        if hilo is not None:
+            hilo.join()
+
+    def fusionar(self):
+        """
+        Fusiona el segmento base y los segmentos en memoria en un modelo nuevo, sin los
+        documentos eliminados, y lo publica como nuevo segmento base (self.modelo).
+        Las altas y bajas que ocurren mientras tanto se conservan.
+        Retorna el modelo fusionado.
+        """
+        with self._bloqueoFusion:
+            with self._bloqueo:
+                if not self.numEliminadosBase and not any(len(segmento) for segmento in self.segmentos):
+                    return self.modelo
+                modelo = self.modelo
+                segmentos = list(self.segmentos)
+                instantanea = {
+                    "matrizBase": self._matrizBase,
+                    "conservar": ~self.eliminadosBase,
+                    "idsBase": self._idsBase,
+                    "longitudesBase": self._longitudesBase,
+                    "segmentos": [(segmento, segmento.vivos().copy()) for segmento in segmentos],
+                    "terminosNuevos": dict(self.terminosNuevos),
+                }
+                # Las altas siguientes van a un segmento nuevo, que no entra en esta fusión
+                self.segmentos.append(SegmentoMemoria())
+                self._segmentosFusion = segmentos
+                self._eliminadosDuranteFusion = []
+
+            inicio = time.perf_counter()
+            try:
+                nuevo = _construirModelo(modelo, **instantanea)
+            except Exception:
+                logger.exception("Error al fusionar los segmentos del índice incremental")
+                with self._bloqueo:
+                    self._segmentosFusion = None
+                raise
+
+            with self._bloqueo:
+                self._publicar(nuevo, segmentos)
+            segundos = time.perf_counter() - inicio
+            self.estadisticasFusion["fusiones"] += 1
+            self.estadisticasFusion["documentosFusionados"] += sum(int(vivos.sum()) for _, vivos in instantanea["segmentos"])
+            self.estadisticasFusion["segundosUltimaFusion"] = segundos
+            logger.info(
+                "Fusión de %s completada: %d documentos, %d términos en %.2f s",
+                type(nuevo).__name__, len(nuevo.listaDocumentos), len(nuevo.vocabulario), segundos
+            )
+            return nuevo
+
+    def _publicar(self, nuevo, segmentosFusionados):
+        self._establecerBase(nuevo)
+        # Los términos nuevos de la fusión ya están en el vocabulario del modelo
+        self.terminosNuevos = {
+            termino: i for termino, i in self.terminosNuevos.items() if i >= self._numTerminosBase
+        }
+        fusionados = {id(segmento) for segmento in segmentosFusionados}
+        self.segmentos = [segmento for segmento in self.segmentos if id(segmento) not in fusionados]
+        self.ubicacion = {
+            idDocumento: (segmento, fila) for idDocumento, (segmento, fila) in self.ubicacion.items()
+            if id(segmento) not in fusionados
+        }
+        # Bajas que ocurrieron durante la fusión de documentos que entraron en ella
+        filas = self._filasBase(self._eliminadosDuranteFusion)
+        self.eliminadosBase[filas] = True
+        self.numEliminadosBase = len(filas)
+        self._segmentosFusion = None
+        self._eliminadosDuranteFusion = []
+        self.versionIndice += 1
+
+
+def _matrizModelo(modelo):
+    """ Matriz Documentos x Términos del modelo (ocurrencia, TF-IDF o frecuencias). """
+    if isinstance(modelo, ModeloBinario):
+        return modelo.matrizOcurrencia
+    if isinstance(modelo, ModeloVectorialTfIdf):
+        return modelo.matrizPonderada()
+    # Vista de las postings (una copia descomprimida si el modelo las guarda comprimidas)
+    return modelo.indiceInvertido.comoMatriz()
+
+
+def _normasTfIdf(matriz, idf):
+    """ Norma L2 de cada fila de una matriz de frecuencias ponderada con el IDF indicado. """
+    filas, columnas = matriz.coordenadas()
+    cuadrados = (matriz.data * idf[columnas]) ** 2
+    normas = np.sqrt(np.bincount(filas, weights=cuadrados, minlength=matriz.forma[0]))
+    normas[normas == 0] = 1.0
+    return normas
+
+
+def _apilarDocumentos(matrizBase, conservar, partes, numTerminos, dtype, filaFinal):
+    """
+    Matriz CSC con las filas conservadas de la matriz base seguidas de las filas vivas de
+    cada segmento en memoria. partes: lista de (matriz del segmento, máscara de filas vivas);
+    filaFinal lleva cada fila apilada a su fila en la matriz nueva (orden de ID).
+    """
+    filas, columnas = matrizBase.coordenadas()
+    mascara = conservar[filas]
+    nuevaFila = filaFinal[np.cumsum(conservar) - 1]
+    listasFilas, listasColumnas, listasValores = [nuevaFila[filas[mascara]]], [columnas[mascara]], [matrizBase.data[mascara]]
+    desplazamiento = int(conservar.sum())
+    for matriz, vivos in partes:
+        filas, columnas = matriz.coordenadas()
+        nuevaFila = filaFinal[np.cumsum(vivos) - 1 + desplazamiento]
+        mascara = vivos[filas]
+        listasFilas.append(nuevaFila[filas[mascara]])
+        listasColumnas.append(columnas[mascara])
+        listasValores.append(matriz.data[mascara])
+        desplazamiento += int(vivos.sum())
+    return MatrizDispersa.desdeTripletas(
+        np.concatenate(listasFilas), np.concatenate(listasColumnas), (desplazamiento, numTerminos),
+        valores=np.concatenate(listasValores).astype(dtype), formato="csc", dtype=dtype
+    )
+
+
+def _indicePosicionalFusionado(indiceBase, conservar, segmentos, numTerminos, filaFinal):
+    """ Índice posicional de los documentos vivos, con las filas de la matriz fusionada. """
+    terminos, filas, posiciones = indiceBase.tripletas()
+    mascara = conservar[filas]
+    listasTerminos, listasPosiciones = [terminos[mascara]], [posiciones[mascara]]
+    listasFilas = [filaFinal[(np.cumsum(conservar) - 1)[filas[mascara]]]]
+    longitudMaxima = indiceBase.longitudMaxima
+    desplazamiento = int(conservar.sum())
+    for segmento, vivos in segmentos:
+        terminos, filas, posiciones = segmento.tripletas()
+        mascara = vivos[filas]
+        listasTerminos.append(terminos[mascara])
+        listasFilas.append(filaFinal[(np.cumsum(vivos) - 1 + desplazamiento)[filas[mascara]]])
+        listasPosiciones.append(posiciones[mascara])
+        longitudMaxima = max(longitudMaxima, segmento.indicePosicional().longitudMaxima)
+        desplazamiento += int(vivos.sum())
+    terminos, filas, posiciones = (np.concatenate(listas) for listas in (listasTerminos, listasFilas, listasPosiciones))
+    orden = np.lexsort((posiciones, filas))
+    return IndicePosicional.desdeTripletas(terminos[orden], filas[orden], posiciones[orden], numTerminos, longitudMaxima)
+
+
+def _construirModelo(modelo, matrizBase, conservar, idsBase, longitudesBase, segmentos, terminosNuevos):
+    """
+    Construye un modelo nuevo, de la misma clase y con los mismos parámetros, con los
+    documentos vivos del segmento base y de los segmentos en memoria (sin tokenizar).
+    Las filas del modelo nuevo quedan ordenadas por ID y, si el modelo tiene índice
+    posicional, se reconstruye con las posiciones de la base y de los segmentos.
+    """
+    vocabulario = dict(modelo.vocabulario)
+    vocabulario.update(terminosNuevos)
+    numTerminos = len(vocabulario)
+    partes = [(segmento.matriz(), vivos) for segmento, vivos in segmentos]
+    ids = np.concatenate([idsBase[conservar]] + [segmento.ids()[vivos] for segmento, vivos in segmentos])
+    # Fila de cada documento apilado (base y luego segmentos) en la matriz nueva, ordenada por ID
+    orden = np.argsort(ids, kind="stable")
+    filaFinal = np.empty(len(ids), dtype=np.int64)
+    filaFinal[orden] = np.arange(len(ids))
+    numConservados = int(conservar.sum())
+
+    if isinstance(modelo, ModeloVectorialTfIdf) and modelo.comprimirPostings:
+        # Las postings comprimidas guardan las frecuencias de la base: se pondera como en un ajuste completo
+        matriz = _apilarDocumentos(
+            modelo.indiceInvertido.comoMatriz(), conservar, partes, numTerminos, np.int32, filaFinal
+        )
+        nuevo = ModeloVectorialTfIdf(modelo.tokenizador)
+        nuevo.numDocumentos = matriz.forma[0]
+        nuevo.comprimirPostings = True
+        nuevo.ponderarFrecuencias(matriz)
+        nuevo.vocabulario = vocabulario
+    elif isinstance(modelo, ModeloVectorialTfIdf):
+        # Filas base: tf * idfAnterior / norma; filas nuevas: tf. Con el IDF nuevo ambas pasan
+        # a tf * idfNuevo y al normalizar las filas el resultado es el mismo que el de un ajuste completo.
+        matriz = _apilarDocumentos(matrizBase, conservar, partes, numTerminos, float, filaFinal)
+        nuevo = ModeloVectorialTfIdf(modelo.tokenizador)
+        nuevo.numDocumentos = matriz.forma[0]
+        nuevo.vectorIdf = nuevo.calcularIdf(matriz)
+        idfAnterior = np.ones(numTerminos)
+        idfAnterior[:len(modelo.vectorIdf)] = modelo.vectorIdf
+        filas, columnas = matriz.coordenadas()
+        esBase = np.zeros(len(ids), dtype=bool)
+        esBase[filaFinal[:numConservados]] = True
+        factor = np.where(
+            esBase[filas],
+            nuevo.vectorIdf[columnas] / idfAnterior[columnas],
+            nuevo.vectorIdf[columnas]
+        )
+        nuevo.matrizTfIdf = nuevo.normalizarMatriz(
+            MatrizDispersa(matriz.indptr, matriz.indices, matriz.data * factor, matriz.forma, "csc")
+        )
+        nuevo.vocabulario = vocabulario
+    else:
+        matriz = _apilarDocumentos(matrizBase, conservar, partes, numTerminos, np.int32, filaFinal)
+        if isinstance(modelo, ModeloBM25):
+            longitudes = np.concatenate(
+                [longitudesBase[conservar]] + [segmento.longitudes()[vivos] for segmento, vivos in segmentos]
+            )[orden]
+            nuevo = ModeloBM25(k1=modelo.k1, b=modelo.b, tokenizador=modelo.tokenizador)
+            nuevo.precalcularImpactos = modelo.precalcularImpactos
+            nuevo.bitsImpacto = modelo.bitsImpacto
+            nuevo.comprimirPostings = modelo.comprimirPostings
+        else:
+            # El modelo binario no usa las longitudes de los documentos
+            longitudes = np.zeros(matriz.forma[0], dtype=np.int64)
+            nuevo = ModeloBinario(modelo.tokenizador)
+        nuevo.indexarFrecuencias(FrecuenciasCorpus(vocabulario, matriz, longitudes))
+
+    if modelo.indicePosicional is not None:
+        nuevo.indicePosicional = _indicePosicionalFusionado(
+            modelo.indicePosicional, conservar, segmentos, numTerminos, filaFinal
+        )
+    nuevo.listaStopwords = modelo.listaStopwords
+    nuevo.listaDocumentos = ids[orden].tolist()
+    nuevo.versionIndice = modelo.versionIndice + 1
+    return nuevo
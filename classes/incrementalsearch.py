@@ -0,0 +1,111 @@
+import threading
+import numpy as np
+
+
+class EvaluadorIncremental:
+    """
+    Evalúa consultas sucesivas (búsqueda mientras se escribe) reutilizando el trabajo
+    de la consulta anterior.
+
+    La puntuación de los modelos BM25 y TF-IDF es una suma por término:
+        puntuación(D) = Σ_t peso(t) * contribución(t, D)
+    Se guarda el vector de contribuciones de cada término de la consulta actual y el
+    acumulado por documento; cuando la nueva consulta solo agrega o quita términos,
+    basta con sumar (o restar) los vectores de los términos que cambiaron.
+
+    El modelo debe implementar pesosConsulta, contribucionTermino y resultadosAcumulados.
+    """
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.versionIndice = None
+        self.pesos = {}           # Término -> peso en la consulta acumulada
+        self.contribuciones = {}  # Término -> (IDs de documento, contribución) de la consulta actual
+        self.acumulado = None     # Puntuación parcial de cada documento
+        self.cobertura = None     # Número de términos de la consulta presentes en cada documento
+        self.estadisticas = {"incrementales": 0, "completas": 0, "postingsActualizados": 0}
+        self._bloqueo = threading.Lock()
+
+    @staticmethod
+    def soporta(modelo):
+        """ Indica si el modelo expone la puntuación por término que necesita el evaluador. """
+        return all(
+            hasattr(modelo, metodo) for metodo in ("pesosConsulta", "contribucionTermino", "resultadosAcumulados")
+        )
+
+    def buscar(self, consulta, k=5):
+        """ Retorna los k mejores resultados de la consulta, en el formato de modelo.buscar. """
+        return self.buscarTokens(self.modelo.preProcesar(consulta), k)
+
+    def buscarTokens(self, tokensConsulta, k=5, medicion=None):
+        """
+        Igual que buscar, con la consulta ya tokenizada.
+        Si se pasa una medición (ver controllers/instrumentation.py) se registran los tiempos
+        de las etapas puntuacion y topK y los postings y candidatos (documentos con puntuación).
+        """
+        with self._bloqueo:
+            if medicion is None:
+                self.actualizar(tokensConsulta)
+                return self.modelo.resultadosAcumulados(self.acumulado, self.pesos, k)
+
+            postingsAntes = self.estadisticas["postingsActualizados"]
+            with medicion.etapa("puntuacion"):
+                self.actualizar(tokensConsulta)
+            with medicion.etapa("topK"):
+                resultados = self.modelo.resultadosAcumulados(self.acumulado, self.pesos, k)
+            medicion.contar("postings", self.estadisticas["postingsActualizados"] - postingsAntes)
+            medicion.contar("candidatos", int(np.count_nonzero(self.cobertura)))
+            return resultados
+
+    def actualizar(self, tokensConsulta):
+        """ Lleva el acumulado desde la consulta anterior hasta la nueva. """
+        if self.acumulado is None or self.versionIndice != self.modelo.versionIndice:
+            # Modelo nuevo o puntuaciones cambiadas (reajuste, k1, b): nada es reutilizable
+            self.contribuciones = {}
+            self._reiniciar()
+
+        nuevos = self.modelo.pesosConsulta(tokensConsulta)
+        for terminoIndex in nuevos:
+            if terminoIndex not in self.contribuciones:
+                self.contribuciones[terminoIndex] = self.modelo.contribucionTermino(terminoIndex)
+
+        cambios = {
+            terminoIndex: nuevos.get(terminoIndex, 0) - self.pesos.get(terminoIndex, 0)
+            for terminoIndex in set(nuevos) | set(self.pesos)
+        }
+        cambios = {terminoIndex: delta for terminoIndex, delta in cambios.items() if delta != 0}
+
+        # Actualizar solo conviene si toca menos postings que puntuar la consulta desde cero
+        costoIncremental = sum(len(self.contribuciones[t][0]) for t in cambios)
+        costoCompleto = sum(len(self.contribuciones[t][0]) for t in nuevos)
+        if costoIncremental >= costoCompleto:
+            self._reiniciar()
+            cambios = nuevos
+            self.estadisticas["completas"] += 1
+        else:
+            self.estadisticas["incrementales"] += 1
+
+        for terminoIndex, delta in cambios.items():
+            documentos, valores = self.contribuciones[terminoIndex]
+            antes = self.pesos.get(terminoIndex, 0)
+            despues = nuevos.get(terminoIndex, 0)
+            # Los IDs de una lista de postings no se repiten: se puede sumar con indexado
+            self.acumulado[documentos] += delta * valores
+            if antes == 0:
+                self.cobertura[documentos] += 1
+            elif despues == 0:
+                self.cobertura[documentos] -= 1
+                # Sin términos de la consulta la puntuación es exactamente 0 (sin residuos de redondeo)
+                sinTerminos = documentos[self.cobertura[documentos] == 0]
+                self.acumulado[sinTerminos] = 0.0
+            self.estadisticas["postingsActualizados"] += len(documentos)
+
+        self.pesos = nuevos
+        self.contribuciones = {t: self.contribuciones[t] for t in nuevos}
+
+    def _reiniciar(self):
+        numDocumentos = len(self.modelo.listaDocumentos)
+        self.versionIndice = self.modelo.versionIndice
+        self.pesos = {}
+        self.acumulado = np.zeros(numDocumentos, dtype=float)
+        self.cobertura = np.zeros(numDocumentos, dtype=np.int32)
@@ -0,0 +1,199 @@
+import json
+import re
+import shutil
+from pathlib import Path
+import numpy as np
+from classes.binarymodel import ModeloBinario
+from classes.tfidfmodel import ModeloVectorialTfIdf
+from classes.bm25model import ModeloBM25
+from classes.sparsematrix import MatrizDispersa
+from classes.invertedindex import IndiceInvertido
+from classes.booleanindex import IndiceBooleano
+from classes.positionalindex import IndicePosicional
+from classes.compressedpostings import PostingsComprimidas
+
+# Formato nativo del índice en disco: un directorio con un archivo .npy por arreglo
+# y una cabecera JSON (versión, clase, vocabulario y parámetros).
+# Los arreglos se abren con np.load(mmap_mode='r'): la carga es casi instantánea y
+# las páginas se comparten entre procesos. No depende de rutas de clases de pickle.
+
+FORMATO_INDICE = "retrieval-inf-indice"
+VERSION_INDICE = 1
+ARCHIVO_CABECERA = "indice.json"
+EXTENSION_INDICE = ".indice"
+
+# Únicas clases que se pueden reconstruir desde una cabecera
+CLASES_MODELO = {clase.__name__: clase for clase in (ModeloBinario, ModeloVectorialTfIdf, ModeloBM25)}
+CLASES_AUXILIARES = {clase.__name__: clase for clase in (
+    MatrizDispersa, IndiceInvertido, IndiceBooleano, IndicePosicional, PostingsComprimidas
+)}
+
+
+class ErrorFormatoIndice(Exception):
+    """ El directorio no contiene un índice válido o su versión no es compatible. """
+
+
+def esIndice(ruta):
+    """ Indica si la ruta es un directorio de índice (contiene la cabecera). """
+    return (Path(ruta) / ARCHIVO_CABECERA).is_file()
+
+
+class _Escritor:
+    """ Convierte el estado de un objeto en JSON, escribiendo cada arreglo como .npy. """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.archivos = {}   # id(arreglo) -> nombre de archivo (los arreglos compartidos se guardan una vez)
+        self._vivos = []     # Mantiene vivos los arreglos mientras se usan sus id()
+
+    def codificar(self, valor, nombre):
+        if isinstance(valor, np.ndarray):
+            return {"__npy__": self._guardarArreglo(valor, nombre)}
+        if isinstance(valor, (MatrizDispersa, IndiceInvertido, IndiceBooleano, IndicePosicional, PostingsComprimidas)):
+            return {
+                "__clase__": type(valor).__name__,
+                "atributos": self.codificarAtributos(vars(valor), nombre + "."),
+            }
+        if isinstance(valor, (set, frozenset)):
+            return {"__conjunto__": sorted(valor)}
+        if isinstance(valor, tuple):
+            return {"__tupla__": [self.codificar(v, f"{nombre}.{i}") for i, v in enumerate(valor)]}
+        if isinstance(valor, list):
+            return [self.codificar(v, f"{nombre}.{i}") for i, v in enumerate(valor)]
+        if isinstance(valor, dict):
+            if not all(isinstance(clave, str) for clave in valor):
+                raise TypeError(f"Solo se admiten diccionarios con claves str: {nombre}")
+            return {"__dict__": {clave: self.codificar(v, f"{nombre}.{clave}") for clave, v in valor.items()}}
+        if isinstance(valor, np.generic):
+            return valor.item()
+        if valor is None or isinstance(valor, (bool, int, float, str)):
+            return valor
+        raise TypeError(f"Tipo no soportado en el índice: {nombre} ({type(valor).__name__})")
+
+    def codificarAtributos(self, atributos, prefijo=""):
+        return {nombre: self.codificar(valor, prefijo + nombre) for nombre, valor in atributos.items()}
+
+    def _guardarArreglo(self, arreglo, nombre):
+        if id(arreglo) in self.archivos:
+            return self.archivos[id(arreglo)]
+        if arreglo.dtype.hasobject:
+            raise TypeError(f"No se pueden guardar arreglos de objetos: {nombre}")
+        base = re.sub(r"[^\w.]", "_", nombre).lstrip("_.") or "arreglo"
+        nombreArchivo = base + ".npy"
+        sufijo = 1
+        while (self.directorio / nombreArchivo).exists():
+            sufijo += 1
+            nombreArchivo = f"{base}.{sufijo}.npy"
+        np.save(self.directorio / nombreArchivo, np.ascontiguousarray(arreglo), allow_pickle=False)
+        self.archivos[id(arreglo)] = nombreArchivo
+        self._vivos.append(arreglo)
+        return nombreArchivo
+
+
+class _Lector:
+    """ Reconstruye el estado desde la cabecera, abriendo cada .npy una sola vez. """
+
+    def __init__(self, directorio, mmap):
+        self.directorio = directorio
+        self.modoMmap = "r" if mmap else None
+        self.arreglos = {}   # nombre de archivo -> arreglo (comparte los arreglos repetidos)
+
+    def decodificar(self, valor):
+        if isinstance(valor, list):
+            return [self.decodificar(v) for v in valor]
+        if not isinstance(valor, dict):
+            return valor
+        if "__npy__" in valor:
+            return self._abrirArreglo(valor["__npy__"])
+        if "__clase__" in valor:
+            clase = CLASES_AUXILIARES.get(valor["__clase__"])
+            if clase is None:
+                raise ErrorFormatoIndice(f"Clase desconocida en el índice: {valor['__clase__']}")
+            objeto = clase.__new__(clase)
+            objeto.__dict__.update(self.decodificarAtributos(valor["atributos"]))
+            return objeto
+        if "__conjunto__" in valor:
+            return set(valor["__conjunto__"])
+        if "__tupla__" in valor:
+            return tuple(self.decodificar(v) for v in valor["__tupla__"])
+        if "__dict__" in valor:
+            return {clave: self.decodificar(v) for clave, v in valor["__dict__"].items()}
+        raise ErrorFormatoIndice(f"Entrada no reconocida en la cabecera: {sorted(valor)}")
+
+    def decodificarAtributos(self, atributos):
+        return {nombre: self.decodificar(valor) for nombre, valor in atributos.items()}
+
+    def _abrirArreglo(self, nombreArchivo):
+        if nombreArchivo not in self.arreglos:
+            ruta = self.directorio / nombreArchivo
+            if ruta.parent != self.directorio:
+                raise ErrorFormatoIndice(f"Ruta de arreglo inválida: {nombreArchivo}")
+            self.arreglos[nombreArchivo] = np.load(ruta, mmap_mode=self.modoMmap, allow_pickle=False)
+        return self.arreglos[nombreArchivo]
+
+
+def guardarIndice(modelo, rutaDirectorio):
+    """
+    Guarda el modelo en formato de índice nativo (directorio con .npy + cabecera JSON).
+    Se escribe primero en un directorio temporal y luego se reemplaza el destino,
+    así un índice a medio escribir nunca queda en la ruta final.
+    """
+    nombreClase = type(modelo).__name__
+    if nombreClase not in CLASES_MODELO:
+        raise TypeError(f"Modelo no soportado por el formato de índice: {nombreClase}")
+
+    rutaDirectorio = Path(rutaDirectorio)
+    rutaTemporal = rutaDirectorio.with_name(rutaDirectorio.name + ".tmp")
+    if rutaTemporal.exists():
+        shutil.rmtree(rutaTemporal)
+    rutaTemporal.mkdir(parents=True)
+
+    escritor = _Escritor(rutaTemporal)
+    atributos = dict(vars(modelo))
+    vocabulario = atributos.pop("vocabulario", {})
+    cabecera = {
+        "formato": FORMATO_INDICE,
+        "version": VERSION_INDICE,
+        "clase": nombreClase,
+        # Términos en orden de ID (el ID es la posición en la lista)
+        "vocabulario": sorted(vocabulario, key=vocabulario.get),
+        "parametros": escritor.codificarAtributos(atributos),
+    }
+    with open(rutaTemporal / ARCHIVO_CABECERA, "w", encoding="utf-8") as archivo:
+        json.dump(cabecera, archivo, ensure_ascii=False)
+
+    if rutaDirectorio.exists():
+        shutil.rmtree(rutaDirectorio)
+    rutaTemporal.rename(rutaDirectorio)
+    return rutaDirectorio
+
+
+def abrirIndice(rutaDirectorio, mmap=True):
+    """
+    Abre un índice guardado con guardarIndice y retorna el modelo listo para buscar.
+    Con mmap=True los arreglos quedan mapeados en memoria en modo solo lectura.
+    """
+    rutaDirectorio = Path(rutaDirectorio)
+    rutaCabecera = rutaDirectorio / ARCHIVO_CABECERA
+    if not rutaCabecera.is_file():
+        raise ErrorFormatoIndice(f"No se encontró la cabecera del índice: {rutaCabecera}")
+    with open(rutaCabecera, encoding="utf-8") as archivo:
+        cabecera = json.load(archivo)
+
+    if cabecera.get("formato") != FORMATO_INDICE:
+        raise ErrorFormatoIndice(f"Formato de índice desconocido: {cabecera.get('formato')}")
+    if cabecera.get("version") != VERSION_INDICE:
+        raise ErrorFormatoIndice(
+            f"Versión de índice no soportada: {cabecera.get('version')} (se esperaba {VERSION_INDICE})"
+        )
+    clase = CLASES_MODELO.get(cabecera.get("clase"))
+    if clase is None:
+        raise ErrorFormatoIndice(f"Clase de modelo desconocida: {cabecera.get('clase')}")
+
+    lector = _Lector(rutaDirectorio.resolve(), mmap)
+    estado = lector.decodificarAtributos(cabecera["parametros"])
+    estado["vocabulario"] = {termino: i for i, termino in enumerate(cabecera["vocabulario"])}
+    modelo = clase.__new__(clase)
+    # __setstate__ completa los atributos que agregaron versiones posteriores de la clase
+    modelo.__setstate__(estado)
+    return modelo
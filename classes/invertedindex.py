@@ -0,0 +1,170 @@
+import numpy as np
+from classes.sparsematrix import MatrizDispersa
+from classes.compressedpostings import PostingsComprimidas
+
+
+class IndiceInvertido:
+    """
+    Índice invertido: término -> lista de postings (IDs de documento ordenados + frecuencias).
+
+    Las listas de todos los términos se guardan concatenadas en dos arreglos de NumPy
+    y 'inicios' marca dónde empieza cada término (mismo esquema que una matriz CSC).
+
+    Opcionalmente guarda el impacto precalculado de cada posting (su contribución a la
+    puntuación, cuantizada) y cotas superiores por término y por bloque de postings,
+    usadas por la poda dinámica WAND / Block-Max WAND.
+
+    Con comprimir() las postings se guardan solo comprimidas por bloques
+    (ver classes/compressedpostings.py) y se decodifican término a término al buscar.
+    """
+
+    comprimidas = None   # PostingsComprimidas (los índices guardados antes no tienen el atributo)
+
+    def __init__(self, inicios, documentos, frecuencias, numDocumentos):
+        self.inicios = np.asarray(inicios, dtype=np.int64)         # Inicio de cada lista (longitud T + 1)
+        self.documentos = np.asarray(documentos, dtype=np.int32)   # IDs de documento ordenados por término
+        self.frecuencias = np.asarray(frecuencias)                 # f(t, D) de cada posting
+        self.numDocumentos = int(numDocumentos)
+
+        # Impactos precalculados (ver cuantizarImpactos)
+        self.impactos = None           # Impacto de cada posting (entero cuantizado o float)
+        self.escalaImpactos = 1.0      # impacto * escalaImpactos = contribución
+
+        # Cotas para poda dinámica (ver calcularCotas)
+        self.tamanoBloque = None
+        self.maximoTermino = None      # Máxima contribución de cada término
+        self.iniciosBloque = None      # Primer bloque de cada término (longitud T + 1)
+        self.maximoBloque = None       # Máxima contribución dentro de cada bloque
+        self.ultimoDocBloque = None    # Último ID de documento de cada bloque
+
+        self.comprimidas = None        # Con postings comprimidas, documentos y frecuencias quedan en None
+
+    @classmethod
+    def desdeMatriz(cls, matriz):
+        """
+        Construye el índice desde una matriz Documentos x Términos.
+        Si la matriz ya está en CSC se reutilizan sus arreglos sin copiarlos.
+        """
+        matrizCsc = matriz.convertir("csc")
+        return cls(matrizCsc.indptr, matrizCsc.indices, matrizCsc.data, matrizCsc.forma[0])
+
+    @property
+    def numTerminos(self):
+        return len(self.inicios) - 1
+
+    @property
+    def numPostings(self):
+        return int(self.inicios[-1])
+
+    def comprimir(self, tamanoBloque=128):
+        """
+        Comprime las postings por bloques (diferencias de IDs y frame-of-reference) y libera
+        los arreglos sin comprimir. Los impactos y las cotas no cambian.
+        """
+        if self.comprimidas is None:
+            self.comprimidas = PostingsComprimidas.comprimir(self.inicios, self.documentos, self.frecuencias, tamanoBloque)
+            self.documentos = None
+            self.frecuencias = None
+
+    def arreglos(self):
+        """ Retorna (IDs de documento, frecuencias) de todas las postings; si están comprimidas las descomprime. """
+        if self.comprimidas is not None:
+            return self.comprimidas.descomprimir()
+        return self.documentos, self.frecuencias
+
+    def postings(self, terminoIndex):
+        """ Retorna (IDs de documento, frecuencias) del término, sin copiar (o decodificadas). """
+        if self.comprimidas is not None:
+            return self.comprimidas.postings(terminoIndex)
+        inicio, fin = self.inicios[terminoIndex], self.inicios[terminoIndex + 1]
+        return self.documentos[inicio:fin], self.frecuencias[inicio:fin]
+
+    def impactosTermino(self, terminoIndex):
+        """ Impactos de las postings del término, sin copiar. """
+        return self.impactos[self.inicios[terminoIndex]:self.inicios[terminoIndex + 1]]
+
+    def postingsImpacto(self, terminoIndex):
+        """ Retorna (IDs de documento, impactos) del término. """
+        documentos, _ = self.postings(terminoIndex)
+        return documentos, self.impactosTermino(terminoIndex)
+
+    def cuantizarImpactos(self, valores, bits=8):
+        """
+        Guarda la contribución de cada posting como impacto entero de 'bits' bits
+        (o como float si bits es None), de forma que impacto * escalaImpactos ≈ contribución.
+        Las contribuciones negativas se guardan como 0 (no suman puntuación).
+        """
+        valores = np.maximum(np.asarray(valores, dtype=float), 0.0)
+        if bits is None:
+            self.impactos = valores
+            self.escalaImpactos = 1.0
+            return
+
+        maximo = valores.max() if len(valores) > 0 else 0.0
+        self.escalaImpactos = maximo / (2 ** bits - 1) if maximo > 0 else 1.0
+        cuantizados = np.rint(valores / self.escalaImpactos)
+        # Un posting con contribución positiva nunca se redondea a 0
+        cuantizados[(valores > 0) & (cuantizados == 0)] = 1
+        self.impactos = cuantizados.astype(np.min_scalar_type(2 ** bits - 1))
+
+    def impactosDecuantizados(self):
+        """ Contribución aproximada de cada posting a partir de su impacto. """
+        return self.impactos * self.escalaImpactos
+
+    def terminosPorPosting(self):
+        """ Índice de término de cada posting (expande 'inicios'). """
+        return np.repeat(np.arange(self.numTerminos), np.diff(self.inicios))
+
+    def calcularCotas(self, valores, tamanoBloque=128):
+        """
+        Calcula las cotas superiores a partir de la contribución de cada posting.
+        Cada lista se divide en bloques de 'tamanoBloque' postings y se guarda el
+        máximo de cada bloque junto con su último documento (Block-Max WAND).
+        """
+        longitudes = np.diff(self.inicios)
+        bloquesPorTermino = -(-longitudes // tamanoBloque)   # techo de la división
+        self.iniciosBloque = np.zeros(self.numTerminos + 1, dtype=np.int64)
+        np.cumsum(bloquesPorTermino, out=self.iniciosBloque[1:])
+        self.tamanoBloque = tamanoBloque
+
+        # Posición del primer posting de cada bloque
+        terminoBloque = np.repeat(np.arange(self.numTerminos), bloquesPorTermino)
+        ordenEnTermino = np.arange(len(terminoBloque)) - self.iniciosBloque[terminoBloque]
+        inicioBloque = self.inicios[terminoBloque] + ordenEnTermino * tamanoBloque
+        finBloque = np.minimum(inicioBloque + tamanoBloque, self.inicios[terminoBloque + 1])
+
+        valores = np.asarray(valores, dtype=float)
+        if len(valores) > 0:
+            self.maximoBloque = np.maximum.reduceat(valores, inicioBloque)
+        else:
+            self.maximoBloque = np.zeros(0, dtype=float)
+        if self.comprimidas is not None and self.comprimidas.tamanoBloque == tamanoBloque:
+            # Mismos bloques que las postings comprimidas: sus punteros de salto ya tienen el último documento
+            self.ultimoDocBloque = self.comprimidas.ultimoDocBloque
+        else:
+            self.ultimoDocBloque = self.arreglos()[0][finBloque - 1]
+
+        # El máximo de un término es el máximo de sus bloques
+        self.maximoTermino = np.zeros(self.numTerminos, dtype=float)
+        conPostings = bloquesPorTermino > 0
+        if conPostings.any():
+            self.maximoTermino[conPostings] = np.maximum.reduceat(
+                self.maximoBloque, self.iniciosBloque[:-1][conPostings]
+            )
+
+    def bloques(self, terminoIndex):
+        """ Retorna (último documento, máximo) de cada bloque del término, sin copiar. """
+        inicio, fin = self.iniciosBloque[terminoIndex], self.iniciosBloque[terminoIndex + 1]
+        return self.ultimoDocBloque[inicio:fin], self.maximoBloque[inicio:fin]
+
+    def frecuenciaDocumento(self):
+        """ Número de documentos que contienen cada término (df_t). """
+        return np.diff(self.inicios)
+
+    def comoMatriz(self):
+        """ Vista del índice como matriz dispersa CSC (Documentos x Términos); si está comprimido, una copia descomprimida. """
+        documentos, frecuencias = self.arreglos()
+        return MatrizDispersa(
+            self.inicios, documentos, frecuencias,
+            (self.numDocumentos, self.numTerminos), formato="csc"
+        )
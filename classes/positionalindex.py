@@ -0,0 +1,216 @@
+import numpy as np
+from classes.analyzer import FlujoTokens, FrecuenciasCorpus, tokenizarCorpus
+
+
+def flujoPosicional(documentos, tokenizador="nltk", numProcesos=1):
+    """
+    Flujo de tokens completo (con stopwords) para construir el índice posicional:
+    acepta textos o un FlujoTokens. Un FrecuenciasCorpus ya no tiene el orden de los tokens.
+    """
+    if isinstance(documentos, FlujoTokens):
+        return documentos
+    if isinstance(documentos, FrecuenciasCorpus):
+        raise ValueError("El índice posicional necesita los textos o un FlujoTokens, no un FrecuenciasCorpus")
+    return tokenizarCorpus(documentos, tokenizador, numProcesos)
+
+
+class IndicePosicional:
+    """
+    Posiciones de cada término en cada documento, para consultas de frase y de proximidad.
+
+    Las postings van ordenadas por término y documento (como las columnas de la matriz CSC
+    de los modelos) y cada una guarda sus posiciones codificadas por diferencias: la
+    primera posición y luego la distancia a la anterior, con el tipo entero sin signo más
+    pequeño que alcance (casi siempre uint8 / uint16).
+    Las posiciones cuentan todos los tokens del documento, incluidas las stopwords, así
+    "cancer of the skin" exige que 'skin' esté tres posiciones después de 'cancer'.
+    """
+
+    def __init__(self, inicios, documentos, desplazamientos, posiciones, longitudMaxima):
+        self.inicios = inicios                  # Inicio de las postings de cada término (longitud T + 1)
+        self.documentos = documentos            # Fila de documento de cada posting
+        self.desplazamientos = desplazamientos  # Inicio de las posiciones de cada posting (longitud P + 1)
+        self.posiciones = posiciones            # Posiciones codificadas por diferencias
+        self.longitudMaxima = int(longitudMaxima)
+
+    @classmethod
+    def desdeFlujo(cls, flujo, vocabulario):
+        """
+        Construye el índice desde un FlujoTokens sin filtrar; vocabulario es el del modelo
+        (los tokens que no están en él, p. ej. sus stopwords, no se indexan pero ocupan posición).
+        """
+        terminosFlujo = np.fromiter(
+            (vocabulario.get(termino, -1) for termino in flujo.vocabulario), dtype=np.int64, count=len(flujo.vocabulario)
+        )
+        terminos = terminosFlujo[flujo.terminos]
+        documentos = flujo.documentosPorToken()
+        posiciones = np.arange(len(terminos)) - flujo.inicios[documentos]
+        conservar = terminos >= 0
+        longitudes = flujo.longitudes()
+        return cls.desdeTripletas(
+            terminos[conservar], documentos[conservar], posiciones[conservar], len(vocabulario),
+            longitudes.max() if len(longitudes) else 0
+        )
+
+    @classmethod
+    def desdeTripletas(cls, terminos, documentos, posiciones, numTerminos, longitudMaxima):
+        """
+        Construye el índice desde (término, documento, posición) de cada aparición, ordenadas
+        por documento y posición; longitudMaxima acota las posiciones (longitud del documento
+        más largo, con stopwords).
+        """
+        terminos = np.asarray(terminos, dtype=np.int64)
+        documentos = np.asarray(documentos, dtype=np.int64)
+        posiciones = np.asarray(posiciones, dtype=np.int64)
+
+        # Ordenar por término; el orden estable deja cada término por documento y posición
+        orden = np.argsort(terminos, kind="stable")
+        terminos = terminos[orden]
+        documentos = documentos[orden]
+        posiciones = posiciones[orden]
+
+        # Una posting por cada (término, documento) distinto
+        esInicio = np.ones(len(terminos), dtype=bool)
+        esInicio[1:] = (terminos[1:] != terminos[:-1]) | (documentos[1:] != documentos[:-1])
+        iniciosPosting = np.flatnonzero(esInicio)
+        inicios = np.zeros(numTerminos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terminos[iniciosPosting], minlength=numTerminos), out=inicios[1:])
+
+        diferencias = posiciones.copy()
+        diferencias[1:] -= posiciones[:-1]
+        diferencias[iniciosPosting] = posiciones[iniciosPosting]
+        tipo = np.min_scalar_type(int(diferencias.max()) if len(diferencias) else 0)
+
+        return cls(
+            inicios, documentos[iniciosPosting].astype(np.int32), np.append(iniciosPosting, len(terminos)),
+            diferencias.astype(tipo), longitudMaxima
+        )
+
+    @property
+    def numTerminos(self):
+        return len(self.inicios) - 1
+
+    def tripletas(self):
+        """
+        Retorna (término, documento, posición absoluta) de cada aparición, ordenadas por
+        término, documento y posición (la inversa de desdeTripletas).
+        """
+        longitudes = np.diff(self.desplazamientos)
+        terminos = np.repeat(np.repeat(np.arange(self.numTerminos), np.diff(self.inicios)), longitudes)
+        documentos = np.repeat(self.documentos.astype(np.int64), longitudes)
+        # Suma acumulada por posting (decodifica las diferencias)
+        diferencias = self.posiciones.astype(np.int64)
+        acumulado = np.cumsum(diferencias)
+        primeros = self.desplazamientos[:-1]
+        if len(acumulado):
+            acumulado -= np.repeat(acumulado[primeros] - diferencias[primeros], longitudes)
+        return terminos, documentos, acumulado
+
+    def postings(self, terminoIndex):
+        """ Documentos (ordenados) que contienen el término. """
+        return self.documentos[self.inicios[terminoIndex]:self.inicios[terminoIndex + 1]]
+
+    def frecuenciaDocumento(self, terminoIndex):
+        return int(self.inicios[terminoIndex + 1] - self.inicios[terminoIndex])
+
+    def _posicionesDocumentos(self, terminoIndex, candidatos):
+        """
+        Posiciones absolutas del término en los candidatos (que lo contienen): retorna el
+        documento y la posición de cada aparición, ordenados por documento y posición.
+        Solo se decodifican las postings de los candidatos.
+        """
+        postings = self.inicios[terminoIndex] + np.searchsorted(self.postings(terminoIndex), candidatos)
+        inicios = self.desplazamientos[postings]
+        longitudes = self.desplazamientos[postings + 1] - inicios
+        primeros = np.cumsum(longitudes) - longitudes
+        indices = np.arange(longitudes.sum()) + np.repeat(inicios - primeros, longitudes)
+
+        # Suma acumulada por posting (decodifica las diferencias)
+        diferencias = self.posiciones[indices].astype(np.int64)
+        acumulado = np.cumsum(diferencias)
+        posiciones = acumulado - np.repeat(acumulado[primeros] - diferencias[primeros], longitudes)
+        return np.repeat(candidatos, longitudes).astype(np.int64), posiciones
+
+    def _candidatos(self, terminos):
+        """ Intersección de las postings de los términos, de menor a mayor df. """
+        candidatos = None
+        for terminoIndex in sorted(set(terminos), key=self.frecuenciaDocumento):
+            postings = self.postings(terminoIndex)
+            candidatos = postings if candidatos is None else np.intersect1d(candidatos, postings, assume_unique=True)
+            if len(candidatos) == 0:
+                break
+        return candidatos
+
+    def documentosFrase(self, terminos):
+        """
+        Documentos (filas ordenadas) con la frase: terminos es una lista de
+        (índice de término, distancia a la primera palabra de la frase).
+        Primero se intersectan las postings y solo en los documentos que quedan se
+        comparan las posiciones, término a término, descartando candidatos en cada paso.
+        """
+        candidatos = self._candidatos([terminoIndex for terminoIndex, _ in terminos])
+        maxDistancia = max(distancia for _, distancia in terminos)
+        # Clave única por (documento, posición de inicio de la frase)
+        base = self.longitudMaxima + maxDistancia + 1
+        claves = None
+        for terminoIndex, distancia in sorted(terminos, key=lambda t: self.frecuenciaDocumento(t[0])):
+            if len(candidatos) == 0:
+                break
+            documentos, posiciones = self._posicionesDocumentos(terminoIndex, candidatos)
+            clavesTermino = documentos * base + (posiciones - distancia + maxDistancia)
+            claves = clavesTermino if claves is None else claves[np.isin(claves, clavesTermino, assume_unique=True)]
+            candidatos = np.unique(claves // base)
+        return candidatos.astype(np.int64)
+
+    def documentosCerca(self, terminoA, terminoB, distancia):
+        """
+        Documentos en los que entre los dos términos hay a lo sumo 'distancia' posiciones
+        (en cualquier orden): NEAR/0 son términos contiguos, así sus posiciones difieren en
+        a lo sumo distancia + 1.
+        """
+        candidatos = self._candidatos([terminoA, terminoB])
+        if len(candidatos) == 0:
+            return candidatos.astype(np.int64)
+        separacion = distancia + 1   # Máxima diferencia de posiciones
+        # Con esta base las claves de documentos distintos nunca quedan a 'separacion' o menos
+        base = self.longitudMaxima + separacion + 1
+        documentosA, posicionesA = self._posicionesDocumentos(terminoA, candidatos)
+        documentosB, posicionesB = self._posicionesDocumentos(terminoB, candidatos)
+        clavesA = documentosA * base + posicionesA
+        clavesB = documentosB * base + posicionesB
+
+        # Vecinos de cada aparición de A entre las de B: el siguiente y el anterior (estrictos)
+        siguiente = np.searchsorted(clavesB, clavesA, side="right")
+        anterior = np.searchsorted(clavesB, clavesA, side="left") - 1
+        cerca = np.zeros(len(clavesA), dtype=bool)
+        hay = siguiente < len(clavesB)
+        cerca[hay] |= clavesB[siguiente[hay]] - clavesA[hay] <= separacion
+        hay = anterior >= 0
+        cerca[hay] |= clavesA[hay] - clavesB[anterior[hay]] <= separacion
+        return np.unique(documentosA[cerca])
+
+    def documentosRestriccion(self, nodo, vocabulario):
+        """
+        Documentos (filas ordenadas) que cumplen un nodo ("FRASE", ...) o ("CERCA", ...) de
+        classes/booleanquery.py; si algún token no está en el vocabulario no hay ninguno.
+        """
+        if nodo[0] == "FRASE":
+            terminos = [(vocabulario.get(token), distancia) for token, distancia in nodo[1]]
+            if any(terminoIndex is None for terminoIndex, _ in terminos):
+                return np.zeros(0, dtype=np.int64)
+            return self.documentosFrase(terminos)
+        tokenA, tokenB, distancia = nodo[1]
+        terminoA, terminoB = vocabulario.get(tokenA), vocabulario.get(tokenB)
+        if terminoA is None or terminoB is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.documentosCerca(terminoA, terminoB, distancia)
+
+    def documentosRestricciones(self, nodos, vocabulario):
+        """ Documentos que cumplen todos los nodos (intersección), para los modelos con ranking. """
+        documentos = None
+        for nodo in nodos:
+            filas = self.documentosRestriccion(nodo, vocabulario)
+            documentos = filas if documentos is None else np.intersect1d(documentos, filas, assume_unique=True)
+            if len(documentos) == 0:
+                break
+        return documentos
@@ -0,0 +1,163 @@
+import json
+import shutil
+from array import array
+from pathlib import Path
+import numpy as np
+from classes.analyzer import FrecuenciasCorpus, tokenizar
+from classes.sparsematrix import MatrizDispersa
+
+# Documentos que se acumulan en memoria antes de escribir un segmento
+DOCUMENTOS_POR_SEGMENTO = 10000
+ARCHIVO_CABECERA_SEGMENTOS = "segmentos.json"
+
+
+class ConstructorSegmentos:
+    """
+    Construye las frecuencias del corpus (FrecuenciasCorpus) a partir de un flujo de textos
+    sin tenerlo completo en memoria.
+
+    Los documentos se tokenizan en bloques de documentosPorSegmento; cada bloque se escribe
+    en el directorio como un segmento (postings ordenados por término y documento, con IDs
+    globales) y se libera. Al finalizar, los segmentos se fusionan en una única matriz CSC
+    escrita en disco y abierta con memoria mapeada: la memoria pico de la ingesta depende
+    del tamaño de un segmento y del vocabulario, no del tamaño del corpus. Ajustar un modelo
+    con el resultado sí copia sus postings a RAM (ver la cota en construir_indice.py).
+    El resultado es idéntico al de tokenizar todo el corpus de una vez.
+    """
+
+    def __init__(self, directorio, listaStopwords=(), tokenizador="nltk",
+                 documentosPorSegmento=DOCUMENTOS_POR_SEGMENTO):
+        self.directorio = Path(directorio)
+        self.listaStopwords = set(listaStopwords)
+        self.tokenizador = tokenizador
+        self.documentosPorSegmento = documentosPorSegmento
+        self.vocabulario = {}        # Término -> ID global (orden de primera aparición)
+        self.segmentos = []          # Nombre de cada segmento escrito
+        self.numDocumentos = 0
+        self._reiniciarSegmento()
+
+        if self.directorio.exists():
+            shutil.rmtree(self.directorio)
+        self.directorio.mkdir(parents=True)
+
+    def _reiniciarSegmento(self):
+        self._terminos = array("i")
+        self._inicios = [0]
+
+    def agregar(self, textos):
+        """ Agrega documentos (cualquier iterable o generador de textos). """
+        for texto in textos:
+            for token in tokenizar(texto, self.tokenizador):
+                if token not in self.listaStopwords:
+                    self._terminos.append(self.vocabulario.setdefault(token, len(self.vocabulario)))
+            self._inicios.append(len(self._terminos))
+            if len(self._inicios) - 1 >= self.documentosPorSegmento:
+                self._escribirSegmento()
+        return self
+
+    def _escribirSegmento(self):
+        numDocumentosSegmento = len(self._inicios) - 1
+        if numDocumentosSegmento == 0:
+            return
+        terminos = np.frombuffer(self._terminos, dtype=np.int32)
+        longitudes = np.diff(np.asarray(self._inicios, dtype=np.int64))
+        documentos = np.repeat(np.arange(numDocumentosSegmento), longitudes)
+        # Postings del segmento ordenados por (término, documento), con los IDs globales de término
+        matriz = MatrizDispersa.desdeTripletas(
+            documentos, terminos, (numDocumentosSegmento, len(self.vocabulario)), formato="csc", dtype=np.int32
+        )
+
+        nombre = f"segmento{len(self.segmentos):05d}"
+        terminosPosting = matriz.indicesMayores().astype(np.int32)
+        np.save(self.directorio / f"{nombre}.terminos.npy", terminosPosting, allow_pickle=False)
+        np.save(self.directorio / f"{nombre}.documentos.npy", matriz.indices + np.int32(self.numDocumentos),
+                allow_pickle=False)
+        np.save(self.directorio / f"{nombre}.frecuencias.npy", matriz.data, allow_pickle=False)
+        np.save(self.directorio / f"{nombre}.longitudes.npy", longitudes, allow_pickle=False)
+        self.segmentos.append(nombre)
+        self.numDocumentos += numDocumentosSegmento
+        self._reiniciarSegmento()
+
+    def finalizar(self):
+        """
+        Escribe el último segmento, fusiona todos en una matriz CSC y retorna el
+        FrecuenciasCorpus (con sus arreglos mapeados en memoria desde el directorio).
+        """
+        self._escribirSegmento()
+        numTerminos = len(self.vocabulario)
+
+        def abrir(nombre, parte):
+            return np.load(self.directorio / f"{nombre}.{parte}.npy", mmap_mode="r")
+
+        # 1. Número de postings de cada término en cada segmento -> indptr final
+        conteos = [np.bincount(abrir(nombre, "terminos"), minlength=numTerminos) for nombre in self.segmentos]
+        indptr = np.zeros(numTerminos + 1, dtype=np.int64)
+        for conteo in conteos:
+            indptr[1:] += conteo
+        np.cumsum(indptr, out=indptr)
+        numPostings = int(indptr[-1])
+
+        # 2. Cada segmento copia sus postings a su tramo de cada término; como los segmentos
+        #    cubren documentos consecutivos, las listas finales quedan ordenadas por documento
+        documentos = np.lib.format.open_memmap(
+            self.directorio / "documentos.npy", mode="w+", dtype=np.int32, shape=(numPostings,)
+        )
+        frecuencias = np.lib.format.open_memmap(
+            self.directorio / "frecuencias.npy", mode="w+", dtype=np.int32, shape=(numPostings,)
+        )
+        longitudes = np.lib.format.open_memmap(
+            self.directorio / "longitudes.npy", mode="w+", dtype=np.int64, shape=(self.numDocumentos,)
+        )
+        siguiente = indptr[:-1].copy()   # Próxima posición libre de cada término
+        inicioDocumentos = 0
+        for nombre, conteo in zip(self.segmentos, conteos):
+            terminos = abrir(nombre, "terminos")
+            iniciosSegmento = np.zeros(numTerminos + 1, dtype=np.int64)
+            np.cumsum(conteo, out=iniciosSegmento[1:])
+            destino = siguiente[terminos] + np.arange(len(terminos)) - iniciosSegmento[terminos]
+            documentos[destino] = abrir(nombre, "documentos")
+            frecuencias[destino] = abrir(nombre, "frecuencias")
+            siguiente += conteo
+            longitudesSegmento = abrir(nombre, "longitudes")
+            longitudes[inicioDocumentos:inicioDocumentos + len(longitudesSegmento)] = longitudesSegmento
+            inicioDocumentos += len(longitudesSegmento)
+        np.save(self.directorio / "indptr.npy", indptr, allow_pickle=False)
+        for arreglo in (documentos, frecuencias, longitudes):
+            arreglo.flush()
+        del documentos, frecuencias, longitudes
+
+        # 3. Los segmentos ya no hacen falta
+        for nombre in self.segmentos:
+            for parte in ("terminos", "documentos", "frecuencias", "longitudes"):
+                (self.directorio / f"{nombre}.{parte}.npy").unlink()
+        with open(self.directorio / ARCHIVO_CABECERA_SEGMENTOS, "w", encoding="utf-8") as archivo:
+            json.dump({
+                "numDocumentos": self.numDocumentos,
+                "numSegmentos": len(self.segmentos),
+                # Términos en orden de ID
+                "vocabulario": list(self.vocabulario),
+            }, archivo, ensure_ascii=False)
+        return abrirFrecuencias(self.directorio)
+
+
+def abrirFrecuencias(directorio, mmap=True):
+    """ Abre las frecuencias fusionadas por ConstructorSegmentos.finalizar. """
+    directorio = Path(directorio)
+    with open(directorio / ARCHIVO_CABECERA_SEGMENTOS, encoding="utf-8") as archivo:
+        cabecera = json.load(archivo)
+    modo = "r" if mmap else None
+    vocabulario = {termino: i for i, termino in enumerate(cabecera["vocabulario"])}
+    matrizFrecuencia = MatrizDispersa(
+        np.load(directorio / "indptr.npy", mmap_mode=modo),
+        np.load(directorio / "documentos.npy", mmap_mode=modo),
+        np.load(directorio / "frecuencias.npy", mmap_mode=modo),
+        (cabecera["numDocumentos"], len(vocabulario)), formato="csc"
+    )
+    return FrecuenciasCorpus(vocabulario, matrizFrecuencia, np.load(directorio / "longitudes.npy", mmap_mode=modo))
+
+
+def construirFrecuencias(textos, directorio, listaStopwords=(), tokenizador="nltk",
+                         documentosPorSegmento=DOCUMENTOS_POR_SEGMENTO):
+    """ Ingesta por segmentos de un iterable de textos; retorna el FrecuenciasCorpus fusionado. """
+    constructor = ConstructorSegmentos(directorio, listaStopwords, tokenizador, documentosPorSegmento)
+    return constructor.agregar(textos).finalizar()
@@ -0,0 +1,242 @@
+import numpy as np
+
+
+class MatrizDispersa:
+    """
+    Matriz dispersa comprimida (CSR / CSC) implementada solo con arreglos de NumPy.
+
+    Solo se guardan las celdas distintas de cero, en tres arreglos:
+    - indptr: posición de inicio de cada vector comprimido (filas en CSR, columnas en CSC)
+    - indices: índice en el otro eje (columna en CSR, fila en CSC) de cada valor
+    - data: valor de cada celda
+    La memoria es proporcional al número de entradas (postings), no a Documentos x Términos.
+    """
+
+    FORMATOS = ("csr", "csc")
+
+    def __init__(self, indptr, indices, data, forma, formato="csr"):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato de matriz dispersa no soportado: {formato}")
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data)
+        self.forma = (int(forma[0]), int(forma[1]))  # (Filas, Columnas)
+        self.formato = formato
+
+    # --- Construcción ---
+
+    @classmethod
+    def desdeTripletas(cls, filas, columnas, forma, valores=None, formato="csr",
+                       dtype=np.int32, binaria=False):
+        """
+        Construye la matriz a partir de tripletas (fila, columna, valor).
+        Las tripletas repetidas se suman, de modo que pasar un 1 por cada token
+        produce directamente la matriz de frecuencias. Con binaria=True las
+        repetidas se marcan con 1 (matriz de ocurrencia).
+        """
+        filas = np.asarray(filas, dtype=np.int64)
+        columnas = np.asarray(columnas, dtype=np.int64)
+        if valores is None:
+            valores = np.ones(len(filas), dtype=np.int64)
+        valores = np.asarray(valores)
+
+        # El eje comprimido es el de las filas en CSR y el de las columnas en CSC
+        if formato == "csr":
+            ejeMayor, ejeMenor, tamMayor, tamMenor = filas, columnas, forma[0], forma[1]
+        else:
+            ejeMayor, ejeMenor, tamMayor, tamMenor = columnas, filas, forma[1], forma[0]
+
+        # Ordenar por (eje mayor, eje menor) y sumar duplicados
+        clave = ejeMayor * tamMenor + ejeMenor
+        orden = np.argsort(clave, kind="stable")
+        clave = clave[orden]
+        clavesUnicas, inicios = np.unique(clave, return_index=True)
+        if binaria:
+            data = np.ones(len(clavesUnicas), dtype=dtype)
+        elif len(clave) > 0:
+            data = np.add.reduceat(valores[orden], inicios).astype(dtype)
+        else:
+            data = np.zeros(0, dtype=dtype)
+
+        mayores = clavesUnicas // max(tamMenor, 1)
+        indices = clavesUnicas % max(tamMenor, 1)
+
+        indptr = np.zeros(tamMayor + 1, dtype=np.int64)
+        np.cumsum(np.bincount(mayores, minlength=tamMayor), out=indptr[1:])
+        return cls(indptr, indices, data, forma, formato)
+
+    @classmethod
+    def desdeDensa(cls, matriz, formato="csr"):
+        """ Convierte una matriz densa de NumPy (p. ej. de un modelo antiguo) a formato disperso. """
+        matriz = np.asarray(matriz)
+        filas, columnas = np.nonzero(matriz)
+        return cls.desdeTripletas(
+            filas, columnas, matriz.shape, valores=matriz[filas, columnas],
+            formato=formato, dtype=matriz.dtype
+        )
+
+    # --- Propiedades ---
+
+    @property
+    def nnz(self):
+        """ Número de celdas almacenadas (distintas de cero). """
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        """ Memoria ocupada por los tres arreglos. """
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def __repr__(self):
+        return (
+            f"<MatrizDispersa {self.formato.upper()} {self.forma[0]}x{self.forma[1]}, "
+            f"{self.nnz} entradas, dtype={self.data.dtype}, {self.nbytes / 1024:.1f} KiB>"
+        )
+
+    # --- Acceso ---
+
+    def segmento(self, i):
+        """
+        Retorna (indices, valores) del i-ésimo vector comprimido, sin copiar:
+        la fila i en CSR o la columna i en CSC.
+        """
+        inicio, fin = self.indptr[i], self.indptr[i + 1]
+        return self.indices[inicio:fin], self.data[inicio:fin]
+
+    def indicesMayores(self):
+        """ Índice en el eje comprimido de cada entrada (expande indptr). """
+        return np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+
+    def coordenadas(self):
+        """ Retorna (filas, columnas) de cada entrada almacenada. """
+        if self.formato == "csr":
+            return self.indicesMayores(), self.indices
+        return self.indices, self.indicesMayores()
+
+    def columnaDensa(self, j):
+        """ Retorna la columna j como vector denso de longitud Filas. """
+        columna = np.zeros(self.forma[0], dtype=self.data.dtype)
+        if self.formato == "csc":
+            filas, valores = self.segmento(j)
+        else:
+            mascara = self.indices == j
+            filas, valores = self.indicesMayores()[mascara], self.data[mascara]
+        columna[filas] = valores
+        return columna
+
+    def densa(self):
+        """ Materializa la matriz completa (solo para depuración o corpus pequeños). """
+        matriz = np.zeros(self.forma, dtype=self.data.dtype)
+        filas, columnas = self.coordenadas()
+        matriz[filas, columnas] = self.data
+        return matriz
+
+    # --- Operaciones ---
+
+    def convertir(self, formato):
+        """ Retorna la misma matriz comprimida en el otro eje (CSR <-> CSC). """
+        if formato == self.formato:
+            return self
+        filas, columnas = self.coordenadas()
+        return MatrizDispersa.desdeTripletas(
+            filas, columnas, self.forma, valores=self.data, formato=formato, dtype=self.data.dtype
+        )
+
+    def transpuesta(self):
+        """ Transpuesta sin copiar: los mismos arreglos en CSR son la transpuesta en CSC y viceversa. """
+        otroFormato = "csc" if self.formato == "csr" else "csr"
+        return MatrizDispersa(self.indptr, self.indices, self.data, (self.forma[1], self.forma[0]), otroFormato)
+
+    def seleccionarVectores(self, seleccion):
+        """
+        Submatriz con los vectores comprimidos indicados, en ese orden: columnas en CSC
+        o filas en CSR (p. ej. quitar las columnas de las stopwords). La submatriz es una
+        copia en memoria, aunque los arreglos originales estén mapeados desde disco.
+        """
+        seleccion = np.asarray(seleccion, dtype=np.int64)
+        inicios = self.indptr[seleccion]
+        longitudes = self.indptr[seleccion + 1] - inicios
+        indptr = np.zeros(len(seleccion) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=indptr[1:])
+        # Posición en los arreglos originales de cada entrada conservada
+        posiciones = np.repeat(inicios - indptr[:-1], longitudes) + np.arange(indptr[-1])
+        if self.formato == "csc":
+            forma = (self.forma[0], len(seleccion))
+        else:
+            forma = (len(seleccion), self.forma[1])
+        return MatrizDispersa(indptr, self.indices[posiciones], self.data[posiciones], forma, self.formato)
+
+    def conteoPorColumna(self):
+        """ Número de entradas distintas de cero por columna (df_t si las columnas son términos). """
+        if self.formato == "csc":
+            return np.diff(self.indptr)
+        return np.bincount(self.indices, minlength=self.forma[1])
+
+    def normasFilas(self):
+        """ Norma euclidiana (L2) de cada fila. """
+        filas, _ = self.coordenadas()
+        cuadrados = self.data.astype(float) ** 2
+        return np.sqrt(np.bincount(filas, weights=cuadrados, minlength=self.forma[0]))
+
+    def escalarColumnas(self, vector):
+        """ Multiplica cada columna j por vector[j] (broadcasting de un vector fila). """
+        _, columnas = self.coordenadas()
+        data = self.data * np.asarray(vector)[columnas]
+        return MatrizDispersa(self.indptr, self.indices, data, self.forma, self.formato)
+
+    def escalarFilas(self, vector):
+        """ Multiplica cada fila i por vector[i] (broadcasting de un vector columna). """
+        filas, _ = self.coordenadas()
+        data = self.data * np.asarray(vector)[filas]
+        return MatrizDispersa(self.indptr, self.indices, data, self.forma, self.formato)
+
+    def productoVector(self, vector):
+        """
+        Producto matriz-vector (Filas x Columnas) . (Columnas) -> (Filas).
+        En CSC solo se recorren las columnas donde el vector es distinto de cero.
+        """
+        vector = np.asarray(vector)
+        resultado = np.zeros(self.forma[0], dtype=np.result_type(self.data, vector, float))
+        if self.formato == "csc":
+            for j in np.flatnonzero(vector):
+                filas, valores = self.segmento(j)
+                resultado[filas] += valores * vector[j]
+            return resultado
+        filas = self.indicesMayores()
+        return np.bincount(
+            filas, weights=self.data * vector[self.indices], minlength=self.forma[0]
+        ).astype(resultado.dtype, copy=False)
+
+    def productoDispersa(self, otra, densa=False):
+        """
+        Producto de dos matrices dispersas (Filas x n) . (n x Columnas).
+        Cada entrada (i, j, v) de esta matriz aporta v * fila j de la otra matriz a la fila i
+        del resultado; todas las filas se expanden a la vez y las celdas repetidas se suman.
+        Retorna una matriz dispersa CSR, o un arreglo denso con densa=True (conviene cuando
+        el resultado tiene pocas celdas en cero, p. ej. puntuaciones de muchas consultas).
+        """
+        otra = otra.convertir("csr")
+        filas, columnas = self.coordenadas()
+        numColumnas = otra.forma[1]
+
+        # Expandir, para cada entrada, las posiciones de la fila correspondiente de la otra matriz
+        inicios = otra.indptr[columnas]
+        longitudes = otra.indptr[columnas + 1] - inicios
+        entrada = np.repeat(np.arange(len(filas)), longitudes)
+        desplazamiento = np.arange(len(entrada)) - np.repeat(np.cumsum(longitudes) - longitudes, longitudes)
+        posiciones = inicios[entrada] + desplazamiento
+
+        valores = self.data[entrada] * otra.data[posiciones]
+        if densa:
+            destino = filas[entrada] * numColumnas + otra.indices[posiciones]
+            resultado = np.bincount(destino, weights=valores, minlength=self.forma[0] * numColumnas)
+            return resultado.reshape(self.forma[0], numColumnas)
+        return MatrizDispersa.desdeTripletas(
+            filas[entrada], otra.indices[posiciones], (self.forma[0], numColumnas),
+            valores=valores, dtype=valores.dtype
+        )
+
+    def __matmul__(self, otra):
+        if isinstance(otra, MatrizDispersa):
+            return self.productoDispersa(otra)
+        return self.productoVector(otra)
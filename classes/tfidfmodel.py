@@ -1,29 +1,57 @@
 import numpy as np
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from classes.analyzer import preProcesar, obtenerFrecuencias, tokensConPosicion
+from classes.sparsematrix import MatrizDispersa
+from classes.invertedindex import IndiceInvertido
+from classes.topk import seleccionarTopK
+from classes.batchsearch import buscarTopKLote
+from classes.booleanquery import analizarConsulta, restriccionesPosicionales
+from classes.positionalindex import IndicePosicional, flujoPosicional
 
 
 class ModeloVectorialTfIdf:
     """
     Implementación del Modelo Vectorial utilizando la ponderación TF-IDF.
     """
-    def __init__(self):
+    def __init__(self, tokenizador="nltk"):
         self.vocabulario = {}        # Término a ID (índice de columna)
         self.vectorIdf = None        # Vector de NumPy con los pesos IDF
-        self.matrizTfIdf = None       # Matriz de NumPy (Documentos x Términos)
+        self.matrizTfIdf = None       # Matriz dispersa CSC (Documentos x Términos)
         self.listaStopwords = set(stopwords.words("english"))
+        self.tokenizador = tokenizador # 'nltk' o 'rapido' (ver classes/analyzer.py)
         self.listaDocumentos = []    # Lista de IDs/Índices de documentos
         self.numDocumentos = 0       # Total de documentos en el corpus
+        self.versionIndice = 0       # Cambia cada vez que se vuelve a ajustar el modelo
+        self.indicePosicional = None # Posiciones de los términos (opcional, para frases y NEAR/n)
+        self.comprimirPostings = False  # Guardar frecuencias comprimidas en lugar de matrizTfIdf
+        self.indiceInvertido = None  # Postings de frecuencias comprimidas (solo con comprimirPostings)
+        self.inversasNorma = None    # 1 / norma TF-IDF de cada documento (solo con comprimirPostings)
+
+    def __setstate__(self, estado):
+        """ Permite cargar modelos serializados con la matriz densa original. """
+        estado.setdefault("tokenizador", "nltk")
+        estado.setdefault("versionIndice", 0)
+        estado.setdefault("indicePosicional", None)
+        estado.setdefault("comprimirPostings", False)
+        estado.setdefault("indiceInvertido", None)
+        estado.setdefault("inversasNorma", None)
+        self.__dict__.update(estado)
+        if isinstance(self.matrizTfIdf, np.ndarray):
+            self.matrizTfIdf = MatrizDispersa.desdeDensa(self.matrizTfIdf, formato="csc")
 
     def preProcesar(self, texto):
         """ Tokenización y eliminación de stopwords (reutilizado). """
-        textoMin = texto.lower()
-        tokens = word_tokenize(textoMin)
-        tokensFiltrados = [
-            token for token in tokens
-            if token.isalpha() and token not in self.listaStopwords
-        ]
-        return tokensFiltrados
+        return preProcesar(texto, self.listaStopwords, self.tokenizador)
+
+    def posicionesFrase(self, texto):
+        """ Tokens sin stopwords con su posición (para las frases entre comillas). """
+        return tokensConPosicion(texto, self.listaStopwords, self.tokenizador)
+
+    def restriccionesConsulta(self, consulta):
+        """ Frases entre comillas y NEAR/n de la consulta (ninguna si no hay índice posicional). """
+        if self.indicePosicional is None:
+            return ()
+        return restriccionesPosicionales(analizarConsulta(consulta, self.preProcesar, self.posicionesFrase))
 
     # --- Ponderación del Modelo ---
 
@@ -41,67 +69,97 @@ class ModeloVectorialTfIdf:
     def calcularIdf(self, matrizTf):
         """ Calcula la Frecuencia Inversa de Documento (IDF) para todos los términos. """
         # Frecuencia de documento (df): cuántos documentos contienen el término
-        # Sumamos las ocurrencias (0s y 1s) a lo largo de los documentos (eje 0)
-        documentosConTermino = np.sum(matrizTf > 0, axis=0)
+        # En la matriz dispersa es el número de entradas de cada columna
+        documentosConTermino = matrizTf.conteoPorColumna()
 
+        return self.formulaIdf(self.numDocumentos, documentosConTermino)
+
+    @staticmethod
+    def formulaIdf(numDocumentos, documentosConTermino):
+        """ IDF suavizado para un vector de df_t (también lo usa classes/incrementalindex.py). """
         # division por cero
         # log(N / df_t) + 1
-        idfVector = np.log((self.numDocumentos + 1) / (documentosConTermino + 1)) + 1
-
-        return idfVector
+        return np.log((numDocumentos + 1) / (documentosConTermino + 1)) + 1
 
-    def normalizarMatriz(self, matriz):
-        """ Normaliza los vectores de la matriz a longitud unitaria (norma L2). """
+    def inversasNormas(self, matriz):
+        """ 1 / norma L2 de cada fila de la matriz (0 si la fila es nula). """
         # Calcular la norma euclidiana (L2-norm) de cada fila (vector de documento)
-        normas = np.linalg.norm(matriz, axis=1)
+        normas = matriz.normasFilas()
         # Para evitar división por cero, solo dividimos donde la norma es > 0
-        matrizNormalizada = np.divide(
-            matriz,
-            normas[:, np.newaxis],
-            out=np.zeros_like(matriz, dtype=float), # Si la norma es 0, deja el vector como 0
-            where=normas[:, np.newaxis]!=0
+        return np.divide(
+            1.0,
+            normas,
+            out=np.zeros_like(normas), # Si la norma es 0, deja el vector como 0
+            where=normas != 0
         )
-        return matrizNormalizada
 
-    def ajustarCorpus(self, serieDocumentos):
+    def normalizarMatriz(self, matriz):
+        """ Normaliza los vectores de la matriz a longitud unitaria (norma L2). """
+        return matriz.escalarFilas(self.inversasNormas(matriz))
+
+    def ajustarCorpus(self, serieDocumentos, numProcesos=1, posiciones=False, comprimirPostings=False):
         """
         Crea el vocabulario, la matriz de frecuencia y calcula la matriz TF-IDF final.
+        serieDocumentos puede ser un FlujoTokens ya tokenizado o un FrecuenciasCorpus
+        (ver classes.analyzer y la ingesta por segmentos en classes/segmentbuilder.py).
+        numProcesos > 1 reparte la tokenización entre varios procesos (None = todos los núcleos).
+        Con posiciones=True se construye además el índice posicional, para las frases entre
+        comillas y NEAR/n (necesita los textos o un FlujoTokens).
+        Con comprimirPostings=True no se guarda la matriz TF-IDF sino las frecuencias comprimidas
+        por bloques (ver classes/compressedpostings.py) y la norma de cada documento.
         """
+        self.comprimirPostings = comprimirPostings
+        if posiciones:
+            serieDocumentos = flujoPosicional(serieDocumentos, self.tokenizador, numProcesos)
+        frecuencias = obtenerFrecuencias(serieDocumentos, self.listaStopwords, self.tokenizador, numProcesos)
+        self.vocabulario = frecuencias.vocabulario
+        self.listaDocumentos = list(range(frecuencias.numDocumentos))
 
-        documentosTokenizados = []
-        for docId, texto in enumerate(serieDocumentos):
-            tokens = self.preProcesar(texto)
-            documentosTokenizados.append(tokens)
-            self.listaDocumentos.append(docId)
-            for token in tokens:
-                if token not in self.vocabulario:
-                    self.vocabulario[token] = len(self.vocabulario)
-
-        self.numDocumentos = len(self.listaDocumentos)
+        self.numDocumentos = frecuencias.numDocumentos
         numTerminos = len(self.vocabulario)
 
-        # matriz de Frecuencia de Término (Count Matrix)
-        matrizFrecuencia = np.zeros((self.numDocumentos, numTerminos), dtype=np.int32)
-        for docIndex, tokens in enumerate(documentosTokenizados):
-            frecuencias = self.calcularTf(tokens)
-            for token, freq in frecuencias.items():
-                if token in self.vocabulario:
-                    terminoIndex = self.vocabulario[token]
-                    matrizFrecuencia[docIndex, terminoIndex] = freq
+        # matriz de Frecuencia de Término dispersa (Count Matrix)
+        self.ponderarFrecuencias(frecuencias.matrizFrecuencia)
+        self.indicePosicional = IndicePosicional.desdeFlujo(serieDocumentos, self.vocabulario) if posiciones else None
+        self.versionIndice += 1
+
+        print(f"Ajuste completado. Documentos: {self.numDocumentos}, Términos: {numTerminos}")
+        if self.comprimirPostings:
+            comprimidas = self.indiceInvertido.comprimidas
+            print(f"Postings comprimidas: {comprimidas.nbytes} bytes ({comprimidas.bytesSinComprimir} sin comprimir)")
+        else:
+            print("Muestra de la Matriz TF-IDF (Normalizada):")
+            print(self.matrizTfIdf)
 
+    def ponderarFrecuencias(self, matrizFrecuencia):
+        """
+        Calcula el IDF y la matriz TF-IDF normalizada desde la matriz de frecuencias.
+        Con comprimirPostings se guardan en su lugar las frecuencias comprimidas y 1 / norma de
+        cada documento: el peso tf * idf / norma de cada posting se calcula al buscar.
+        """
         # calcular IDF
         self.vectorIdf = self.calcularIdf(matrizFrecuencia)
 
         # calcular Matriz TF-IDF (Term Frequency * Inverse Document Frequency)
-        # multiplicación elemento a elemento de la matriz TF por el vector IDF (broadcasting)
-        matrizTfIdfCruda = matrizFrecuencia * self.vectorIdf
+        # multiplicación de cada columna de la matriz TF por su IDF (broadcasting)
+        matrizTfIdfCruda = matrizFrecuencia.escalarColumnas(self.vectorIdf)
 
-        # normalizar la Matriz TF-IDF
-        self.matrizTfIdf = self.normalizarMatriz(matrizTfIdfCruda)
+        if self.comprimirPostings:
+            self.inversasNorma = self.inversasNormas(matrizTfIdfCruda)
+            self.indiceInvertido = IndiceInvertido.desdeMatriz(matrizFrecuencia)
+            self.indiceInvertido.comprimir()
+            self.matrizTfIdf = None
+        else:
+            # normalizar la Matriz TF-IDF
+            self.matrizTfIdf = self.normalizarMatriz(matrizTfIdfCruda)
+            self.indiceInvertido = None
+            self.inversasNorma = None
 
-        print(f"Ajuste completado. Documentos: {self.numDocumentos}, Términos: {numTerminos}")
-        print("Muestra de la Matriz TF-IDF (Normalizada):")
-        print(self.matrizTfIdf)
+    def matrizPonderada(self):
+        """ Matriz TF-IDF normalizada; con postings comprimidas se reconstruye descomprimiéndolas todas. """
+        if self.matrizTfIdf is not None:
+            return self.matrizTfIdf
+        return self.indiceInvertido.comoMatriz().escalarColumnas(self.vectorIdf).escalarFilas(self.inversasNorma)
 
     # --- Búsqueda (Search) del Modelo ---
 
@@ -109,10 +167,20 @@ class ModeloVectorialTfIdf:
         """
         Calcula la similitud de la consulta con todos los documentos (Similitud del Coseno)
         y devuelve los 'k' documentos más relevantes.
+        Con índice posicional, las frases entre comillas y "a NEAR/n b" filtran los documentos:
+        solo entran en el ranking los que las cumplen.
         """
         print(f"\nBuscando (TF-IDF): '{consulta}'")
         tokensConsulta = self.preProcesar(consulta)
 
+        # Documentos que cumplen las frases / NEAR/n (postings primero, luego posiciones)
+        restricciones = self.restriccionesConsulta(consulta)
+        permitidos = None
+        if restricciones:
+            permitidos = self.indicePosicional.documentosRestricciones(restricciones, self.vocabulario)
+            if len(permitidos) == 0:
+                return []
+
         # 1. Convertir la consulta a un vector TF-IDF
         vectorConsulta = np.zeros(len(self.vocabulario), dtype=float)
 
@@ -139,18 +207,89 @@ class ModeloVectorialTfIdf:
         # la Similitud del Coseno es simplemente el producto punto:
         # Cos(theta) = MatrizTfIdf . VectorConsultaNormalizado_transpuesto
 
-        # Producto punto entre la matriz (D x T) y el vector (T)
-        similitudes = self.matrizTfIdf @ vectorConsultaNormalizado.T
+        # Producto punto entre la matriz (D x T) y el vector (T);
+        # en CSC solo se recorren las columnas de los términos de la consulta
+        if self.matrizTfIdf is not None:
+            similitudes = self.matrizTfIdf @ vectorConsultaNormalizado.T
+        else:
+            # Postings comprimidas: se decodifican solo las de los términos de la consulta
+            similitudes = np.zeros(self.numDocumentos, dtype=float)
+            for terminoIndex in np.flatnonzero(vectorConsultaNormalizado):
+                documentos, pesos = self.contribucionTermino(terminoIndex)
+                similitudes[documentos] += pesos * vectorConsultaNormalizado[terminoIndex]
 
-        # 4. Obtener los índices de los documentos ordenados por similitud (descendente)
-        # np.argsort devuelve los índices que ordenarían el array
-        indicesOrdenados = np.argsort(similitudes)[::-1]
+        # 4. Obtener los índices de los k documentos más similares (descendente)
+        # seleccionarTopK particiona en O(N) y solo ordena los k seleccionados
+        if permitidos is None:
+            topKIndices = seleccionarTopK(similitudes, k)
+        else:
+            topKIndices = permitidos[seleccionarTopK(similitudes[permitidos], k)]
 
         # Obtener las puntuaciones de los documentos relevantes (top K)
-        topKIndices = indicesOrdenados[:k]
         topKScores = similitudes[topKIndices]
 
         resultados = [(self.listaDocumentos[i], topKScores[idx]) for idx, i in enumerate(topKIndices)]
 
         print(f"Top {k} resultados encontrados (ID, Similitud del Coseno):")
-        return resultados
\ No newline at end of file
+        return resultados
+
+    def buscarLote(self, consultas, k=3):
+        """
+        Busca varias consultas a la vez y retorna, para cada una, la misma lista de
+        (ID, similitud) que buscar.
+
+        Los vectores TF-IDF normalizados de las consultas forman una matriz dispersa Q
+        (Consultas x Términos) y las similitudes de todas se obtienen con un solo producto
+        de matrices por bloque: matrizTfIdf . Qᵀ.
+        """
+        # Las consultas repetidas se preprocesan una sola vez
+        pesosPorConsulta = {}
+        for consulta in consultas:
+            if consulta in pesosPorConsulta:
+                continue
+            pesos = self.pesosConsulta(self.preProcesar(consulta))
+            normaConsulta = np.sqrt(sum(peso ** 2 for peso in pesos.values()))
+            # Con norma 0 buscar no retorna resultados; la consulta queda vacía
+            pesosPorConsulta[consulta] = (
+                {t: peso / normaConsulta for t, peso in pesos.items()} if normaConsulta > 0 else {}
+            )
+        listaPesos = [pesosPorConsulta[consulta] for consulta in consultas]
+
+        resultados = []
+        for pesos, (indices, similitudes) in zip(listaPesos, buscarTopKLote(self.matrizPonderada(), listaPesos, k)):
+            if not pesos:
+                resultados.append([])
+                continue
+            resultados.append([(self.listaDocumentos[i], similitud) for i, similitud in zip(indices, similitudes)])
+        return resultados
+
+    def pesosConsulta(self, tokensConsulta):
+        """ Componentes no nulas del vector TF-IDF de la consulta (sin normalizar). """
+        pesos = {}
+        for token, freq in self.calcularTf(tokensConsulta).items():
+            if token in self.vocabulario:
+                terminoIndex = self.vocabulario[token]
+                peso = freq * self.vectorIdf[terminoIndex]
+                if peso != 0:
+                    pesos[terminoIndex] = peso
+        return pesos
+
+    def contribucionTermino(self, terminoIndex):
+        """ Retorna (IDs de documento, peso TF-IDF normalizado) de la columna de un término. """
+        if self.matrizTfIdf is None:
+            documentos, frecuencias = self.indiceInvertido.postings(terminoIndex)
+            return documentos, frecuencias * self.vectorIdf[terminoIndex] * self.inversasNorma[documentos]
+        return self.matrizTfIdf.convertir("csc").segmento(terminoIndex)
+
+    def resultadosAcumulados(self, puntuaciones, pesos, k):
+        """
+        Top-k a partir de los productos punto ya acumulados de todos los documentos
+        (suma de peso x contribucionTermino, ver classes/incrementalsearch.py).
+        Se divide por la norma de la consulta para obtener la similitud del coseno.
+        """
+        normaConsulta = np.sqrt(sum(peso ** 2 for peso in pesos.values()))
+        if normaConsulta == 0:
+            return []
+        similitudes = puntuaciones / normaConsulta
+        topKIndices = seleccionarTopK(similitudes, k)
+        return [(self.listaDocumentos[i], similitudes[i]) for i in topKIndices]
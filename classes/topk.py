@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def seleccionarTopK(puntuaciones, k, soloPositivas=False):
+    """
+    Retorna los índices de las k mayores puntuaciones, ordenados de mayor a menor.
+
+    En lugar de ordenar todo el arreglo (O(N log N)) se usa np.argpartition para
+    separar los k mejores en O(N) y solo esos se ordenan (O(k log k)).
+    Con soloPositivas=True se descartan antes las puntuaciones <= 0.
+    Los empates se resuelven por índice ascendente.
+    """
+    puntuaciones = np.asarray(puntuaciones)
+    if soloPositivas:
+        candidatos = np.flatnonzero(puntuaciones > 0)
+        valores = puntuaciones[candidatos]
+    else:
+        candidatos = None
+        valores = puntuaciones
+
+    if k <= 0 or len(valores) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if k < len(valores):
+        seleccion = np.argpartition(-valores, k - 1)[:k]
+        # argpartition elige cualquiera de los empatados con el k-ésimo valor:
+        # se reemplazan por los de menor índice
+        umbral = valores[seleccion].min()
+        mayores = np.flatnonzero(valores > umbral)
+        empatados = np.flatnonzero(valores == umbral)[:k - len(mayores)]
+        seleccion = np.concatenate([mayores, empatados])
+    else:
+        seleccion = np.arange(len(valores))
+
+    # Ordenar solo los seleccionados: puntuación descendente, índice ascendente
+    seleccion = seleccion[np.lexsort((seleccion, -valores[seleccion]))]
+    return seleccion if candidatos is None else candidatos[seleccion]
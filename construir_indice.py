@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Script para construir los tres modelos desde el CSV del corpus sin cargarlo completo en memoria
+Lee el CSV por bloques, escribe segmentos parciales en disco, los fusiona y guarda cada
+modelo en formato de índice (.indice) en la carpeta models/
+Memoria: la ingesta solo tiene en RAM un segmento y el vocabulario, pero ajustar cada modelo
+crea arreglos en RAM proporcionales al número de postings (nnz) a partir de la matriz mapeada
+(filtrarStopwords, la ponderación TF-IDF, las cotas de BM25). El pico medido es de unos 21
+(binario), 33 (TF-IDF) y 41 (BM25) bytes por posting, de 2,5 a 5 veces la matriz de
+frecuencias (8 bytes por posting); los modelos se ajustan de a uno, así que manda el de BM25.
+Uso: python construir_indice.py [archivo csv] [documentos por segmento]
+"""
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# Agregar raíz del proyecto al path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+from classes.binarymodel import ModeloBinario
+from classes.tfidfmodel import ModeloVectorialTfIdf
+from classes.bm25model import ModeloBM25
+from classes.indexstore import guardarIndice, EXTENSION_INDICE
+from classes.segmentbuilder import ConstructorSegmentos, DOCUMENTOS_POR_SEGMENTO
+from controllers.corpus_loader import iterarDocumentosCsv
+
+rutaCsv = Path(sys.argv[1]) if len(sys.argv) > 1 else project_root / "docs" / "corpus.csv"
+documentosPorSegmento = int(sys.argv[2]) if len(sys.argv) > 2 else DOCUMENTOS_POR_SEGMENTO
+carpetaModelos = project_root / "models"
+carpetaSegmentos = carpetaModelos / "segmentos.tmp"
+
+print("=" * 60)
+print("CONSTRUCCIÓN DE ÍNDICES POR SEGMENTOS")
+print("=" * 60)
+
+if not rutaCsv.exists():
+    print(f"\n✗ No se encontró el corpus: {rutaCsv}")
+    sys.exit(1)
+
+modelos = [
+    ("modeloBinario", ModeloBinario()),
+    ("modeloTfIdf", ModeloVectorialTfIdf()),
+    ("modeloBM25", ModeloBM25()),
+]
+
+# Las stopwords comunes a los tres modelos se quitan durante la ingesta; el resto
+# (BM25 usa las de español por defecto) las quita cada modelo al ajustarse
+stopwordsComunes = set.intersection(*(modelo.listaStopwords for _, modelo in modelos))
+inicio = time.perf_counter()
+constructor = ConstructorSegmentos(carpetaSegmentos, stopwordsComunes, documentosPorSegmento=documentosPorSegmento)
+constructor.agregar(iterarDocumentosCsv(rutaCsv, tamanoBloque=documentosPorSegmento))
+frecuencias = constructor.finalizar()
+print(f"\n✓ {frecuencias.numDocumentos} documentos, {len(frecuencias.vocabulario)} términos, "
+      f"{len(constructor.segmentos)} segmentos ({time.perf_counter() - inicio:.1f} s)")
+
+for nombre, modelo in modelos:
+    modelo.ajustarCorpus(frecuencias)
+    rutaIndice = guardarIndice(modelo, carpetaModelos / (nombre + EXTENSION_INDICE))
+    print(f"✓ {nombre} guardado en {rutaIndice}")
+
+# Los modelos guardados ya no dependen de los archivos de los segmentos
+del frecuencias, modelos, modelo
+shutil.rmtree(carpetaSegmentos)
+
+print("\n" + "=" * 60)
+print(f"✓ Índices construidos en {time.perf_counter() - inicio:.1f} s")
+print("=" * 60)
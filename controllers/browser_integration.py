@@ -1,24 +1,25 @@
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+import threading
+import itertools
+import weakref
 from pathlib import Path
 import numpy as np
 from math import log2
 # Importaciones relativas a los archivos que ya hemos creado/discutido
 from .loadmodel import cargarModelo
+from .model_cache import CacheModelos, PRESUPUESTO_MEMORIA_DEFECTO
+from .query_cache import CacheConsultas, MAX_CONSULTAS_DEFECTO
+from .instrumentation import Instrumentacion, MEDICION_NULA
+from classes.incrementalsearch import EvaluadorIncremental
+from classes.indexstore import EXTENSION_INDICE, esIndice
 from .corpus_loader import obtenerCorpus
 import logging
 
-# Configurar logging
-# La ruta del archivo de log se resuelve dos niveles arriba (proyecto raíz)
-rutaArchivoLog = Path(__file__).resolve().parents[1] / "debug.log"
-logging.basicConfig(
-    filename=str(rutaArchivoLog),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# El log se configura en el punto de entrada (ver controllers/logging_config.py)
 logger = logging.getLogger(__name__)
 
 class CalculadorMetricas:
-    """Calcula las métricas de Precisión, Exhaustividad (Recall) y MAP."""
+    """Calcula las métricas de Precisión, Exhaustividad (Recall) y MAP (y nDCG y MRR por lotes)."""
 
     @staticmethod
     def calcularPrecisionK(documentosRecuperados: List[int], documentosRelevantes: List[int], k: int) -> float:
@@ -69,28 +70,118 @@ class CalculadorMetricas:
         # MAP es la suma de las precisiones en cada posición relevante, dividida por el total de relevantes
         return sum(precisiones) / len(documentosRelevantes)
 
+    @staticmethod
+    def matrizRelevancia(listasRecuperados: List[List[int]], listasRelevantes: List[List[int]],
+                         k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Construye la matriz booleana (Consultas x k) de relevancia de cada posición del ranking.
+
+        Retorna (matriz, número de relevantes de cada consulta). Las posiciones sin documento
+        recuperado quedan en False.
+        """
+        numConsultas = len(listasRecuperados)
+        recuperados = np.full((numConsultas, k), -1, dtype=np.int64)
+        for fila, documentos in enumerate(listasRecuperados):
+            documentos = np.asarray(documentos[:k], dtype=np.int64)
+            recuperados[fila, :len(documentos)] = documentos
+
+        # Cada par (consulta, documento) se codifica en un entero y se busca en los pares relevantes
+        relevantesUnicos = [np.unique(np.asarray(relevantes, dtype=np.int64)) for relevantes in listasRelevantes]
+        numRelevantes = np.array([len(relevantes) for relevantes in relevantesUnicos], dtype=np.int64)
+        base = int(np.concatenate([recuperados.ravel()] + relevantesUnicos).max(initial=0)) + 1
+        paresRelevantes = np.concatenate(
+            [fila * base + relevantes for fila, relevantes in enumerate(relevantesUnicos)] + [np.zeros(0, dtype=np.int64)]
+        )
+        paresRecuperados = np.arange(numConsultas)[:, None] * base + recuperados
+        matriz = np.isin(paresRecuperados, paresRelevantes) & (recuperados >= 0)
+        return matriz, numRelevantes
+
+    @staticmethod
+    def calcularMetricasLote(matrizRelevancia: np.ndarray, numRelevantes: np.ndarray) -> dict:
+        """ Calcula P@k, R@k, AP (cuya media es el MAP), nDCG@k y RR (cuya media es el MRR) de todas
+        las consultas a la vez sobre la matriz (Consultas x k) de relevancia.
+
+        Coincide con los métodos por consulta: P@k divide entre k y AP entre el total de relevantes.
+        Retorna un diccionario de métrica -> arreglo con el valor de cada consulta.
+        """
+        relevancia = np.asarray(matrizRelevancia, dtype=float)
+        numConsultas, k = relevancia.shape
+        numRelevantes = np.asarray(numRelevantes, dtype=float)
+        conRelevantes = numRelevantes > 0
+        divisorRelevantes = np.where(conRelevantes, numRelevantes, 1.0)
+        posiciones = np.arange(1, k + 1, dtype=float)
+
+        aciertosAcumulados = np.cumsum(relevancia, axis=1)
+        aciertos = aciertosAcumulados[:, -1] if k > 0 else np.zeros(numConsultas)
+
+        # Precisión en cada posición relevante, sumada y dividida entre el total de relevantes
+        precisionMedia = (relevancia * aciertosAcumulados / posiciones).sum(axis=1) / divisorRelevantes
+
+        # DCG binario frente al DCG ideal (los min(relevantes, k) primeros puestos relevantes)
+        descuentos = 1.0 / np.log2(posiciones + 1)
+        dcg = relevancia @ descuentos
+        dcgAcumulado = np.concatenate([[0.0], np.cumsum(descuentos)])
+        dcgIdeal = dcgAcumulado[np.minimum(numRelevantes, k).astype(np.int64)]
+        ndcg = dcg / np.where(dcgIdeal > 0, dcgIdeal, 1.0)
+
+        # Rango recíproco del primer relevante (0 si no hay ninguno en el top k)
+        tieneAcierto = relevancia.any(axis=1)
+        primerAcierto = relevancia.argmax(axis=1) if k > 0 else np.zeros(numConsultas, dtype=np.int64)
+        rangoReciproco = np.where(tieneAcierto, 1.0 / (primerAcierto + 1), 0.0)
+
+        return {
+            "P@k": aciertos / k if k > 0 else np.zeros(numConsultas),
+            "R@k": np.where(conRelevantes, aciertos / divisorRelevantes, 0.0),
+            "AP": np.where(conRelevantes, precisionMedia, 0.0),
+            "nDCG@k": ndcg,
+            "RR": rangoReciproco,
+        }
+
 class NavegadorModelos:
-    """Clase puente simple para cargar un modelo serializado (.pkl) y ejecutar búsquedas.
+    """Clase puente simple para cargar un modelo serializado (.indice o .pkl) y ejecutar búsquedas.
 
     La clase es intencionalmente mínima: intenta llamar al método `buscar` del modelo.
     Soporta modelos que retornan:
-    1. Una lista de tuplas (id_doc, score) (TF-IDF / BM25).
-    2. Un array/lista de índices de documentos coincidentes (Modelo Binario).
+    1. Una lista de tuplas (id_doc, score) (TF-IDF / BM25, y el Modelo Binario en modo 'coordinacion').
+    2. Un array/lista de índices de documentos coincidentes (Modelo Binario en modo 'booleano').
     """
 
-    def __init__(self) -> None:
-        """Inicializa el navegador de modelos."""
+    def __init__(self, presupuestoMemoria: int = PRESUPUESTO_MEMORIA_DEFECTO,
+                 maxConsultasCache: int = MAX_CONSULTAS_DEFECTO, instrumentar: bool = False) -> None:
+        """Inicializa el navegador de modelos.
+
+        Args:
+            presupuestoMemoria: Bytes de RAM que pueden ocupar los modelos en caché.
+            maxConsultasCache: Número de resultados de consultas que se guardan (0 la desactiva).
+            instrumentar: Medir el tiempo de cada etapa de las búsquedas (ver activarInstrumentacion).
+        """
         self.modelo = None
         self.rutaModelo = None
 
+        # Modelos ya cargados: cambiar de modelo no vuelve a leer el archivo
+        self.cacheModelos = CacheModelos(presupuestoMemoria)
+        # Las cargas pueden ejecutarse en hilos de fondo (ver main.py)
+        self._bloqueoCarga = threading.Lock()
+        # Puntuaciones parciales de la última consulta (búsqueda mientras se escribe)
+        self.evaluador = None
+        # Resultados de consultas repetidas (p. ej. las preguntas Qrel)
+        self.cacheConsultas = CacheConsultas(maxConsultasCache)
+        # Identificador único de cada modelo cargado (no se reutiliza aunque el modelo se libere)
+        self._identidadesModelo = weakref.WeakKeyDictionary()
+        self._contadorModelos = itertools.count()
+        self._identidadPorRuta = {}
+        # Tiempos por etapa y contadores de cada búsqueda (desactivada no cuesta casi nada)
+        self.instrumentacion = Instrumentacion(instrumentar)
+        # Modo del Modelo Binario: 'booleano' (AND / OR / NOT) o 'coordinacion' (ranking)
+        self.modoBinario = "booleano"
+
         # Resolver la raíz del proyecto (dos niveles arriba de controllers/)
         self.raizProyecto = Path(__file__).resolve().parents[1]
 
     def cargar(self, ruta: str) -> Tuple[bool, str]:
-        """Carga un archivo pickle usando la función global cargarModelo.
+        """Carga un modelo (.pkl o directorio .indice) usando la función global cargarModelo.
         
         Args:
-            ruta: Ruta del archivo .pkl a cargar.
+            ruta: Ruta del archivo .pkl o del directorio .indice a cargar.
             
         Retorna:
             Tuple[bool, str]: (éxito, mensaje de estado).
@@ -104,17 +195,27 @@ class NavegadorModelos:
             logger.error(mensaje)
             return False, mensaje
         
-        modelo = cargarModelo(str(rutaAbsoluta))
-        if modelo is None:
-            mensaje = f"No se pudo cargar el modelo desde: {rutaAbsoluta}"
-            logger.error(mensaje)
-            return False, mensaje
+        with self._bloqueoCarga:
+            modelo, desdeCache = self.cacheModelos.obtener(str(rutaAbsoluta), cargarModelo)
+            if modelo is None:
+                mensaje = f"No se pudo cargar el modelo desde: {rutaAbsoluta}"
+                logger.error(mensaje)
+                return False, mensaje
+
+            identidad = self._identidadModelo(modelo)
+            identidadAnterior = self._identidadPorRuta.get(str(rutaAbsoluta))
+            if identidadAnterior is not None and identidadAnterior != identidad:
+                # El archivo cambió en disco: los resultados de la versión anterior ya no sirven
+                self.cacheConsultas.invalidar(identidadAnterior)
+            self._identidadPorRuta[str(rutaAbsoluta)] = identidad
 
-        self.modelo = modelo
-        self.rutaModelo = str(rutaAbsoluta)
+            self.modelo = modelo
+            self.rutaModelo = str(rutaAbsoluta)
         
         nombreClase = type(modelo).__name__
         mensaje = f"Modelo cargado: {nombreClase}"
+        if desdeCache:
+            mensaje += " (caché)"
         logger.info(mensaje)
         return True, mensaje
 
@@ -124,19 +225,22 @@ class NavegadorModelos:
 
     def listarModelos(self, directorioModelos: str = "models") -> List[Path]:
         """
-        Retorna una lista de objetos Path para los archivos .pkl en el directorio 'models' del proyecto.
+        Retorna una lista de objetos Path para los índices (.indice) y archivos .pkl
+        en el directorio 'models' del proyecto.
         """
         carpeta = (self.raizProyecto / directorioModelos).resolve()
         if not carpeta.exists() or not carpeta.is_dir():
-            logger.warning(f"Directorio de modelos no encontrado: {carpeta}")
+            logger.warning("Directorio de modelos no encontrado: %s", carpeta)
             return []
 
-        archivosPkl = sorted(carpeta.glob("*.pkl"))
-        return archivosPkl
+        indices = [ruta for ruta in carpeta.glob("*" + EXTENSION_INDICE) if esIndice(ruta)]
+        archivosPkl = list(carpeta.glob("*.pkl"))
+        return sorted(indices + archivosPkl)
 
     def obtenerRutaModelo(self, tipoModelo: str, directorioModelos: str = "models") -> str:
         """Retorna la ruta absoluta del modelo según el tipo (binary, tfidf, bm25).
         
+        Si existe el índice nativo (.indice) se prefiere sobre el .pkl.
         Retorna la ruta absoluta como string, o string vacío si no lo encuentra.
         """
         carpeta = (self.raizProyecto / directorioModelos).resolve()
@@ -155,11 +259,78 @@ class NavegadorModelos:
         
         if nombreArchivo:
             rutaCompleta = carpeta / nombreArchivo
+            rutaIndice = rutaCompleta.with_suffix(EXTENSION_INDICE)
+            if esIndice(rutaIndice):
+                return str(rutaIndice)
             if rutaCompleta.exists():
                 return str(rutaCompleta)
         
         return ""
 
+    def activarInstrumentacion(self, activa: bool = True) -> None:
+        """Activa o desactiva la medición de las búsquedas (tiempos por etapa y contadores)."""
+        self.instrumentacion.activa = activa
+
+    def cambiarModoBinario(self, modo: str) -> None:
+        """Elige cómo busca el Modelo Binario: 'booleano' o 'coordinacion' (ver ModeloBinario.buscar)."""
+        if modo not in ("booleano", "coordinacion"):
+            raise ValueError(f"Modo de búsqueda no soportado: {modo}")
+        self.modoBinario = modo
+
+    def agregarSumideroMetricas(self, sumidero) -> None:
+        """Registra una función que recibe la MedicionBusqueda de cada búsqueda instrumentada.
+
+        Ver SumideroMemoria y SumideroLog en controllers/instrumentation.py.
+        """
+        self.instrumentacion.agregarSumidero(sumidero)
+
+    def _identidadModelo(self, modelo) -> int:
+        """Retorna el identificador único del modelo (se asigna la primera vez que se ve)."""
+        if modelo not in self._identidadesModelo:
+            self._identidadesModelo[modelo] = next(self._contadorModelos)
+        return self._identidadesModelo[modelo]
+
+    def _consultarModelo(self, modelo, consulta: str, k: int, medicion=MEDICION_NULA):
+        """Ejecuta la consulta en el modelo.
+        
+        Los resultados se guardan en una caché LRU indexada por los tokens normalizados
+        de la consulta (BM25 y TF-IDF no dependen del orden de los términos), o por la
+        clave que dé el modelo (claveConsulta: el árbol booleano en el modelo binario).
+        BM25 y TF-IDF se evalúan de forma incremental: si la consulta solo agrega o quita
+        términos respecto a la anterior, se actualizan las puntuaciones acumuladas en lugar
+        de volver a puntuar todo (ver classes/incrementalsearch.py). Las consultas con frases
+        o NEAR/n (modelos con índice posicional) se resuelven con modelo.buscar.
+        """
+        with medicion.etapa("tokenizacion"):
+            tokensConsulta = modelo.preProcesar(consulta)
+        # El modo solo aplica al Modelo Binario
+        opciones = {"modo": self.modoBinario} if type(modelo).__name__ == 'ModeloBinario' else {}
+        restricciones = modelo.restriccionesConsulta(consulta) if hasattr(modelo, "restriccionesConsulta") else ()
+        calculado = False
+
+        def calcular():
+            nonlocal calculado
+            calculado = True
+            if restricciones or not EvaluadorIncremental.soporta(modelo):
+                with medicion.etapa("puntuacion"):
+                    return modelo.buscar(consulta, k, **opciones)
+            evaluador = self.evaluador
+            if evaluador is None or evaluador.modelo is not modelo:
+                evaluador = self.evaluador = EvaluadorIncremental(modelo)
+            return evaluador.buscarTokens(tokensConsulta, k, medicion if medicion.activa else None)
+
+        if hasattr(modelo, "claveConsulta"):
+            claveConsulta = modelo.claveConsulta(consulta, **opciones)
+        else:
+            claveConsulta = tuple(sorted(tokensConsulta))
+            if restricciones:
+                claveConsulta = (claveConsulta, restricciones)
+        resultado = self.cacheConsultas.obtener(
+            self._identidadModelo(modelo), getattr(modelo, "versionIndice", 0), claveConsulta, k, calcular
+        )
+        medicion.contar("fallosCache" if calculado else "aciertosCache")
+        return resultado
+
     def buscar(self, consulta: str, k: int = 5) -> List[str]:
         """Ejecuta una búsqueda contra el modelo cargado y retorna strings formateados.
         
@@ -170,43 +341,63 @@ class NavegadorModelos:
         Retorna:
             List[str]: Lista de líneas legibles para mostrar en la UI.
         """
-        logger.debug(f"Iniciando búsqueda con consulta: '{consulta}' y k={k}")
+        return list(self.buscarIncremental(consulta, k))
+
+    def buscarIncremental(self, consulta: str, k: int = 5) -> Iterator[str]:
+        """Igual que buscar, pero entrega cada línea en cuanto está lista.
+        
+        Permite mostrar los resultados a medida que se construyen sus vistas previas
+        y abandonar la búsqueda (dejando de iterar) si el usuario lanza otra.
+        """
+        logger.debug("Iniciando búsqueda con consulta: '%s' y k=%d", consulta, k)
         
-        if not self.modelo:
+        modelo = self.modelo
+        if not modelo:
             logger.error("No hay modelo cargado")
-            return []
+            return
 
-        nombreModelo = type(self.modelo).__name__
-        logger.debug(f"Modelo en uso: {nombreModelo}")
-        
+        nombreModelo = type(modelo).__name__
+        logger.debug("Modelo en uso: %s", nombreModelo)
+
+        medicion = self.instrumentacion.iniciar(consulta, k, nombreModelo)
+        try:
+            yield from self._lineasBusqueda(modelo, nombreModelo, consulta, k, medicion)
+        finally:
+            self.instrumentacion.registrar(medicion)
+
+    def _lineasBusqueda(self, modelo, nombreModelo: str, consulta: str, k: int, medicion) -> Iterator[str]:
+        """Ejecuta la consulta y genera las líneas de buscarIncremental, midiendo cada etapa."""
         resultado = None
         
         try:
             # Dado que hemos modificado todos los modelos para aceptar 'k',
             # la llamada es uniforme, lo cual simplifica la lógica.
-            logger.debug(f"Llamando a {nombreModelo}.buscar('{consulta}', k={k})")
-            resultado = self.modelo.buscar(consulta, k)
+            resultado = self._consultarModelo(modelo, consulta, k, medicion)
             
-            logger.debug(f"Resultado obtenido: tipo={type(resultado)}, len={len(resultado) if hasattr(resultado, '__len__') else 'N/A'}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Resultado obtenido: tipo=%s, len=%s", type(resultado).__name__,
+                             len(resultado) if hasattr(resultado, '__len__') else 'N/A')
             
         except Exception as e:
-            logger.error(f"Error al ejecutar la búsqueda en {nombreModelo}: {e}", exc_info=True)
-            return []
+            logger.error("Error al ejecutar la búsqueda en %s: %s", nombreModelo, e, exc_info=True)
+            return
 
         if resultado is None or len(resultado) == 0:
-            return ["No se encontraron resultados relevantes."]
+            yield "No se encontraron resultados relevantes."
+            return
 
         # Obtener los IDs de documentos recuperados (limpios de scores)
         # Esto unifica la forma en que manejamos los resultados de los 3 modelos.
         idDocumentosRecuperados = []
         
-        if nombreModelo == 'ModeloBinario':
+        conScore = isinstance(resultado, list) and len(resultado) > 0 and isinstance(resultado[0], (tuple, list))
+        if conScore:
+            # TF-IDF / BM25 (y el Modelo Binario en modo 'coordinacion') devuelven tuplas (id_doc, score)
+            idDocumentosRecuperados = [int(item[0]) for item in resultado]
+        
+        elif nombreModelo == 'ModeloBinario':
             # El Modelo Binario devuelve directamente una lista de IDs (ya limitada a k)
             idDocumentosRecuperados = [int(i) for i in resultado if isinstance(i, (int, np.integer, float))]
-        
-        elif isinstance(resultado, list) and len(resultado) > 0 and isinstance(resultado[0], (tuple, list)):
-            # TF-IDF / BM25 devuelven una lista de tuplas (id_doc, score)
-            idDocumentosRecuperados = [int(item[0]) for item in resultado]
 
         # Aplicar límite K a los IDs (aunque ya debería estar aplicado en la llamada)
         idDocumentosRecuperados = idDocumentosRecuperados[:k]
@@ -215,36 +406,41 @@ class NavegadorModelos:
         # --- Lógica de Qrels y Métricas ---
         # ----------------------------------------------------
         corpus = obtenerCorpus()
-        documentosRelevantes = corpus.obtenerQrels(consulta)
-        esQrel = len(documentosRelevantes) > 0
+        with medicion.etapa("qrels"):
+            documentosRelevantes = corpus.obtenerQrels(consulta)
+            esQrel = len(documentosRelevantes) > 0
+
+            if esQrel:
+                # Calcular las métricas
+                pK = CalculadorMetricas.calcularPrecisionK(idDocumentosRecuperados, documentosRelevantes, k)
+                rK = CalculadorMetricas.calcularRecallK(idDocumentosRecuperados, documentosRelevantes, k)
+                mapScore = CalculadorMetricas.calcularMAP(idDocumentosRecuperados, documentosRelevantes)
+        medicion.contar("resultados", len(idDocumentosRecuperados))
         
         if esQrel:
-            # Calcular las métricas
-            pK = CalculadorMetricas.calcularPrecisionK(idDocumentosRecuperados, documentosRelevantes, k)
-            rK = CalculadorMetricas.calcularRecallK(idDocumentosRecuperados, documentosRelevantes, k)
-            mapScore = CalculadorMetricas.calcularMAP(idDocumentosRecuperados, documentosRelevantes)
             
             # Formato de la primera línea con las métricas
-            lineasFormateadas = [
-                f"✅ Qrel Encontrado: {consulta}",
-                f"📊 Métricas (k={k}): P@{k}={pK:.3f} | R@{k}={rK:.3f} | MAP={mapScore:.3f}"
-            ]
+            yield f"✅ Qrel Encontrado: {consulta}"
+            yield f"📊 Métricas (k={k}): P@{k}={pK:.3f} | R@{k}={rK:.3f} | MAP={mapScore:.3f}"
         else:
             # Si no es Qrel, solo se muestra la pregunta original (lo que el usuario tipeó)
-            lineasFormateadas = [f"🔍 Búsqueda: {consulta}"]
+            yield f"🔍 Búsqueda: {consulta}"
         
         
         # ----------------------------------------------------
         # --- Formateo de Resultados ---
         # ----------------------------------------------------
 
+        # Vistas previas de los k resultados en un solo lote (precalculadas en el almacén del corpus)
+        with medicion.etapa("vistaPrevia"):
+            vistasPrevias = corpus.obtenerVistasPrevias(idDocumentosRecuperados, maxCaracteres=50)
+
         # Recorrer los resultados recuperados (IDs y Scores/Nones)
-        for i, idDoc in enumerate(idDocumentosRecuperados):
-            vistaPrevia = corpus.obtenerVistaPreviaDocumento(idDoc, maxCaracteres=50)
+        for i, (idDoc, vistaPrevia) in enumerate(zip(idDocumentosRecuperados, vistasPrevias)):
             score = None
             
-            # Intentar obtener el score si existe (TF-IDF/BM25)
-            if nombreModelo != 'ModeloBinario' and i < len(resultado):
+            # Intentar obtener el score si existe (TF-IDF/BM25, coordinación del binario)
+            if conScore and i < len(resultado):
                  try:
                     score = resultado[i][1]
                  except IndexError:
@@ -256,10 +452,9 @@ class NavegadorModelos:
             else:
                 linea = f"Doc {idDoc}: {vistaPrevia}"
 
-            lineasFormateadas.append(linea)
+            yield linea
 
-        logger.debug(f"{len(lineasFormateadas)} líneas finales formateadas.")
-        return lineasFormateadas
+        logger.debug("%d resultados formateados.", len(idDocumentosRecuperados))
 
 
 # Instancia global del navegador
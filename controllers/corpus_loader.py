@@ -1,11 +1,16 @@
+import numpy as np
 import pandas as pd
 from typing import List
 import logging
 from pathlib import Path
+from classes.documentstore import AlmacenDocumentos, ARCHIVO_CABECERA_DOCUMENTOS
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
+# Sufijo del directorio (junto al CSV) donde se guarda el almacén de documentos
+SUFIJO_ALMACEN = ".documentos"
+
 QRELS_PRECALCULADOS = {
     "What is (are) Parkinson's Disease": [7894, 7899, 7903, 7904, 7906, 7907, 7910, 7912, 7913],
     "What is (are) Colorectal Cancer": [151, 209, 7513, 7519, 7520, 7524, 7526, 7527, 7528, 7529, 7532],
@@ -27,13 +32,30 @@ QRELS_PRECALCULADOS = {
     "What is (are) Medicare and Continuing Care": [7859, 7860, 7861, 7862, 7863, 7864, 7865, 7866, 7867, 7868, 7869, 7871, 7872, 7873]
 }
 
+def iterarDocumentosCsv(rutaArchivo, columna: str = "Answer", tamanoBloque: int = 10000):
+    """
+    Lee el CSV por bloques de tamanoBloque filas y genera los textos de una columna,
+    sin cargar el archivo completo (para la ingesta por segmentos de corpus grandes).
+
+    Los valores vacíos se generan como "" (igual que fillna("") sobre el DataFrame completo),
+    así los IDs de documento coinciden con los índices de fila.
+    """
+    for bloque in pd.read_csv(rutaArchivo, usecols=[columna], chunksize=tamanoBloque):
+        logger.debug("Bloque de %d filas leído de %s", len(bloque), rutaArchivo)
+        yield from bloque[columna].fillna("").astype(str)
+
+
 class CargadorCorpus:
-    """Gestiona la carga y el acceso al corpus de documentos desde un archivo CSV."""
+    """
+    Gestiona la carga y el acceso al corpus de documentos desde un archivo CSV.
+
+    Los documentos se leen del almacén columnar guardado junto al CSV (memoria mapeada);
+    el DataFrame solo se usa para construir ese almacén la primera vez.
+    """
 
     def __init__(self):
         """Inicializa el cargador de corpus."""
-        self.dfCorpus = None             # DataFrame principal del corpus
-        self.indiceCorpus = None         # Mapeo de ID de documento a índice de fila (aunque es 1:1)
+        self.almacen = None              # Almacén columnar para leer documentos y vistas previas (ID = fila)
         self.numDocumentos = 0           # Número total de documentos
         self.mapeoQrels = {}            # {'pregunta': [id1, id2, ...]}
         self.listaQrels = []            # Lista de preguntas clave para la UI
@@ -64,41 +86,57 @@ class CargadorCorpus:
             rutaArchivo = rutaDocs / nombreArchivoCsv
 
             if not rutaArchivo.exists():
-                logger.error(f"Archivo CSV no encontrado en: {rutaArchivo}")
+                logger.error("Archivo CSV no encontrado en: %s", rutaArchivo)
                 # Intenta buscar en la rutaRaiz directamente si no está en 'docs'
                 rutaAlternativa = rutaRaiz / nombreArchivoCsv
                 if rutaAlternativa.exists():
                     rutaArchivo = rutaAlternativa
-                    logger.warning(f"Usando ruta alternativa: {rutaArchivo}")
+                    logger.warning("Usando ruta alternativa: %s", rutaArchivo)
                 else:
-                    logger.error(f"Archivo CSV no encontrado en la ruta raíz alternativa: {rutaAlternativa}")
+                    logger.error("Archivo CSV no encontrado en la ruta raíz alternativa: %s", rutaAlternativa)
                     return False
                 
-            # Cargar el DataFrame
-            self.dfCorpus = pd.read_csv(rutaArchivo)
-            
-            # Restablecer el índice para asegurar que los doc_id coincidan con los índices de fila
-            self.dfCorpus.reset_index(drop=True, inplace=True)
-            
-            # Crear índice de mapeo (doc_id -> row_index). Aquí es 1:1 (i:i)
-            self.indiceCorpus = {i: i for i in range(len(self.dfCorpus))}
-            self.numDocumentos = len(self.dfCorpus)
+            # Almacén columnar de los documentos (el ID de documento es el índice de fila del CSV)
+            self.almacen = self._abrirAlmacen(rutaArchivo)
+            self.numDocumentos = len(self.almacen)
             
             # 4. Generar el mapeo de Qrels (Pregunta -> Lista de IDs de Documentos)
             self._generarMapeoQrels()
             
             logger.info(
-                f"Corpus cargado con éxito desde '{nombreArchivoCsv}': {self.numDocumentos} documentos totales"
+                "Corpus cargado con éxito desde '%s': %d documentos totales", nombreArchivoCsv, self.numDocumentos
             )
-            logger.debug(f"Columnas del Corpus: {list(self.dfCorpus.columns)}")
+            logger.debug("Columnas del Corpus: %s", list(self.almacen.columnas))
             
             return True
 
         except Exception as e:
-            logger.error(f"Error al cargar el corpus desde {nombreArchivoCsv}: {str(e)}")
-            self.dfCorpus = None # Asegurar que el estado sea limpio si hay error
+            logger.error("Error al cargar el corpus desde %s: %s", nombreArchivoCsv, e)
+            self.almacen = None # Asegurar que el estado sea limpio si hay error
+            self.numDocumentos = 0
             return False
 
+    def _abrirAlmacen(self, rutaArchivo: Path) -> AlmacenDocumentos:
+        """
+        Abre el almacén guardado junto al CSV (p. ej. docs/corpus.csv.documentos) si está al
+        día; si no, lo construye desde el CSV, lo guarda y lo vuelve a abrir con memoria mapeada.
+        """
+        rutaDirectorio = rutaArchivo.with_name(rutaArchivo.name + SUFIJO_ALMACEN)
+        rutaCabecera = rutaDirectorio / ARCHIVO_CABECERA_DOCUMENTOS
+        if rutaCabecera.exists() and rutaCabecera.stat().st_mtime >= rutaArchivo.stat().st_mtime:
+            logger.info("Abriendo almacén de documentos: %s", rutaDirectorio)
+            return AlmacenDocumentos.abrir(rutaDirectorio)
+
+        # El DataFrame solo existe mientras se construye el almacén
+        almacen = AlmacenDocumentos.desdeDataFrame(pd.read_csv(rutaArchivo))
+        try:
+            almacen.guardar(rutaDirectorio)
+        except OSError as e:
+            logger.warning("No se pudo guardar el almacén de documentos en %s: %s", rutaDirectorio, e)
+            return almacen
+        logger.info("Almacén de documentos guardado en %s", rutaDirectorio)
+        return AlmacenDocumentos.abrir(rutaDirectorio)
+
     def obtenerDocumento(self, idDocumento: int) -> dict | None:
         """
         Recupera un documento por ID.
@@ -110,31 +148,33 @@ class CargadorCorpus:
             dict: Datos del documento como diccionario, o None si no se encuentra.
         """
         try:
-            if self.dfCorpus is None:
+            if self.almacen is None:
                 logger.warning("Corpus no cargado")
                 return None
 
-            if idDocumento not in self.indiceCorpus:
-                logger.warning(f"ID de Documento {idDocumento} no encontrado en el corpus")
+            if not self.almacen.contiene(idDocumento):
+                logger.warning("ID de Documento %s no encontrado en el corpus", idDocumento)
                 return None
 
-            indiceFila = self.indiceCorpus[idDocumento]
-            fila = self.dfCorpus.iloc[indiceFila]
-            
-            return fila.to_dict()
+            return self.almacen.obtener(idDocumento)
 
         except Exception as e:
-            logger.error(f"Error al recuperar el documento {idDocumento}: {str(e)}")
+            logger.error("Error al recuperar el documento %s: %s", idDocumento, e)
             return None
 
     def obtenerTodoElCorpus(self) -> pd.DataFrame | None:
         """
         Obtiene todos los documentos del corpus como un DataFrame.
 
+        El cargador no guarda el DataFrame: se construye en cada llamada desde el almacén.
+
         Returns:
             pd.DataFrame: DataFrame del Corpus o None si no está cargado.
         """
-        return self.dfCorpus
+        if self.almacen is None:
+            return None
+        idDocumentos = np.arange(len(self.almacen))
+        return pd.DataFrame({nombre: self.almacen.campo(nombre, idDocumentos) for nombre in self.almacen.columnas})
 
     def buscarEnCorpus(self, idDocumentos: list[int], limite: int | None = None) -> list[dict]:
         """
@@ -149,14 +189,13 @@ class CargadorCorpus:
         """
         if limite is not None:
             idDocumentos = idDocumentos[:limite]
+        if self.almacen is None:
+            logger.warning("Corpus no cargado")
+            return []
 
-        documentos = []
-        for idDoc in idDocumentos:
-            documento = self.obtenerDocumento(idDoc)
-            if documento:
-                documentos.append(documento)
-
-        return documentos
+        # Los IDs inexistentes se omiten; el resto se lee en un solo lote
+        idValidos = [idDoc for idDoc in idDocumentos if self.almacen.contiene(idDoc)]
+        return self.almacen.obtenerLote(idValidos)
 
     def obtenerVistaPreviaDocumento(self, idDocumento: int, maxCaracteres: int = 200) -> str | None:
         """
@@ -169,27 +208,35 @@ class CargadorCorpus:
         Returns:
             str: Texto de vista previa o "Contenido no disponible" si no se encuentra.
         """
-        documento = self.obtenerDocumento(idDocumento)
-        if not documento:
-            return "Documento no encontrado"
+        return self.obtenerVistasPrevias([idDocumento], maxCaracteres)[0]
 
-        # Priorizar la columna 'Answer' para la vista previa
-        textoVistaPrevia = None
-        for campo in ["Answer", "answer", "Question", "question"]:
-            if campo in documento and documento[campo]:
-                textoVistaPrevia = str(documento[campo])
-                break
+    def obtenerVistasPrevias(self, idDocumentos: list[int], maxCaracteres: int = 200) -> list[str]:
+        """
+        Obtiene las vistas previas de varios documentos de una vez.
+
+        Se usa la columna 'Answer' (o 'Question' si está vacía), precalculada en el almacén.
+
+        Args:
+            idDocumentos: IDs de los documentos.
+            maxCaracteres: Número máximo de caracteres de cada vista previa.
 
-        if textoVistaPrevia:
-            if len(textoVistaPrevia) > maxCaracteres:
-                return textoVistaPrevia[:maxCaracteres] + "..."
-            return textoVistaPrevia
+        Returns:
+            list: Una vista previa por ID ("Documento no encontrado" si el ID no existe).
+        """
+        if self.almacen is None:
+            logger.warning("Corpus no cargado")
+            return ["Documento no encontrado"] * len(idDocumentos)
 
-        return "Contenido no disponible"
+        filas = [idDoc if self.almacen.contiene(idDoc) else None for idDoc in idDocumentos]
+        vistasPrevias = iter(self.almacen.vistasPreviasLote([f for f in filas if f is not None], maxCaracteres))
+        return [
+            "Documento no encontrado" if fila is None else (next(vistasPrevias) or "Contenido no disponible")
+            for fila in filas
+        ]
 
     def estaCargado(self) -> bool:
         """Verifica si el corpus está cargado."""
-        return self.dfCorpus is not None and len(self.dfCorpus) > 0
+        return self.almacen is not None and len(self.almacen) > 0
     
     def _generarMapeoQrels(self):
         """
@@ -201,7 +248,7 @@ class CargadorCorpus:
         # Generar la lista de preguntas clave y ordenarla
         self.listaQrels = sorted(list(self.mapeoQrels.keys()))
 
-        logger.info(f"Mapeo Qrels cargado rápidamente: {len(self.listaQrels)} preguntas clave.")
+        logger.info("Mapeo Qrels cargado rápidamente: %d preguntas clave.", len(self.listaQrels))
 
 
     def obtenerListaQrels(self) -> List[str]:
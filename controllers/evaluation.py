@@ -0,0 +1,96 @@
+from typing import Dict, List
+import contextlib
+import io
+import json
+import logging
+from pathlib import Path
+import numpy as np
+from .browser_integration import CalculadorMetricas
+from .corpus_loader import QRELS_PRECALCULADOS
+
+logger = logging.getLogger(__name__)
+
+# Orden de las columnas del reporte (métrica por consulta -> nombre de su media)
+METRICAS_REPORTE = [("P@k", "P@{k}"), ("R@k", "R@{k}"), ("AP", "MAP"), ("nDCG@k", "nDCG@{k}"), ("RR", "MRR")]
+
+
+def cargarQrels(rutaArchivo: str = None) -> Dict[str, List[int]]:
+    """Carga los Qrels {'pregunta': [id1, id2, ...]}.
+
+    Sin ruta se usan los Qrels precalculados del corpus. El archivo puede ser un JSON
+    con ese mismo diccionario o un texto con una línea "pregunta<TAB>id" por par relevante.
+    """
+    if rutaArchivo is None:
+        return dict(QRELS_PRECALCULADOS)
+
+    rutaArchivo = Path(rutaArchivo)
+    if rutaArchivo.suffix.lower() == ".json":
+        with open(rutaArchivo, encoding="utf-8") as archivo:
+            return {pregunta: [int(i) for i in ids] for pregunta, ids in json.load(archivo).items()}
+
+    qrels = {}
+    with open(rutaArchivo, encoding="utf-8") as archivo:
+        for numeroLinea, linea in enumerate(archivo, 1):
+            linea = linea.rstrip("\n")
+            if not linea.strip():
+                continue
+            pregunta, separador, idDocumento = linea.rpartition("\t")
+            if not separador:
+                raise ValueError(f"Línea {numeroLinea} sin tabulador en {rutaArchivo}: {linea!r}")
+            qrels.setdefault(pregunta, []).append(int(idDocumento))
+    return qrels
+
+
+def recuperarLote(modelo, consultas: List[str], k: int) -> List[List[int]]:
+    """Retorna los IDs de los k primeros documentos de cada consulta.
+
+    BM25 y TF-IDF puntúan todas las consultas juntas con buscarLote; el Modelo Binario
+    (sin ranking) se consulta una a una. La salida por consola de los modelos se descarta.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        if hasattr(modelo, "buscarLote"):
+            resultados = modelo.buscarLote(consultas, k)
+        else:
+            resultados = [modelo.buscar(consulta, k) for consulta in consultas]
+
+    listasRecuperados = []
+    for resultado in resultados:
+        if resultado is None:
+            resultado = []
+        # TF-IDF / BM25 retornan (id, puntuación); el Modelo Binario solo IDs
+        listasRecuperados.append([
+            int(item[0]) if isinstance(item, (tuple, list)) else int(item) for item in resultado
+        ][:k])
+    return listasRecuperados
+
+
+def evaluarModelo(modelo, qrels: Dict[str, List[int]], k: int = 10) -> Dict[str, np.ndarray]:
+    """Ejecuta todas las preguntas de los Qrels y retorna las métricas de cada una."""
+    consultas = list(qrels)
+    listasRecuperados = recuperarLote(modelo, consultas, k)
+    matriz, numRelevantes = CalculadorMetricas.matrizRelevancia(
+        listasRecuperados, [qrels[consulta] for consulta in consultas], k
+    )
+    return CalculadorMetricas.calcularMetricasLote(matriz, numRelevantes)
+
+
+def evaluarModelos(modelos: Dict[str, object], qrels: Dict[str, List[int]], k: int = 10) -> Dict[str, Dict[str, float]]:
+    """Evalúa cada modelo ({nombre: modelo}) y retorna la media de cada métrica por modelo."""
+    resumen = {}
+    for nombre, modelo in modelos.items():
+        logger.info("Evaluando %s con %d preguntas (k=%d)", nombre, len(qrels), k)
+        metricas = evaluarModelo(modelo, qrels, k)
+        resumen[nombre] = {metrica: float(valores.mean()) if len(valores) else 0.0 for metrica, valores in metricas.items()}
+    return resumen
+
+
+def formatearReporte(resumen: Dict[str, Dict[str, float]], k: int) -> List[str]:
+    """Retorna las líneas de una tabla con una fila por modelo y una columna por métrica."""
+    columnas = [titulo.format(k=k) for _, titulo in METRICAS_REPORTE]
+    anchoNombre = max([len("Modelo")] + [len(nombre) for nombre in resumen])
+    encabezado = f"{'Modelo':<{anchoNombre}} | " + " | ".join(f"{columna:>8}" for columna in columnas)
+    lineas = [encabezado, "-" * len(encabezado)]
+    for nombre, medias in resumen.items():
+        valores = " | ".join(f"{medias[metrica]:>8.4f}" for metrica, _ in METRICAS_REPORTE)
+        lineas.append(f"{nombre:<{anchoNombre}} | {valores}")
+    return lineas
@@ -0,0 +1,176 @@
+from collections import deque
+from typing import Callable, Dict
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Número de mediciones que guarda por defecto el sumidero en memoria
+MAX_MEDICIONES_DEFECTO = 256
+
+
+class _EtapaNula:
+    """Contexto que no mide nada."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+class MedicionNula:
+    """Medición usada con la instrumentación desactivada: todas sus operaciones son vacías."""
+
+    activa = False
+    _etapa = _EtapaNula()
+
+    def etapa(self, nombre: str) -> _EtapaNula:
+        return self._etapa
+
+    def contar(self, nombre: str, cantidad: int = 1) -> None:
+        pass
+
+
+MEDICION_NULA = MedicionNula()
+
+
+class _Etapa:
+    """Cronómetro de una etapa; el tiempo se suma al de la etapa si se repite."""
+
+    __slots__ = ("medicion", "nombre", "inicio")
+
+    def __init__(self, medicion, nombre: str) -> None:
+        self.medicion = medicion
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        etapas = self.medicion.etapas
+        etapas[self.nombre] = etapas.get(self.nombre, 0.0) + time.perf_counter() - self.inicio
+        return False
+
+
+class MedicionBusqueda:
+    """Tiempos por etapa (segundos) y contadores de una búsqueda."""
+
+    activa = True
+
+    def __init__(self, consulta: str, k: int, modelo: str) -> None:
+        self.consulta = consulta
+        self.k = k
+        self.modelo = modelo
+        self.etapas: Dict[str, float] = {}
+        self.contadores: Dict[str, int] = {}
+        self.inicio = time.perf_counter()
+        self.duracion = None
+
+    def etapa(self, nombre: str) -> _Etapa:
+        """Contexto que mide la duración de una etapa (tokenizacion, puntuacion, topK, ...)."""
+        return _Etapa(self, nombre)
+
+    def contar(self, nombre: str, cantidad: int = 1) -> None:
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def finalizar(self) -> None:
+        if self.duracion is None:
+            self.duracion = time.perf_counter() - self.inicio
+
+    def comoDiccionario(self) -> dict:
+        """Representación serializable (JSON) de la medición, con tiempos en milisegundos."""
+        return {
+            "consulta": self.consulta,
+            "k": self.k,
+            "modelo": self.modelo,
+            "totalMs": (self.duracion or 0.0) * 1000,
+            "etapasMs": {nombre: segundos * 1000 for nombre, segundos in self.etapas.items()},
+            "contadores": dict(self.contadores),
+        }
+
+    def resumen(self) -> str:
+        """Una línea legible: total, tiempo de cada etapa y contadores."""
+        partes = [f"total {(self.duracion or 0.0) * 1000:.2f} ms"]
+        partes += [f"{nombre} {segundos * 1000:.2f} ms" for nombre, segundos in self.etapas.items()]
+        partes += [f"{nombre} {valor}" for nombre, valor in self.contadores.items()]
+        return " | ".join(partes)
+
+
+class SumideroMemoria:
+    """Sumidero que guarda las últimas mediciones y acumula los tiempos de cada etapa."""
+
+    def __init__(self, maxMediciones: int = MAX_MEDICIONES_DEFECTO) -> None:
+        self.mediciones = deque(maxlen=maxMediciones)
+        self._agregados = {}   # etapa -> [llamadas, segundos totales, segundos máximos]
+        self._bloqueo = threading.Lock()
+
+    def __call__(self, medicion: MedicionBusqueda) -> None:
+        with self._bloqueo:
+            self.mediciones.append(medicion)
+            for nombre, segundos in list(medicion.etapas.items()) + [("total", medicion.duracion)]:
+                agregado = self._agregados.setdefault(nombre, [0, 0.0, 0.0])
+                agregado[0] += 1
+                agregado[1] += segundos
+                agregado[2] = max(agregado[2], segundos)
+
+    def agregados(self) -> dict:
+        """Por etapa: número de mediciones, tiempo medio y máximo (ms)."""
+        with self._bloqueo:
+            return {
+                nombre: {"llamadas": llamadas, "mediaMs": total / llamadas * 1000, "maximoMs": maximo * 1000}
+                for nombre, (llamadas, total, maximo) in self._agregados.items()
+            }
+
+
+class SumideroLog:
+    """Sumidero que escribe cada medición en el log (nivel DEBUG por defecto)."""
+
+    def __init__(self, nivel: int = logging.DEBUG) -> None:
+        self.nivel = nivel
+
+    def __call__(self, medicion: MedicionBusqueda) -> None:
+        if logger.isEnabledFor(self.nivel):
+            logger.log(self.nivel, "Búsqueda '%s' (%s, k=%d): %s",
+                       medicion.consulta, medicion.modelo, medicion.k, medicion.resumen())
+
+
+class Instrumentacion:
+    """Punto de entrada de la instrumentación de las búsquedas.
+
+    Desactivada, iniciar() retorna MEDICION_NULA y cada etapa cuesta una llamada vacía.
+    Activada, cada búsqueda produce una MedicionBusqueda que se entrega a los sumideros
+    registrados (cualquier función que reciba la medición).
+    """
+
+    def __init__(self, activa: bool = False) -> None:
+        self.activa = activa
+        self.ultima = None
+        self._sumideros = []
+
+    def agregarSumidero(self, sumidero: Callable[[MedicionBusqueda], None]) -> None:
+        self._sumideros.append(sumidero)
+
+    def quitarSumidero(self, sumidero: Callable[[MedicionBusqueda], None]) -> None:
+        if sumidero in self._sumideros:
+            self._sumideros.remove(sumidero)
+
+    def iniciar(self, consulta: str, k: int, modelo: str):
+        """Retorna la medición de una búsqueda (MEDICION_NULA si está desactivada)."""
+        if not self.activa:
+            return MEDICION_NULA
+        return MedicionBusqueda(consulta, k, modelo)
+
+    def registrar(self, medicion) -> None:
+        """Cierra la medición y la entrega a los sumideros."""
+        if not medicion.activa:
+            return
+        medicion.finalizar()
+        self.ultima = medicion
+        for sumidero in list(self._sumideros):
+            try:
+                sumidero(medicion)
+            except Exception:
+                logger.exception("Error en el sumidero de métricas %r", sumidero)
@@ -10,10 +10,15 @@ sys.path.insert(0, str(project_root))
 from classes.binarymodel import ModeloBinario
 from classes.tfidfmodel import ModeloVectorialTfIdf
 from classes.bm25model import ModeloBM25
+from classes.indexstore import abrirIndice, esIndice, guardarIndice, EXTENSION_INDICE
 
 
 class ModuleMapper(pickle.Unpickler):
-    """Mapea módulos __main__ a los módulos correctos durante la deserialización de pickle."""
+    """Mapea módulos __main__ a los módulos correctos durante la deserialización de pickle.
+
+    Solo se usa para los modelos antiguos (.pkl); el formato de índice nativo
+    (ver classes/indexstore.py) no depende de las rutas de las clases.
+    """
     
     def find_class(self, module, name):
         """Intercepta la búsqueda de clases en pickle."""
@@ -31,11 +36,18 @@ class ModuleMapper(pickle.Unpickler):
 
 
 def cargarModelo(nombreArchivo):
-    """Carga el objeto del modelo guardado usando pickle.
+    """Carga el modelo guardado.
     
-    Usa un mapeo especial para modelos que fueron pickleados con __main__.
+    Si la ruta es un directorio de índice nativo se abre con memoria mapeada;
+    si es un .pkl se usa pickle con un mapeo especial para modelos que fueron
+    pickleados con __main__.
     """
     try:
+        if esIndice(nombreArchivo):
+            modeloCargado = abrirIndice(nombreArchivo)
+            print(f"\nÍndice abierto exitosamente desde: {nombreArchivo}")
+            return modeloCargado
+
         with open(nombreArchivo, 'rb') as archivoEntrada:
             # Usar nuestro unpickler personalizado
             unpickler = ModuleMapper(archivoEntrada)
@@ -50,4 +62,20 @@ def cargarModelo(nombreArchivo):
         print(f"Error al cargar el modelo: {e}")
         import traceback
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+
+def convertirModelo(rutaPkl, rutaIndice=None):
+    """Convierte un modelo .pkl al formato de índice nativo.
+    
+    Si no se indica rutaIndice se usa la misma ruta con extensión .indice.
+    Retorna la ruta del índice, o None si no se pudo cargar el modelo.
+    """
+    modelo = cargarModelo(rutaPkl)
+    if modelo is None:
+        return None
+    if rutaIndice is None:
+        rutaIndice = Path(rutaPkl).with_suffix(EXTENSION_INDICE)
+    rutaIndice = guardarIndice(modelo, rutaIndice)
+    print(f"Índice guardado en: {rutaIndice}")
+    return rutaIndice
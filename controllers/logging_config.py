@@ -0,0 +1,67 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+import atexit
+import logging
+import os
+import queue
+
+# Variables de entorno que ajustan el log sin tocar el código
+VARIABLE_NIVEL = "RI_NIVEL_LOG"            # DEBUG, INFO, WARNING, ERROR
+VARIABLE_ARCHIVO = "RI_ARCHIVO_LOG"        # Ruta del archivo de log
+
+NIVEL_DEFECTO = "INFO"
+ARCHIVO_DEFECTO = Path(__file__).resolve().parents[1] / "debug.log"
+MAX_BYTES_DEFECTO = 5 * 1024 ** 2          # Tamaño de cada archivo antes de rotar
+RESPALDOS_DEFECTO = 3                      # debug.log.1 ... debug.log.3
+FORMATO_LOG = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_oyente = None
+
+
+def configurarLogging(nivel=None, archivo=None, maxBytes: int = MAX_BYTES_DEFECTO,
+                      respaldos: int = RESPALDOS_DEFECTO) -> QueueListener:
+    """Configura el log de la aplicación (debe llamarse una vez, desde el punto de entrada).
+
+    Los registros se encolan (QueueHandler) y un hilo aparte los escribe en un archivo
+    rotativo, así la escritura en disco no ocurre en el hilo que busca.
+    El nivel y el archivo se toman de los argumentos, o de RI_NIVEL_LOG / RI_ARCHIVO_LOG,
+    o de los valores por defecto (INFO, debug.log en la raíz del proyecto).
+    Llamarla de nuevo reemplaza la configuración anterior.
+    """
+    global _oyente
+    nivel = nivel or os.environ.get(VARIABLE_NIVEL, NIVEL_DEFECTO)
+    if isinstance(nivel, str):
+        nivel = logging.getLevelName(nivel.upper())
+        if not isinstance(nivel, int):
+            nivel = logging.getLevelName(NIVEL_DEFECTO)
+    archivo = Path(archivo or os.environ.get(VARIABLE_ARCHIVO, ARCHIVO_DEFECTO))
+
+    detenerLogging()
+
+    manejadorArchivo = RotatingFileHandler(archivo, maxBytes=maxBytes, backupCount=respaldos, encoding="utf-8")
+    manejadorArchivo.setFormatter(logging.Formatter(FORMATO_LOG))
+    colaRegistros = queue.SimpleQueue()
+    _oyente = QueueListener(colaRegistros, manejadorArchivo, respect_handler_level=True)
+    _oyente.start()
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    raiz.addHandler(QueueHandler(colaRegistros))
+    return _oyente
+
+
+def detenerLogging() -> None:
+    """Escribe los registros pendientes y quita el manejador instalado por configurarLogging."""
+    global _oyente
+    if _oyente is None:
+        return
+    _oyente.stop()
+    for manejador in _oyente.handlers:
+        manejador.close()
+    raiz = logging.getLogger()
+    for manejador in [m for m in raiz.handlers if isinstance(m, QueueHandler) and m.queue is _oyente.queue]:
+        raiz.removeHandler(manejador)
+    _oyente = None
+
+
+atexit.register(detenerLogging)
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from pathlib import Path
+import sys
+import numpy as np
+import logging
+from classes.indexstore import ARCHIVO_CABECERA
+
+logger = logging.getLogger(__name__)
+
+# Presupuesto de memoria por defecto para los modelos en caché (bytes)
+PRESUPUESTO_MEMORIA_DEFECTO = 1024 ** 3
+
+
+def firmaArchivo(ruta: Path):
+    """Retorna la fecha de modificación (ns) que identifica la versión del modelo en disco.
+
+    En los índices nativos (directorios) se usa la cabecera, que se escribe al final.
+    """
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        ruta = ruta / ARCHIVO_CABECERA
+    return ruta.stat().st_mtime_ns
+
+
+def estimarMemoria(objeto, _vistos=None) -> int:
+    """Estima los bytes de RAM que ocupa un modelo recorriendo sus atributos.
+
+    Los arreglos compartidos se cuentan una vez y los mapeados en memoria (np.memmap)
+    no cuentan, ya que sus páginas pertenecen al archivo y el sistema puede liberarlas.
+    """
+    if _vistos is None:
+        _vistos = set()
+    if id(objeto) in _vistos:
+        return 0
+    _vistos.add(id(objeto))
+
+    if isinstance(objeto, np.memmap):
+        return 0
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(
+            estimarMemoria(clave, _vistos) + estimarMemoria(valor, _vistos) for clave, valor in objeto.items()
+        )
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objeto) + sum(estimarMemoria(valor, _vistos) for valor in objeto)
+    if hasattr(objeto, "__dict__"):
+        return estimarMemoria(vars(objeto), _vistos)
+    return sys.getsizeof(objeto)
+
+
+class CacheModelos:
+    """Caché LRU de modelos cargados, indexada por (ruta, fecha de modificación).
+
+    Si el archivo cambia en disco la clave deja de coincidir y el modelo se vuelve a leer.
+    Cuando la memoria estimada supera el presupuesto se descartan los modelos usados
+    hace más tiempo (siempre se conserva el último).
+    """
+
+    def __init__(self, presupuestoMemoria: int = PRESUPUESTO_MEMORIA_DEFECTO) -> None:
+        self.presupuestoMemoria = presupuestoMemoria
+        self._entradas = OrderedDict()   # (ruta, mtime) -> (modelo, bytes estimados)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @property
+    def memoriaUsada(self) -> int:
+        return sum(tamano for _, tamano in self._entradas.values())
+
+    def obtener(self, ruta: str, cargador):
+        """Retorna (modelo, desdeCache). Si no está en caché lo carga con cargador(ruta).
+
+        Retorna (None, False) si el cargador falla.
+        """
+        ruta = str(Path(ruta).resolve())
+        clave = (ruta, firmaArchivo(ruta))
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            logger.debug("Modelo en caché: %s", ruta)
+            return self._entradas[clave][0], True
+
+        self.fallos += 1
+        modelo = cargador(ruta)
+        if modelo is None:
+            return None, False
+
+        # Una versión anterior del mismo archivo ya no sirve
+        for claveAnterior in [c for c in self._entradas if c[0] == ruta]:
+            del self._entradas[claveAnterior]
+
+        self._entradas[clave] = (modelo, estimarMemoria(modelo))
+        self._ajustarPresupuesto()
+        return modelo, False
+
+    def invalidar(self, ruta: str = None) -> None:
+        """Descarta un modelo de la caché (o todos si ruta es None)."""
+        if ruta is None:
+            self._entradas.clear()
+            return
+        ruta = str(Path(ruta).resolve())
+        for clave in [c for c in self._entradas if c[0] == ruta]:
+            del self._entradas[clave]
+
+    def _ajustarPresupuesto(self) -> None:
+        while len(self._entradas) > 1 and self.memoriaUsada > self.presupuestoMemoria:
+            (ruta, _), (_, tamano) = self._entradas.popitem(last=False)
+            logger.info("Modelo descartado de la caché: %s (%.1f MiB)", ruta, tamano / 1024 ** 2)
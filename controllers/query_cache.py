@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de consultas guardadas por defecto
+MAX_CONSULTAS_DEFECTO = 1024
+
+
+class CacheConsultas:
+    """Caché LRU de resultados de búsqueda.
+
+    La clave es (modelo, versión del índice, tokens normalizados, k): dos consultas que
+    producen los mismos tokens (mayúsculas, stopwords, orden) comparten resultados.
+    Al cambiar la versión del índice de un modelo se descartan sus resultados anteriores.
+    """
+
+    def __init__(self, maxEntradas: int = MAX_CONSULTAS_DEFECTO) -> None:
+        self.maxEntradas = maxEntradas
+        self._entradas = OrderedDict()   # (modelo, versión, tokens, k) -> resultados
+        self._versiones = {}             # modelo -> versión vigente de su índice
+        self._bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, identidadModelo, versionIndice, tokens: tuple, k: int, calcular):
+        """Retorna los resultados en caché o los calcula con calcular() y los guarda."""
+        clave = (identidadModelo, versionIndice, tokens, k)
+        with self._bloqueo:
+            if self._versiones.get(identidadModelo, versionIndice) != versionIndice:
+                self._invalidarModelo(identidadModelo)
+            self._versiones[identidadModelo] = versionIndice
+
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+
+        resultados = calcular()
+        with self._bloqueo:
+            # Solo se guarda si la versión no cambió mientras se calculaba
+            if self._versiones.get(identidadModelo) == versionIndice and self.maxEntradas > 0:
+                self._entradas[clave] = resultados
+                while len(self._entradas) > self.maxEntradas:
+                    self._entradas.popitem(last=False)
+        return resultados
+
+    def invalidar(self, identidadModelo=None) -> None:
+        """Descarta los resultados de un modelo (o todos si identidadModelo es None)."""
+        with self._bloqueo:
+            if identidadModelo is None:
+                self._entradas.clear()
+                self._versiones.clear()
+            else:
+                self._invalidarModelo(identidadModelo)
+                self._versiones.pop(identidadModelo, None)
+
+    def estadisticas(self) -> dict:
+        """Aciertos, fallos, tasa de aciertos y número de entradas."""
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasaAciertos": self.aciertos / total if total else 0.0,
+            "entradas": len(self._entradas),
+        }
+
+    def _invalidarModelo(self, identidadModelo) -> None:
+        for clave in [c for c in self._entradas if c[0] == identidadModelo]:
+            del self._entradas[clave]
+        logger.debug("Resultados en caché descartados para el modelo %s", identidadModelo)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Script para convertir los modelos .pkl de la carpeta models/ al formato de índice nativo
+(directorio .indice con arreglos .npy + cabecera JSON, ver classes/indexstore.py)
+Ejecuta esto una vez después de generar o descargar los modelos
+"""
+import sys
+from pathlib import Path
+
+# Agregar raíz del proyecto al path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+from controllers.loadmodel import convertirModelo
+
+carpetaModelos = project_root / "models"
+
+print("=" * 60)
+print("CONVERSIÓN DE MODELOS AL FORMATO DE ÍNDICE")
+print("=" * 60)
+
+archivosPkl = sorted(carpetaModelos.glob("*.pkl"))
+if not archivosPkl:
+    print(f"\n✗ No hay archivos .pkl en {carpetaModelos}")
+    sys.exit(1)
+
+fallidos = 0
+for rutaPkl in archivosPkl:
+    print(f"\nConvirtiendo '{rutaPkl.name}'...")
+    if convertirModelo(rutaPkl) is None:
+        fallidos += 1
+
+print("\n" + "=" * 60)
+if fallidos:
+    print(f"✗ {fallidos} modelos no se pudieron convertir")
+else:
+    print(f"✓ {len(archivosPkl)} modelos convertidos")
+print("=" * 60)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Script para evaluar los tres modelos con todas las preguntas de los Qrels
+Calcula P@k, R@k, MAP, nDCG@k y MRR y muestra una tabla comparativa
+Uso: python evaluar_modelos.py [k] [archivo de qrels (.json o pregunta<TAB>id)]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Agregar raíz del proyecto al path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+from controllers.browser_integration import NavegadorModelos
+from controllers.evaluation import cargarQrels, evaluarModelos, formatearReporte
+
+k = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+rutaQrels = sys.argv[2] if len(sys.argv) > 2 else None
+
+print("=" * 60)
+print("EVALUACIÓN DE MODELOS CON QRELS")
+print("=" * 60)
+
+qrels = cargarQrels(rutaQrels)
+print(f"\n✓ Preguntas evaluadas: {len(qrels)} ({rutaQrels or 'Qrels precalculados'})")
+
+navegador = NavegadorModelos()
+modelos = {}
+for tipoModelo, nombre in [("binary", "Binario"), ("tfidf", "TF-IDF"), ("bm25", "BM25")]:
+    ruta = navegador.obtenerRutaModelo(tipoModelo)
+    if not ruta:
+        print(f"✗ No se encontró el modelo {nombre}")
+        continue
+    exito, mensaje = navegador.cargar(ruta)
+    print(f"{'✓' if exito else '✗'} {mensaje} ({Path(ruta).name})")
+    if exito:
+        modelos[nombre] = navegador.modelo
+
+if not modelos:
+    sys.exit(1)
+
+inicio = time.perf_counter()
+resumen = evaluarModelos(modelos, qrels, k)
+duracion = time.perf_counter() - inicio
+
+print("\n" + "=" * 60)
+for linea in formatearReporte(resumen, k):
+    print(linea)
+print("=" * 60)
+print(f"Tiempo de evaluación: {duracion:.2f}s")
@@ -2,12 +2,18 @@ from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal
 from textual.widgets import Header, Footer, Button, Input, ListItem, ListView, Label, Static, Select
 from textual.message import Message
+from textual.worker import Worker, get_current_worker
+from textual import work
 from typing import List
 
 # Importaciones de los controladores con sus nombres traducidos (si los archivos fueran renombrados)
 # Usaremos los nombres de clase traducidos para mantener la coherencia.
 from controllers.browser_integration import NavegadorModelos
 from controllers.corpus_loader import inicializarCorpus, obtenerCorpus
+from controllers.logging_config import configurarLogging
+
+# Segundos sin escribir antes de lanzar la búsqueda en vivo (debounce)
+RETARDO_BUSQUEDA_EN_VIVO = 0.3
 
 
 class ResultadoBusqueda(ListItem):
@@ -74,7 +80,9 @@ class Camaleon(App):
     CSS_PATH = "styles.tcss"
     BINDINGS = [
         ("q", "quit", "Salir"),
-        ("s", "toggle_dark", "Alternar Modo Oscuro") # Un ejemplo de binding útil
+        ("s", "toggle_dark", "Alternar Modo Oscuro"), # Un ejemplo de binding útil
+        ("m", "alternar_metricas", "Métricas de búsqueda"),
+        ("r", "alternar_ranking_binario", "Ranking binario")
     ]
 
     def compose(self) -> ComposeResult:
@@ -88,6 +96,7 @@ class Camaleon(App):
         # Crear el puente (bridge) del navegador de modelos
         self.navegadorModelos = NavegadorModelos()
         self.tipoModeloSeleccionado = None
+        self.temporizadorBusqueda = None
         
         # Cargar corpus desde CSV (usando la función de corpus_loader.py)
         if inicializarCorpus():
@@ -128,8 +137,35 @@ class Camaleon(App):
             entradaBusqueda.value = str(evento.value)
             self.notify(f"Qrel seleccionado: '{evento.value}'", severity="information")
 
+    def on_input_changed(self, evento: Input.Changed) -> None:
+        """Búsqueda mientras se escribe: espera una pausa en la escritura antes de buscar."""
+        if evento.input.id not in ("entrada_busqueda", "entrada_k"):
+            return
+        if self.temporizadorBusqueda is not None:
+            self.temporizadorBusqueda.stop()
+        self.temporizadorBusqueda = self.set_timer(RETARDO_BUSQUEDA_EN_VIVO, self.busquedaEnVivo)
+
+    def busquedaEnVivo(self) -> None:
+        """Lanza la búsqueda en vivo cuando vence el temporizador."""
+        self.temporizadorBusqueda = None
+        self.ejecutarBusqueda(enVivo=True)
+
+    def action_alternar_metricas(self) -> None:
+        """Activa o desactiva la medición de tiempos por etapa de cada búsqueda."""
+        instrumentacion = self.navegadorModelos.instrumentacion
+        self.navegadorModelos.activarInstrumentacion(not instrumentacion.activa)
+        estado = "activadas" if instrumentacion.activa else "desactivadas"
+        self.notify(f"⏱ Métricas de búsqueda {estado}", severity="information")
+
+    def action_alternar_ranking_binario(self) -> None:
+        """Alterna el Modelo Binario entre la búsqueda booleana y el ranking por coincidencias."""
+        modo = "coordinacion" if self.navegadorModelos.modoBinario == "booleano" else "booleano"
+        self.navegadorModelos.cambiarModoBinario(modo)
+        descripcion = "ranking por coincidencias" if modo == "coordinacion" else "booleano (AND / OR / NOT)"
+        self.notify(f"🔢 Modelo Binario: {descripcion}", severity="information")
+
     def seleccionarTipoModelo(self, tipoModelo: str) -> None:
-        """Selecciona un tipo de modelo (binary, tfidf, bm25) y lo carga."""
+        """Selecciona un tipo de modelo (binary, tfidf, bm25) y lo carga en segundo plano."""
         # Usar el método del navegador de modelos para obtener la ruta
         ruta = self.navegadorModelos.obtenerRutaModelo(tipoModelo)
         
@@ -137,8 +173,22 @@ class Camaleon(App):
             self.notify(f"✗ No se encontró modelo {tipoModelo}", severity="error")
             return
 
+        etiqueta: Label = self.query_one("#etiqueta_modelo_seleccionado")
+        etiqueta.update(f"⏳ Cargando modelo {tipoModelo.upper()}...")
+        self.cargarModeloEnSegundoPlano(tipoModelo, ruta)
+
+    @work(thread=True, exclusive=True, group="carga_modelo")
+    def cargarModeloEnSegundoPlano(self, tipoModelo: str, ruta: str) -> None:
+        """Carga el modelo en un hilo para no bloquear la interfaz."""
         exito, mensaje = self.navegadorModelos.cargar(ruta)
-        
+        self.call_from_thread(self.mostrarCargaModelo, get_current_worker(), tipoModelo, exito, mensaje)
+
+    def mostrarCargaModelo(self, trabajador: Worker, tipoModelo: str, exito: bool, mensaje: str) -> None:
+        """Actualiza la interfaz con el resultado de la carga (en el hilo de la interfaz)."""
+        if trabajador.is_cancelled:
+            # El usuario ya eligió otro modelo
+            return
+
         etiqueta: Label = self.query_one("#etiqueta_modelo_seleccionado")
         listaResultados: ListView = self.query_one("#lista_resultados")
         listaResultados.clear()
@@ -159,12 +209,17 @@ class Camaleon(App):
         if entradas:
             self.notify(f"✓ Se encontraron {len(entradas)} modelos disponibles", severity="information")
         else:
-            self.notify("✗ No hay archivos .pkl en la carpeta models/", severity="warning")
+            self.notify("✗ No hay modelos (.indice / .pkl) en la carpeta models/", severity="warning")
 
-    def ejecutarBusqueda(self):
-        """Ejecuta la búsqueda usando el modelo seleccionado."""
+    def ejecutarBusqueda(self, enVivo: bool = False):
+        """Valida la consulta y lanza la búsqueda en segundo plano.
+        
+        Con enVivo=True (búsqueda mientras se escribe) no se muestran avisos y la
+        lista solo se limpia si realmente se lanza una búsqueda.
+        """
         listaResultados: ListView = self.query_one("#lista_resultados")
-        listaResultados.clear()
+        if not enVivo:
+            listaResultados.clear()
 
         entradaBusqueda: Input = self.query_one("#entrada_busqueda")
         consulta = (entradaBusqueda.value or "").strip()
@@ -175,32 +230,69 @@ class Camaleon(App):
             # Convertir a entero, con un mínimo de 1
             k = max(1, int(entradaK.value))
         except ValueError:
-            self.notify("K debe ser un número entero válido (mínimo 1)", severity="error")
+            if not enVivo:
+                self.notify("K debe ser un número entero válido (mínimo 1)", severity="error")
             return
 
         if not consulta:
-            msg = "Por favor ingresa una consulta de búsqueda"
-            self.notify(msg, severity="warning")
+            if not enVivo:
+                msg = "Por favor ingresa una consulta de búsqueda"
+                self.notify(msg, severity="warning")
             return
 
         if not self.navegadorModelos.tieneModelo():
-            msg = "Por favor selecciona y carga un modelo primero"
-            self.notify(msg, severity="warning")
+            if not enVivo:
+                msg = "Por favor selecciona y carga un modelo primero"
+                self.notify(msg, severity="warning")
             return
 
-        # Ejecutar búsqueda (usando k=5 como límite por defecto)
-        self.notify(f"Buscando '{consulta}' con K={k}...", severity="information")
-        lineasFormateadas: List[str] = self.navegadorModelos.buscar(consulta, k=k)
-        
-        if not lineasFormateadas or lineasFormateadas[0].startswith("No se encontraron resultados relevantes"):
-            listaResultados.append(ResultadoBusqueda("✗ No se encontraron resultados."))
-            self.notify("No se encontraron resultados para la búsqueda", severity="warning")
+        # Ejecutar búsqueda; una búsqueda anterior todavía en curso se cancela (exclusive)
+        if enVivo:
+            listaResultados.clear()
+        else:
+            self.notify(f"Buscando '{consulta}' con K={k}...", severity="information")
+        self.buscarEnSegundoPlano(consulta, k, notificar=not enVivo)
+
+    @work(thread=True, exclusive=True, group="busqueda")
+    def buscarEnSegundoPlano(self, consulta: str, k: int, notificar: bool = True) -> None:
+        """Ejecuta la búsqueda en un hilo y envía cada línea a la lista en cuanto está lista."""
+        trabajador = get_current_worker()
+        numLineas = 0
+        busqueda = self.navegadorModelos.buscarIncremental(consulta, k=k)
+        for linea in busqueda:
+            if trabajador.is_cancelled:
+                busqueda.close()
+                return
+            if numLineas == 0 and linea.startswith("No se encontraron resultados relevantes"):
+                break
+            self.call_from_thread(self.agregarResultado, trabajador, linea)
+            numLineas += 1
+        # Cerrar la búsqueda registra su medición antes de mostrarla
+        busqueda.close()
+        medicion = self.navegadorModelos.instrumentacion.ultima if self.navegadorModelos.instrumentacion.activa else None
+        self.call_from_thread(self.finalizarBusqueda, trabajador, numLineas, notificar, medicion)
+
+    def agregarResultado(self, trabajador: Worker, linea: str) -> None:
+        """Agrega una línea a la lista de resultados si la búsqueda sigue vigente."""
+        if trabajador.is_cancelled:
             return
+        listaResultados: ListView = self.query_one("#lista_resultados")
+        listaResultados.append(ResultadoBusqueda(linea))
 
-        # Mostrar resultados
-        self.notify(f"✓ Se encontraron {len(lineasFormateadas)} resultado(s)", severity="information")
-        for linea in lineasFormateadas:
-            listaResultados.append(ResultadoBusqueda(linea))
+    def finalizarBusqueda(self, trabajador: Worker, numLineas: int, notificar: bool, medicion=None) -> None:
+        """Notifica el resultado final de la búsqueda (y sus métricas, si se midió) si sigue vigente."""
+        if trabajador.is_cancelled:
+            return
+        if medicion is not None:
+            self.notify(f"⏱ {medicion.resumen()}", severity="information", timeout=8)
+        if numLineas == 0:
+            listaResultados: ListView = self.query_one("#lista_resultados")
+            listaResultados.append(ResultadoBusqueda("✗ No se encontraron resultados."))
+            if notificar:
+                self.notify("No se encontraron resultados para la búsqueda", severity="warning")
+            return
+        if notificar:
+            self.notify(f"✓ Se encontraron {numLineas} resultado(s)", severity="information")
 
     def on_resultado_busqueda_seleccionado(self, evento: ResultadoBusqueda.Seleccionado) -> None:
         """Maneja cuando un resultado es clicado y muestra el documento completo."""
@@ -283,4 +375,6 @@ class Camaleon(App):
 
 
 if __name__ == "__main__":
+    # Nivel y archivo configurables con RI_NIVEL_LOG / RI_ARCHIVO_LOG
+    configurarLogging()
     Camaleon().run()
\ No newline at end of file
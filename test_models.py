@@ -9,24 +9,22 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent
 sys.path.insert(0, str(project_root))
 
-from controllers.browser_integration import ModelBrowser
+from controllers.browser_integration import NavegadorModelos
 
 print("=" * 60)
 print("PRUEBA DE CARGA DE MODELOS")
 print("=" * 60)
 
-browser = ModelBrowser()
+browser = NavegadorModelos()
 
-print(f"\n✓ Raíz del proyecto: {browser.root}")
-print(f"✓ Carpeta models existe: {(browser.root / 'models').exists()}")
+print(f"\n✓ Raíz del proyecto: {browser.raizProyecto}")
+print(f"✓ Carpeta models existe: {(browser.raizProyecto / 'models').exists()}")
 
 # Verificar archivos disponibles
-models_folder = browser.root / 'models'
-if models_folder.exists():
-    pkl_files = list(models_folder.glob("*.pkl"))
-    print(f"✓ Archivos .pkl encontrados: {len(pkl_files)}")
-    for f in pkl_files:
-        print(f"  - {f.name}")
+model_files = browser.listarModelos()
+print(f"✓ Modelos encontrados (.indice / .pkl): {len(model_files)}")
+for f in model_files:
+    print(f"  - {f.name}")
 
 # Probar cada tipo de modelo
 print("\n" + "=" * 60)
@@ -37,16 +35,16 @@ model_types = ['binary', 'tfidf', 'bm25']
 
 for model_type in model_types:
     print(f"\n[{model_type.upper()}]")
-    path = browser.get_model_path(model_type)
+    path = browser.obtenerRutaModelo(model_type)
     if path:
         print(f"✓ Ruta encontrada: {path}")
-        success, message = browser.load(path)
+        success, message = browser.cargar(path)
         print(f"{'✓' if success else '✗'} {message}")
         
         if success:
             # Probar búsqueda simple
             print(f"\n  Probando búsqueda con query 'test'...")
-            results = browser.search("test", k=3)
+            results = browser.buscar("test", k=3)
             print(f"  {'✓' if results else '✗'} {len(results)} resultados")
             if results:
                 for i, r in enumerate(results[:2], 1):
@@ -54,6 +52,123 @@ for model_type in model_types:
     else:
         print(f"✗ No se encontró archivo para {model_type}")
 
+# Modelos ajustados en memoria: la búsqueda del navegador pasa por el evaluador incremental
+print("\n" + "=" * 60)
+print("PROBANDO EVALUACIÓN INCREMENTAL (TF-IDF y BM25)")
+print("=" * 60)
+
+import contextlib
+import io
+from classes.tfidfmodel import ModeloVectorialTfIdf
+from classes.bm25model import ModeloBM25
+from classes.incrementalsearch import EvaluadorIncremental
+
+corpusPrueba = [
+    "High blood pressure increases the risk of heart disease",
+    "Skin cancer is the most common form of cancer",
+    "Blood tests can detect some types of cancer",
+    "Regular exercise lowers blood pressure",
+    "The heart pumps blood through the body",
+]
+for modelo in (ModeloVectorialTfIdf(), ModeloBM25()):
+    nombreModelo = type(modelo).__name__
+    with contextlib.redirect_stdout(io.StringIO()):
+        modelo.ajustarCorpus(corpusPrueba)
+    evaluador = EvaluadorIncremental(modelo)
+    for consulta in ("blood", "blood pressure", "blood pressure heart", "cancer"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            esperados = [idDoc for idDoc, _ in modelo.buscar(consulta, k=3)]
+        obtenidos = [idDoc for idDoc, _ in evaluador.buscar(consulta, k=3)]
+        print(f"{'✓' if obtenidos == esperados else '✗'} {nombreModelo} '{consulta}': {obtenidos}")
+
+    browser.modelo = modelo
+    results = browser.buscar("blood pressure", k=3)
+    print(f"{'✓' if any('Score' in r for r in results) else '✗'} Navegador con {nombreModelo}: {len(results)} líneas")
+
+# NEAR/n: a lo sumo n posiciones entre los dos términos (NEAR/0 = contiguos)
+print("\n" + "=" * 60)
+print("PROBANDO PROXIMIDAD (NEAR/n)")
+print("=" * 60)
+
+from classes.binarymodel import ModeloBinario
+
+corpusProximidad = ["skin cancer", "skin melanoma cancer", "skin melanoma lesion cancer", "cancer skin"]
+modelo = ModeloBinario()
+with contextlib.redirect_stdout(io.StringIO()):
+    modelo.ajustarCorpus(corpusProximidad, posiciones=True)
+for distancia, esperados in ((0, [0, 3]), (1, [0, 1, 3]), (2, [0, 1, 2, 3])):
+    with contextlib.redirect_stdout(io.StringIO()):
+        obtenidos = [int(idDoc) for idDoc in modelo.buscar(f"skin NEAR/{distancia} cancer", k=10)]
+    print(f"{'✓' if obtenidos == esperados else '✗'} 'skin NEAR/{distancia} cancer': {obtenidos}")
+
+# Índice incremental: frases en los segmentos en memoria y orden por ID tras una fusión
+print("\n" + "=" * 60)
+print("PROBANDO ÍNDICE INCREMENTAL (frases y fusión)")
+print("=" * 60)
+
+from classes.incrementalindex import IndiceIncremental
+
+modelo = ModeloBinario()
+with contextlib.redirect_stdout(io.StringIO()):
+    modelo.ajustarCorpus(corpusPrueba, posiciones=True)
+indice = IndiceIncremental(modelo, fusionAutomatica=False)
+indice.agregarDocumentos(["Pressure on the blood vessels", "Blood pressure in children"])
+indice.actualizarDocumento(0, "Blood pressure and heart rate")
+for etapa in ("memoria", "fusión"):
+    obtenidos = [int(idDoc) for idDoc in indice.buscar('"blood pressure"', k=10)]
+    print(f"{'✓' if obtenidos == [0, 3, 6] else '✗'} Frase con segmentos en {etapa}: {obtenidos}")
+    obtenidos = [int(idDoc) for idDoc in indice.buscar("blood", k=3)]
+    print(f"{'✓' if obtenidos == [0, 2, 3] else '✗'} Orden por ID en {etapa}: {obtenidos}")
+    indice.fusionar()
+print(f"{'✓' if indice.modelo.indicePosicional is not None else '✗'} La fusión reconstruye el índice posicional")
+
+# TF-IDF entre fusiones: mismo ranking y puntuaciones que un ajuste completo sobre los documentos vivos
+modelo = ModeloVectorialTfIdf()
+with contextlib.redirect_stdout(io.StringIO()):
+    modelo.ajustarCorpus(corpusPrueba)
+indice = IndiceIncremental(modelo, fusionAutomatica=False)
+nuevos = ["Blood pressure and heart rate", "Cancer of the blood"]
+indice.agregarDocumentos(nuevos)
+indice.eliminarDocumentos([1])
+vivos = [texto for i, texto in enumerate(corpusPrueba) if i != 1] + nuevos
+idsVivos = [0, 2, 3, 4, 5, 6]
+completo = ModeloVectorialTfIdf()
+with contextlib.redirect_stdout(io.StringIO()):
+    completo.ajustarCorpus(vivos)
+    esperados = [(idsVivos[i], round(p, 10)) for i, p in completo.buscar("blood cancer", k=4) if p > 0]
+obtenidos = [(int(i), round(p, 10)) for i, p in indice.buscar("blood cancer", k=4)]
+print(f"{'✓' if obtenidos == esperados else '✗'} TF-IDF entre fusiones igual al ajuste completo: {[i for i, _ in obtenidos]}")
+
+# Tokenizador rápido: los mismos tokens que word_tokenize de NLTK
+print("\n" + "=" * 60)
+print("PROBANDO TOKENIZADOR RÁPIDO (vs NLTK)")
+print("=" * 60)
+
+import random
+from classes.analyzer import tokenizar
+
+casosLimite = [
+    "hello.;", "end.; next", "It is over.!", "why?! then", "end.) x", "see Dr. Smith. )", "No. } x",
+    "Inc.\n'", "the U.S. rate was 3.5% (roughly).", "I cannot go, gimme that... don't!", "e.g. x.: y",
+]
+for texto in casosLimite:
+    iguales = tokenizar(texto, "rapido") == tokenizar(texto, "nltk")
+    print(f"{'✓' if iguales else '✗'} {texto!r}: {tokenizar(texto, 'rapido')}")
+
+generador = random.Random(2024)
+piezas = ["Dr.", "e.g.", "U.S.", "No.", "A.", "etc.", "cannot", "don't", "hello", "It", "3.5", "...", "''", "“q”"]
+simbolos = "ab .?!;:,)(\"'[]{}<>*@"
+diferencias = 0
+for _ in range(2000):
+    partes = [
+        generador.choice(piezas) if generador.random() < 0.5
+        else "".join(generador.choice(simbolos) for _ in range(generador.randint(1, 5)))
+        for _ in range(generador.randint(0, 15))
+    ]
+    texto = generador.choice([" ", "", "\n"]).join(partes)
+    diferencias += tokenizar(texto, "rapido") != tokenizar(texto, "nltk")
+print(f"{'✓' if diferencias == 0 else '✗'} Muestra aleatoria (2000 textos): {diferencias} diferencias")
+
 print("\n" + "=" * 60)
 print("PRUEBA COMPLETADA")
 print("=" * 60)